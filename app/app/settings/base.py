@@ -47,6 +47,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Answers the health probes before any other middleware runs
+    "core.middleware.HealthCheckMiddleware",
+    # Next, so that their timings cover the other middleware
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -120,12 +125,123 @@ if not MEDIA_ROOT:
         print(f"TMP_ROOT: {TMP_ROOT}")
         atexit.register(lambda: shutil.rmtree(TMP_ROOT, ignore_errors=True))
 
+# Caches. CACHE_URL selects the backend, e.g. `locmemcache://` (per process, the default),
+# `filecache:///var/tmp/django_cache` or `redis://localhost:6379/0` (any Redis compatible
+# server; shared between processes)
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Auth
 AUTH_USER_MODEL = "core.User"
 
+# JSON rendering and parsing with orjson, installed with the prod and dev groups (the renderer and
+# parser fall back to the stdlib without it), see core.renderers.
+# Set API_FAST_JSON=false to always use DRF's stdlib based JSON renderer and parser.
+API_FAST_JSON = env.bool("API_FAST_JSON", default=True)
+
 # DRF / Spectacular
-REST_FRAMEWORK = {"DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema"}
+REST_FRAMEWORK = {
+    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": [
+        (
+            "core.renderers.FastJSONRenderer"
+            if API_FAST_JSON
+            else "rest_framework.renderers.JSONRenderer"
+        ),
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.parsers.FastJSONParser" if API_FAST_JSON else "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    # Default page size of the paginated list endpoints
+    "PAGE_SIZE": env.int("API_PAGE_SIZE", default=100),
+}
+# Pagination classes are set per viewset, `PAGE_SIZE` only provides their default size
+SILENCED_SYSTEM_CHECKS = ["rest_framework.W001"]
+# Token authentication cache (see core.authentication). TTL is in seconds and bounds how long
+# other processes may keep accepting a deactivated user or deleted token. Set CACHE_ALIAS to a
+# `CACHES` alias to share entries between processes.
+TOKEN_AUTH_CACHE = {
+    "MAX_ENTRIES": env.int("TOKEN_AUTH_CACHE_MAX_ENTRIES", default=1024),
+    "TTL": env.int("TOKEN_AUTH_CACHE_TTL", default=30),
+    "CACHE_ALIAS": env("TOKEN_AUTH_CACHE_ALIAS", default=None),
+}
+
+# Response cache of the recipe API (see recipe.cache). Entries are invalidated by writes, the
+# TTL only bounds how long unreachable ones linger. Set CACHE_ALIAS to an empty value to disable.
+RESPONSE_CACHE = {
+    "CACHE_ALIAS": env("RESPONSE_CACHE_ALIAS", default="default") or None,
+    "TTL": env.int("RESPONSE_CACHE_TTL", default=300),
+}
+
+# Request timings (see core.middleware): the share of requests timed, from 0 to 1, and whether
+# their timings are sent in a `Server-Timing` header and/or logged to the `core.timing` logger
+SERVER_TIMING = {
+    "SAMPLE_RATE": env.float("SERVER_TIMING_SAMPLE_RATE", default=1.0),
+    "HEADER": env.bool("SERVER_TIMING_HEADER", default=True),
+    "LOG": env.bool("SERVER_TIMING_LOG", default=False),
+}
+
+# Prometheus metrics at /metrics (see core.metrics). With several worker processes, as under
+# gunicorn, set MULTIPROCESS_DIR to a directory shared by them and emptied when the server starts.
+METRICS = {
+    "ENABLED": env.bool("METRICS_ENABLED", default=True),
+    "MULTIPROCESS_DIR": env("METRICS_MULTIPROCESS_DIR", default=None),
+    "FLUSH_INTERVAL": env.float("METRICS_FLUSH_INTERVAL", default=5.0),
+}
+
+# Resized variants of the recipe images (see recipe.images): their widths in pixels, formats
+# and quality, and the threads per process generating them, 0 to generate them during the upload
+RECIPE_IMAGE_VARIANTS = {
+    "WIDTHS": [320, 640, 1280],
+    "FORMATS": ["webp", "jpeg"],
+    "QUALITY": env.int("RECIPE_IMAGE_QUALITY", default=80),
+    "WORKERS": env.int("RECIPE_IMAGE_WORKERS", default=1),
+}
+
+# Recipe image uploads (see recipe.uploads): the largest accepted, in bytes and in pixels, and the
+# accepted formats, checked from the image's header before anything decodes it
+RECIPE_IMAGE_UPLOADS = {
+    "MAX_BYTES": env.int("RECIPE_IMAGE_MAX_BYTES", default=10 * 1024**2),
+    "MAX_PIXELS": env.int("RECIPE_IMAGE_MAX_PIXELS", default=50_000_000),
+    "FORMATS": ["JPEG", "PNG", "WEBP", "GIF"],
+}
+
+# Delete the file of a recipe's image as soon as the recipe is given another image or deleted,
+# unless other recipes have the same image (see core.signals). Otherwise the files are left to
+# `manage.py delete_orphaned_media` and `collect_image_blobs`.
+RECIPE_IMAGE_DELETE_ON_REPLACE = env.bool("RECIPE_IMAGE_DELETE_ON_REPLACE", default=False)
+
+# Recipe images resized on request at /media/transforms/ (see recipe.transforms): the widths they
+# can be resized to, their quality, and the size of their cache under MEDIA_ROOT in bytes
+RECIPE_IMAGE_TRANSFORMS = {
+    "WIDTHS": [160, 320, 480, 640, 960, 1280, 1920],
+    "QUALITY": env.int("RECIPE_IMAGE_QUALITY", default=80),
+    "MAX_BYTES": env.int("RECIPE_IMAGE_TRANSFORMS_MAX_BYTES", default=1024**3),
+}
+
+# Readiness checks at /readyz (see core.health): how long their results are reused, in seconds
+HEALTH_CHECKS = {
+    "CACHE_SECONDS": env.float("HEALTH_CHECK_CACHE_SECONDS", default=5.0),
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "core": {"handlers": ["console"], "level": env("CORE_LOG_LEVEL", default="INFO")},
+        "recipe": {"handlers": ["console"], "level": env("RECIPE_LOG_LEVEL", default="INFO")},
+    },
+}
+
 SPECTACULAR_SETTINGS = {"COMPONENT_SPLIT_REQUEST": True}
+
+# The OpenAPI schema served at /api/schema/ (see core.schema) is read from this file when it
+# exists, as written by `manage.py spectacular --format openapi-json --file <path>`, rather than
+# generated by each process.
+API_SCHEMA_FILE = env("API_SCHEMA_FILE", default=None)
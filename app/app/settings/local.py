@@ -13,9 +13,7 @@ ALLOWED_HOSTS = ["localhost", "127.0.0.1"]
 # Helpful local dev email backend
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
+# SQLite unless `DATABASE_URL` says otherwise, e.g. CI runs the migration tests on PostgreSQL
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",  # noqa: F405
-    }
+    "default": env.db("DATABASE_URL", default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),  # noqa: F405
 }
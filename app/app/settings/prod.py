@@ -24,7 +24,17 @@ USE_X_FORWARDED_HOST = True
 
 # Add WhiteNoise after SecurityMiddleware
 MIDDLEWARE = list(BASE_MIDDLEWARE)
-MIDDLEWARE.insert(1, "whitenoise.middleware.WhiteNoiseMiddleware")
+MIDDLEWARE.insert(
+    MIDDLEWARE.index("django.middleware.security.SecurityMiddleware") + 1,
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+)
+
+# Time a sample of the requests and log their timings, don't expose them to clients
+SERVER_TIMING = {
+    "SAMPLE_RATE": env.float("SERVER_TIMING_SAMPLE_RATE", default=0.01),
+    "HEADER": env.bool("SERVER_TIMING_HEADER", default=False),
+    "LOG": env.bool("SERVER_TIMING_LOG", default=True),
+}
 
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
@@ -15,18 +15,27 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from core.views import SchemaView, metrics
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularSwaggerView
+from recipe.views import image_transform
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("api/schema/", SpectacularAPIView.as_view(), name="api-schema"),
+    path("api/schema/", SchemaView.as_view(), name="api-schema"),
     path("api/docs/", SpectacularSwaggerView.as_view(url_name="api-schema"), name="api-docs"),
     path("api/user/", include("user.urls")),
     path("api/recipe/", include("recipe.urls")),
+    path("metrics", metrics, name="metrics"),
+    # Only the first requests, nginx serves the transformations from the disk afterwards
+    path(
+        f"{settings.MEDIA_URL.strip('/')}/transforms/<int:width>/<path:name>",
+        image_transform,
+        name="image-transform",
+    ),
 ]
 
 # Serve media files (suitable for low traffic)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self) -> None:
+        # Connect the token cache invalidation, content versioning and query wrapper signals
+        from core import authentication, signals, timing  # noqa: F401
@@ -0,0 +1,165 @@
+"""
+Token authentication with cached token-to-user resolution.
+
+DRF's `TokenAuthentication` runs a `SELECT ... FROM authtoken_token JOIN core_user` for every
+authenticated request. `CachedTokenAuthentication` keeps the result in a bounded, per-process
+LRU with a TTL, optionally backed by a Django cache shared between processes.
+
+The cache holds the user's fields but its password hash, and the token's creation time, not the
+model instances: a shared cache doesn't get the hashes, and each request gets its own `User`,
+built from the fields. The password hash is loaded if a request uses it.
+
+Entries are evicted when the user is saved (which covers deactivation and password changes)
+and when the token is saved or deleted (including via the user's CASCADE). Those signals only
+reach the process that made the change, so other processes may keep serving a stale entry
+until it expires; the TTL bounds that window. Writes that bypass signals, such as
+`QuerySet.update()`, are also only picked up on expiry.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.metrics import registry
+from core.models import User
+
+# The user's fields, by attribute name, and the token's creation time
+type CachedCredentials = tuple[dict[str, Any], datetime]
+
+# All but the password hash
+CACHED_USER_FIELDS = [
+    field.attname for field in User._meta.concrete_fields if field.attname != "password"
+]
+
+
+class TokenCache:
+    """Thread-safe LRU of token key -> (user fields, token creation) with per-entry expiry."""
+
+    def __init__(self, max_entries: int, ttl: float, cache_alias: str | None = None) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+        self._entries: OrderedDict[str, tuple[float, CachedCredentials]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _shared_key(self, key: str) -> str:
+        # Don't leak raw tokens into a shared cache's key space.
+        return f"auth-token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+    def get(self, key: str) -> CachedCredentials | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, credentials = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return credentials
+                del self._entries[key]
+
+        if self.cache_alias is not None:
+            credentials = caches[self.cache_alias].get(self._shared_key(key))
+            if credentials is not None:
+                self._store(key, credentials)
+                with self._lock:
+                    self.hits += 1
+                return credentials  # type: ignore[no-any-return]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, credentials: CachedCredentials) -> None:
+        self._store(key, credentials)
+        if self.cache_alias is not None:
+            caches[self.cache_alias].set(self._shared_key(key), credentials, self.ttl)
+
+    def _store(self, key: str, credentials: CachedCredentials) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, credentials)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def evict(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        if self.cache_alias is not None:
+            caches[self.cache_alias].delete_many([self._shared_key(key) for key in keys])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hit_rate,
+            }
+
+
+token_cache = TokenCache(
+    max_entries=settings.TOKEN_AUTH_CACHE["MAX_ENTRIES"],
+    ttl=settings.TOKEN_AUTH_CACHE["TTL"],
+    cache_alias=settings.TOKEN_AUTH_CACHE["CACHE_ALIAS"],
+)
+registry.register_cache("token_auth_cache", token_cache)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in replacement for `TokenAuthentication` backed by `token_cache`."""
+
+    def authenticate_credentials(self, key: str) -> tuple[User, Token]:
+        credentials = token_cache.get(key)
+        if credentials is None:
+            user, token = super().authenticate_credentials(key)
+            credentials = {name: getattr(user, name) for name in CACHED_USER_FIELDS}, token.created
+            token_cache.set(key, credentials)
+
+        fields, created = credentials
+        # A new instance per request, views may modify `request.user` (e.g. `ManageUserView`).
+        # The password is deferred, loaded on access.
+        user = User.from_db(router.db_for_read(User), list(fields), list(fields.values()))
+        return user, Token(key=key, user=user, created=created)
+
+
+@receiver(post_save, sender=User)
+def evict_user_tokens(sender: type[User], instance: User, **kwargs: Any) -> None:
+    token_cache.evict(*Token.objects.filter(user=instance).values_list("key", flat=True))
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def evict_token(sender: type[Token], instance: Token, **kwargs: Any) -> None:
+    token_cache.evict(instance.key)
@@ -0,0 +1,96 @@
+"""
+Liveness and readiness probes, answered by `core.middleware.HealthCheckMiddleware`.
+
+`/healthz` tells that the process serves requests and checks no dependency. `/readyz` also
+checks that the database answers, that its migrations are all applied and that the media
+storage is writable.
+
+The readiness results are reused for `HEALTH_CHECKS["CACHE_SECONDS"]`, and one request of the
+process at a time runs the checks while the others wait for its results, so a burst of probes
+costs at most one round of checks per process and interval, also while the database is down.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections.abc import Callable
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+logger = logging.getLogger("core.health")
+
+type Check = Callable[[], None]
+
+
+class CheckFailed(Exception):
+    pass
+
+
+def check_database(alias: str = DEFAULT_DB_ALIAS) -> None:
+    """Run a query on the database, raising `django.db.Error` when it can't be reached."""
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+def check_migrations(alias: str = DEFAULT_DB_ALIAS) -> None:
+    executor = MigrationExecutor(connections[alias])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if plan:
+        raise CheckFailed(f"{len(plan)} migrations not applied")
+
+
+def check_storage() -> None:
+    # A unique name, as the processes may check at the same time
+    name = default_storage.save(f".health/{uuid.uuid4().hex}", ContentFile(b""))
+    default_storage.delete(name)
+
+
+class Readiness:
+    """The results of the checks, run again once they're older than the cache interval."""
+
+    def __init__(self, checks: dict[str, Check]) -> None:
+        self.checks = checks
+        self._lock = threading.Lock()
+        self._results: dict[str, bool] = {}
+        self._checked_at: float | None = None
+
+    def results(self) -> dict[str, bool]:
+        with self._lock:
+            results = self.cached()
+            if results is None:
+                results = self._results = {
+                    name: self._run(name, check) for name, check in self.checks.items()
+                }
+                self._checked_at = time.monotonic()
+            return results
+
+    def cached(self) -> dict[str, bool] | None:
+        """The results if they're recent enough, without waiting for a running check."""
+        checked_at = self._checked_at
+        if checked_at is None:
+            return None
+        if time.monotonic() - checked_at >= settings.HEALTH_CHECKS["CACHE_SECONDS"]:
+            return None
+        return self._results
+
+    def clear(self) -> None:
+        with self._lock:
+            self._checked_at = None
+
+    def _run(self, name: str, check: Check) -> bool:
+        try:
+            check()
+        except Exception:
+            logger.warning("Readiness check %s failed", name, exc_info=True)
+            return False
+        return True
+
+
+readiness = Readiness(
+    {"database": check_database, "migrations": check_migrations, "storage": check_storage}
+)
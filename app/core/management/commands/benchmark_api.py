@@ -0,0 +1,607 @@
+"""
+Django management command to load test the API with concurrent clients.
+
+Each client logs in as one of the users created by `manage.py seed_data` and sends requests for
+one scenario (an endpoint and its parameters) at a time. Latency percentiles, throughput and, when
+known, database queries and CPU time per request are reported per scenario, and can be written as
+JSON and compared against an earlier run, e.g. of the previous commit.
+
+Without `--url` the app is served in this process, against the configured database, and the
+queries and the CPU time of every request are measured. The clients share the interpreter with
+the server, so the numbers are for comparing runs rather than capacity planning; point `--url` at
+the deployed server for those.
+
+The in-process server is Django's threaded WSGI server, or with `--server asgi` a minimal asyncio
+HTTP server running the ASGI app. `--threads` caps the requests the WSGI app handles at once, like
+gunicorn's workers x threads, and `--query-delay` adds latency to every query, like a database
+across the network would. Together they compare the servers under I/O bound load, e.g.:
+
+    manage.py benchmark_api --scenario recipe-list --clients 32 --threads 4 --query-delay 10
+    manage.py benchmark_api --scenario recipe-list --clients 32 --server asgi --query-delay 10
+"""
+
+import asyncio
+import contextlib
+import functools
+import http.client
+import io
+import itertools
+import json
+import random
+import statistics
+import subprocess
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+from urllib.parse import unquote, urlencode, urlsplit
+from wsgiref.types import StartResponse, WSGIApplication, WSGIEnvironment
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.utils import timezone
+from PIL import Image
+
+from core.management.commands.seed_data import EMAIL_DOMAIN
+from core.timing import wrapping_queries
+
+# Response header with the number of queries of the request, set by the in-process server
+QUERIES_HEADER = "X-Benchmark-Queries"
+# Response header with the CPU time of the request's thread in milliseconds, set by the WSGI server
+CPU_HEADER = "X-Benchmark-Cpu"
+
+type Request = tuple[str, str, dict[str, Any] | Upload | None]
+type Scope = dict[str, Any]
+type Message = Mapping[str, Any]
+type Receive = Callable[[], Awaitable[Message]]
+type Send = Callable[[Message], Awaitable[None]]
+type ASGIApplication = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+class Upload:
+    """A file sent as a `multipart/form-data` body instead of a JSON payload."""
+
+    boundary = "benchmark-upload-boundary"
+
+    def __init__(self, field: str, filename: str, content_type: str, content: bytes) -> None:
+        self.field = field
+        self.filename = filename
+        self.content_type = content_type
+        self.content = content
+
+    def encode(self) -> tuple[bytes, str]:
+        """The body and its content type."""
+        head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{self.field}"; filename="{self.filename}"\r\n'
+            f"Content-Type: {self.content_type}\r\n\r\n"
+        )
+        body = head.encode() + self.content + f"\r\n--{self.boundary}--\r\n".encode()
+        return body, f"multipart/form-data; boundary={self.boundary}"
+
+
+class Client:
+    """A logged in seeded user with a connection to the server."""
+
+    def __init__(self, url: str, email: str, password: str, seed: int) -> None:
+        parts = urlsplit(url)
+        self.connection = http.client.HTTPConnection(parts.netloc, timeout=60)
+        self.email = email
+        self.password = password
+        self.rng = random.Random(seed)
+        self.headers: dict[str, str] = {}
+
+        status, body, *_ = self.send("POST", "/api/user/token/", self.credentials())
+        if status != 200:
+            raise CommandError(
+                f"Can't log in as {email} ({status}), run `manage.py seed_data` and pass the "
+                "password of the seeded users"
+            )
+        self.headers["Authorization"] = f"Token {body['token']}"
+
+        _, recipes, *_ = self.send("GET", "/api/recipe/recipes/")
+        _, tags, *_ = self.send("GET", "/api/recipe/tags/", query={"assigned_only": 1})
+        self.recipe_ids = [recipe["id"] for recipe in recipes["results"]]
+        self.tag_ids = [tag["id"] for tag in tags["results"]]
+        if not self.recipe_ids:
+            raise CommandError(f"{email} has no recipes, seed more recipes than users")
+
+    def credentials(self) -> dict[str, Any]:
+        return {"email": self.email, "password": self.password}
+
+    def send(
+        self,
+        method: str,
+        path: str,
+        payload: dict[str, Any] | Upload | None = None,
+        query: dict[str, Any] | None = None,
+    ) -> tuple[int, Any, int | None, float | None]:
+        """Status, decoded body, query count and CPU time of a request."""
+        if query:
+            path = f"{path}?{urlencode(query)}"
+        headers = self.headers | {"Accept": "application/json"}
+        body = None
+        if isinstance(payload, Upload):
+            body, headers["Content-Type"] = payload.encode()
+        elif payload is not None:
+            body = json.dumps(payload).encode()
+            headers["Content-Type"] = "application/json"
+
+        self.connection.request(method, path, body, headers)
+        response = self.connection.getresponse()
+        content = response.read()
+        queries = response.getheader(QUERIES_HEADER)
+        cpu = response.getheader(CPU_HEADER)
+        is_json = (response.getheader("Content-Type") or "").startswith("application/json")
+        data = json.loads(content) if content and is_json else None
+        return (
+            response.status,
+            data,
+            int(queries) if queries is not None else None,
+            float(cpu) if cpu is not None else None,
+        )
+
+
+def recipe_payload(client: Client) -> dict[str, Any]:
+    return {
+        "title": f"Benchmark recipe {client.rng.randrange(1_000_000)}",
+        "time_minutes": client.rng.randint(5, 120),
+        "price": "9.99",
+        "tags": [{"name": "benchmark"}, {"name": f"benchmark {client.rng.randrange(10)}"}],
+        "ingredients": [{"name": "salt"}, {"name": "pepper"}],
+    }
+
+
+@functools.cache
+def photo() -> bytes:
+    """A 1600x1200 JPEG of about 300 KB, a gradient with noise to compress like a photo."""
+    gradient = Image.linear_gradient("L").resize((1600, 1200))
+    bands = [Image.blend(gradient, Image.effect_noise((1600, 1200), 14), 0.5) for _ in range(3)]
+    buffer = io.BytesIO()
+    Image.merge("RGB", bands).save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+SCENARIOS: dict[str, Callable[[Client], Request]] = {
+    "token": lambda client: ("POST", "/api/user/token/", client.credentials()),
+    "me": lambda client: ("GET", "/api/user/me/", None),
+    "recipe-list": lambda client: ("GET", "/api/recipe/recipes/", None),
+    "recipe-detail": lambda client: (
+        "GET",
+        f"/api/recipe/recipes/{client.rng.choice(client.recipe_ids)}/",
+        None,
+    ),
+    "recipe-filter": lambda client: (
+        "GET",
+        "/api/recipe/recipes/?"
+        + urlencode({"tags": ",".join(map(str, client.rng.sample(client.tag_ids, 2)))}),
+        None,
+    ),
+    "recipe-create": lambda client: ("POST", "/api/recipe/recipes/", recipe_payload(client)),
+    "recipe-upload-image": lambda client: (
+        "POST",
+        f"/api/recipe/recipes/{client.rng.choice(client.recipe_ids)}/upload-image/",
+        Upload("image", "photo.jpg", "image/jpeg", photo()),
+    ),
+    "tag-list": lambda client: ("GET", "/api/recipe/tags/", None),
+    "ingredient-list": lambda client: ("GET", "/api/recipe/ingredients/", None),
+}
+
+
+class Command(BaseCommand):
+    """Command that measures latency and throughput of the API endpoints."""
+
+    help = "Load test the API endpoints with concurrent clients logged in as seeded users"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--url",
+            help="Base URL of a running server (default: serve the app in this process)",
+        )
+        parser.add_argument(
+            "--server",
+            choices=["wsgi", "asgi"],
+            default="wsgi",
+            help="Server to serve the app in this process with (default: wsgi)",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            help="Requests the in-process WSGI server handles at once (default: no limit)",
+        )
+        parser.add_argument(
+            "--query-delay",
+            type=float,
+            default=0.0,
+            help="Milliseconds added to every query of the in-process server (default: 0)",
+        )
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=8,
+            help="Concurrent clients, each a different seeded user (default: 8)",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=400,
+            help="Requests per scenario (default: 400)",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=list(SCENARIOS),
+            dest="scenarios",
+            help="Scenario to run, can be repeated (default: all)",
+        )
+        parser.add_argument(
+            "--password",
+            default="password",
+            help="Password of the seeded users (default: password)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed of the requested recipes and tags (default: 0)",
+        )
+        parser.add_argument(
+            "--output",
+            type=Path,
+            help="Write the results as JSON to this file",
+        )
+        parser.add_argument(
+            "--compare",
+            type=Path,
+            help="JSON results of an earlier run to compare with",
+        )
+        parser.add_argument(
+            "--max-regression",
+            type=float,
+            help="With --compare, fail if a scenario's p95 latency grew by more than this percent",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        client_count: int = options["clients"]
+        requests: int = options["requests"]
+        if client_count < 1 or requests < 1:
+            raise CommandError("--clients and --requests must be positive")
+        if options["threads"] is not None and options["threads"] < 1:
+            raise CommandError("--threads must be positive")
+        if options["server"] == "asgi" and options["threads"] is not None:
+            raise CommandError("--threads only limits the WSGI server")
+        baseline = json.loads(options["compare"].read_text()) if options["compare"] else None
+
+        with serve(
+            options["url"], options["server"], options["threads"], options["query_delay"] / 1000
+        ) as url:
+            self.stdout.write(f"Logging in {client_count} clients to {url}")
+            clients = [
+                Client(url, f"user{n}@{EMAIL_DOMAIN}", options["password"], options["seed"] + n)
+                for n in range(1, client_count + 1)
+            ]
+            results = {
+                name: run(SCENARIOS[name], clients, requests)
+                for name in options["scenarios"] or SCENARIOS
+            }
+
+        report = {
+            "commit": git_commit(),
+            "created_at": timezone.now().isoformat(),
+            "url": options["url"],
+            "server": None if options["url"] else options["server"],
+            "threads": options["threads"],
+            "query_delay_ms": options["query_delay"],
+            "clients": client_count,
+            "requests": requests,
+            "results": results,
+        }
+        self._print(results, baseline["results"] if baseline else {})
+        if options["output"]:
+            options["output"].write_text(json.dumps(report, indent=2) + "\n")
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline and options["max_regression"] is not None:
+            regressions = [
+                name
+                for name, result in results.items()
+                if (change := p95_change(result, baseline["results"].get(name)))
+                and change > options["max_regression"]
+            ]
+            if regressions:
+                raise CommandError(f"p95 latency regressed: {', '.join(regressions)}")
+
+    def _print(self, results: dict[str, Any], baseline: dict[str, Any]) -> None:
+        self.stdout.write(
+            f"{'scenario':<18}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'queries':>9}{'cpu ms':>9}{'errors':>8}{'p95 vs base':>13}"
+        )
+        for name, result in results.items():
+            latency = result["latency_ms"]
+            queries = result["queries_per_request"]
+            cpu = result.get("cpu_ms_per_request")
+            change = p95_change(result, baseline.get(name))
+            self.stdout.write(
+                f"{name:<18}{result['rps']:>9.1f}{latency['p50']:>9.1f}{latency['p95']:>9.1f}"
+                f"{latency['p99']:>9.1f}{'-' if queries is None else f'{queries:.1f}':>9}"
+                f"{'-' if cpu is None else f'{cpu:.1f}':>9}"
+                f"{result['errors']:>8}{'' if change is None else f'{change:+.1f}%':>13}"
+            )
+
+
+def run(scenario: Callable[[Client], Request], clients: list[Client], requests: int) -> Any:
+    """Send `requests` requests spread over the clients, and summarize their timings."""
+    latencies: list[float] = []
+    queries: list[int] = []
+    cpu_times: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def work(client: Client, count: int) -> None:
+        nonlocal errors
+        for _ in range(count):
+            method, path, payload = scenario(client)
+            start = time.perf_counter()
+            status, _, query_count, cpu_time = client.send(method, path, payload)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed * 1000)
+                if query_count is not None:
+                    queries.append(query_count)
+                if cpu_time is not None:
+                    cpu_times.append(cpu_time)
+                if status >= 400:
+                    errors += 1
+
+    # Warm up the clients' connections and the server's caches
+    for client in clients:
+        client.send(*scenario(client))
+
+    counts = [len(share) for share in split(range(requests), len(clients))]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(len(clients)) as executor:
+        for future in [executor.submit(work, *args) for args in zip(clients, counts, strict=True)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "latency_ms": percentiles(latencies),
+        "queries_per_request": statistics.fmean(queries) if queries else None,
+        "cpu_ms_per_request": statistics.fmean(cpu_times) if cpu_times else None,
+    }
+
+
+def split(items: range, parts: int) -> list[range]:
+    """`items` in `parts` parts of (almost) equal size."""
+    size, extra = divmod(len(items), parts)
+    bounds = list(itertools.accumulate([0] + [size + (i < extra) for i in range(parts)]))
+    return [items[start:end] for start, end in itertools.pairwise(bounds)]
+
+
+def percentiles(latencies: list[float]) -> dict[str, float]:
+    if len(latencies) < 2:
+        latency = latencies[0] if latencies else 0.0
+        return dict.fromkeys(("mean", "p50", "p95", "p99", "max"), latency)
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "mean": statistics.fmean(latencies),
+        "p50": cuts[49],
+        "p95": cuts[94],
+        "p99": cuts[98],
+        "max": max(latencies),
+    }
+
+
+def p95_change(result: dict[str, Any], baseline: dict[str, Any] | None) -> float | None:
+    """Change of the p95 latency from the baseline, in percent."""
+    if not baseline or not baseline["latency_ms"]["p95"]:
+        return None
+    return float((result["latency_ms"]["p95"] / baseline["latency_ms"]["p95"] - 1) * 100)
+
+
+def git_commit() -> str | None:
+    """The checked out commit, to tell the results of different runs apart."""
+    try:
+        process = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True)
+    except OSError:
+        return None
+    return process.stdout.decode().strip() if process.returncode == 0 else None
+
+
+@contextmanager
+def serve(url: str | None, server: str, threads: int | None, query_delay: float) -> Iterator[str]:
+    """The URL of the server to benchmark, serving the app in a thread when none is given."""
+    if url:
+        yield url.rstrip("/")
+        return
+
+    if server == "asgi":
+        asgi_server = ASGIServer(count_queries_asgi(get_asgi_application(), query_delay))
+        with asgi_server.serving() as port:
+            yield f"http://127.0.0.1:{port}"
+        return
+
+    wsgi_server = ThreadedWSGIServer(("127.0.0.1", 0), QuietRequestHandler)
+    wsgi_server.set_app(count_queries(get_wsgi_application(), query_delay, threads))
+    thread = threading.Thread(target=wsgi_server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{wsgi_server.server_address[1]}"
+    finally:
+        wsgi_server.shutdown()
+        wsgi_server.server_close()
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class QueryCounter:
+    """An execute wrapper counting the queries, and delaying each by `delay` seconds."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.count = 0
+
+    def __call__(self, execute: Callable[..., Any], *args: Any) -> Any:
+        self.count += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return execute(*args)
+
+
+def count_queries(app: WSGIApplication, delay: float, threads: int | None) -> WSGIApplication:
+    """
+    Report the number of queries of each request in the `QUERIES_HEADER` response header, and the
+    CPU time of its thread in `CPU_HEADER`: that of a worker, without the clients'.
+    """
+    slots = threading.BoundedSemaphore(threads) if threads else contextlib.nullcontext()
+
+    def wrapper(environ: WSGIEnvironment, start_response: StartResponse) -> Any:
+        counter = QueryCounter(delay)
+        cpu_start = time.thread_time()
+
+        def counting_start_response(status: str, headers: list[tuple[str, str]], *args: Any) -> Any:
+            # Called once the view has run, the queries of the request are done
+            cpu = f"{(time.thread_time() - cpu_start) * 1000:.3f}"
+            headers = [*headers, (QUERIES_HEADER, str(counter.count)), (CPU_HEADER, cpu)]
+            return start_response(status, headers, *args)
+
+        with slots, wrapping_queries(counter):
+            return app(environ, counting_start_response)
+
+    return wrapper
+
+
+def count_queries_asgi(app: ASGIApplication, delay: float) -> ASGIApplication:
+    """
+    `count_queries()` for the ASGI app, without the CPU time: the sync code of a request runs in
+    threads shared with the others.
+    """
+
+    async def wrapper(scope: Scope, receive: Receive, send: Send) -> None:
+        counter = QueryCounter(delay)
+
+        async def counting_send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                header = (QUERIES_HEADER.encode(), str(counter.count).encode())
+                message = {**message, "headers": [*message.get("headers", []), header]}
+            await send(message)
+
+        with wrapping_queries(counter):
+            await app(scope, receive, counting_send)
+
+    return wrapper
+
+
+class ASGIServer:
+    """
+    Just enough of an HTTP/1.1 server to run the benchmark's requests through an ASGI app:
+    persistent connections, and request bodies with a `Content-Length`. The app's own server,
+    uvicorn, isn't a dependency of the project.
+    """
+
+    def __init__(self, app: ASGIApplication) -> None:
+        self.app = app
+        self.connections: dict[asyncio.StreamWriter, asyncio.Task[None] | None] = {}
+
+    @contextmanager
+    def serving(self) -> Iterator[int]:
+        """Serve in a thread, on the port given to the block."""
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(asyncio.start_server(self.handle, "127.0.0.1", 0))
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            yield server.sockets[0].getsockname()[1]
+        finally:
+            asyncio.run_coroutine_threadsafe(self.shutdown(server), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    async def shutdown(self, server: asyncio.Server) -> None:
+        """Stop serving and close the connections, in the loop's thread."""
+        server.close()
+        # Rather than cancelling the handlers, which Django's handler may swallow, their next
+        # read finds the connection closed. A request in progress still finishes.
+        for writer in self.connections:
+            writer.close()
+        handlers = {task for task in self.connections.values() if task is not None}
+        if handlers:
+            await asyncio.wait(handlers, timeout=5)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections[writer] = asyncio.current_task()
+        with contextlib.suppress(ConnectionError, asyncio.IncompleteReadError):
+            while request_line := await reader.readline():
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = []
+                while (line := await reader.readline()).strip():
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers.append((name.strip().lower().encode(), value.strip().encode()))
+                body = await reader.readexactly(int(dict(headers).get(b"content-length", 0)))
+                await self.respond(writer, method, target, headers, body)
+        writer.close()
+        del self.connections[writer]
+
+    async def respond(
+        self,
+        writer: asyncio.StreamWriter,
+        method: str,
+        target: str,
+        headers: list[tuple[bytes, bytes]],
+        body: bytes,
+    ) -> None:
+        path, _, query = target.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": unquote(path),
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": headers,
+            "client": writer.get_extra_info("peername")[:2],
+            "server": writer.get_extra_info("sockname")[:2],
+        }
+        # After the body, receiving blocks until the app stops listening for a disconnect
+        messages: asyncio.Queue[Message] = asyncio.Queue()
+        messages.put_nowait({"type": "http.request", "body": body, "more_body": False})
+        chunked = False
+
+        async def send(message: Message) -> None:
+            nonlocal chunked
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = message.get("headers", [])
+                chunked = all(name.lower() != b"content-length" for name, _ in response_headers)
+                if chunked:
+                    response_headers = [*response_headers, (b"transfer-encoding", b"chunked")]
+                lines = [f"HTTP/1.1 {status} {http.client.responses.get(status, '')}".encode()]
+                lines += [b"%s: %s" % header for header in response_headers]
+                writer.write(b"\r\n".join([*lines, b"", b""]))
+            elif message["type"] == "http.response.body":
+                content = message.get("body", b"")
+                if not chunked:
+                    writer.write(content)
+                    return
+                if content:
+                    writer.write(b"%x\r\n%s\r\n" % (len(content), content))
+                if not message.get("more_body"):
+                    writer.write(b"0\r\n\r\n")
+
+        await self.app(scope, messages.get, send)
+        await writer.drain()
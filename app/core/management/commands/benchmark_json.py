@@ -0,0 +1,100 @@
+"""Django management command to compare the JSON renderers and parsers on recipe lists."""
+
+import io
+import random
+import time
+from collections.abc import Callable
+from decimal import Decimal
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import HAS_ORJSON, FastJSONRenderer
+
+
+class Command(BaseCommand):
+    """Command that measures bytes/sec of rendering and parsing a recipe list page."""
+
+    help = "Compare the stdlib and orjson based JSON renderers and parsers on recipe lists"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--recipes",
+            type=int,
+            default=100,
+            help="Recipes per list page (default: 100)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=200,
+            help="Renders/parses per measurement (default: 200)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed of the generated recipes (default: 0)",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        repeat: int = options["repeat"]
+        page = recipe_page(options["recipes"], random.Random(options["seed"]))
+
+        if not HAS_ORJSON:
+            self.stdout.write("orjson is not installed, the fast renderer falls back to stdlib")
+
+        body = JSONRenderer().render(page)
+        if FastJSONRenderer().render(page) != body:
+            raise SystemExit("ERROR: The renderers' output differs")
+
+        self.stdout.write(f"{'operation':<24}{'bytes/sec':>16}{'per call':>14}")
+        for name, func in (
+            ("render stdlib", lambda: JSONRenderer().render(page)),
+            ("render fast", lambda: FastJSONRenderer().render(page)),
+            ("parse stdlib", lambda: JSONParser().parse(io.BytesIO(body))),
+            ("parse fast", lambda: FastJSONParser().parse(io.BytesIO(body))),
+        ):
+            elapsed = measure(func, repeat)
+            self.stdout.write(
+                f"{name:<24}{len(body) * repeat / elapsed:>16,.0f}"
+                f"{elapsed / repeat * 1e6:>12,.0f}us"
+            )
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    func()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return time.perf_counter() - start
+
+
+def recipe_page(count: int, rng: random.Random) -> dict[str, Any]:
+    """A recipe list page as `RecipeSerializer` and the cursor pagination render it."""
+
+    def attrs(kind: str) -> list[dict[str, Any]]:
+        ids = rng.sample(range(1, 10_000), rng.randint(0, 8))
+        return [{"id": id_, "name": f"{kind}-{id_}"} for id_ in ids]
+
+    results = [
+        {
+            "id": count - i,
+            "title": f"Recipe {i} with a reasonably descriptive title",
+            "time_minutes": rng.randint(1, 240),
+            # `DecimalField` renders as a string, a raw `Decimal` goes through the encoder
+            "price": str(Decimal(rng.randint(100, 10_000)) / 100),
+            "link": f"https://example.com/recipes/{i}",
+            "tags": attrs("tag"),
+            "ingredients": attrs("ingredient"),
+        }
+        for i in range(count)
+    ]
+    return {
+        "next": "http://localhost/api/recipe/recipes/?cursor=cD0xMjM0",
+        "previous": None,
+        "results": results,
+    }
@@ -0,0 +1,120 @@
+"""
+Django management command to delete the recipe image files no recipe refers to anymore.
+
+The files of `core.storage.ContentAddressedStorage` are shared by the recipes with the same
+image, so replacing or deleting an image leaves its file, and `ImageBlob` counts the references
+left. This deletes the files whose count has been 0 for `--grace-hours`, and which weren't
+saved again meanwhile: an upload of the same content finds the file stored and only refers to it
+once the recipe is saved.
+
+`--recount` first counts the references from `Recipe.image` again, for the writes that don't
+send signals (`QuerySet.update`, `bulk_create`) and the images stored before the counting.
+"""
+
+import os
+import time
+from datetime import timedelta
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from core.models import ImageBlob, Recipe
+from core.signals import image_deleted
+from core.storage import recipe_image_storage
+
+
+class Command(BaseCommand):
+    """Command that deletes the unreferenced recipe image files."""
+
+    help = "Delete the recipe image files no recipe has referred to for the grace period"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--grace-hours",
+            type=float,
+            default=24,
+            help="Hours a file stays unreferenced before it's deleted (default: 24)",
+        )
+        parser.add_argument(
+            "--recount",
+            action="store_true",
+            help="Count the references from the recipes again first",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the files to delete without deleting them",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows read or written per query (default: 1000)",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options["recount"]:
+            self.recount(options["batch_size"])
+
+        cutoff = timezone.now() - timedelta(hours=options["grace_hours"])
+        storage = recipe_image_storage()
+        unreferenced = ImageBlob.objects.filter(references=0, modified_at__lt=cutoff)
+        deleted = reclaimed = 0
+        for blob_id, name in unreferenced.values_list("id", "name").iterator(
+            chunk_size=options["batch_size"]
+        ):
+            with transaction.atomic():
+                # Referred to again, or collected by another run, since the query
+                blob = unreferenced.select_for_update().filter(id=blob_id).first()
+                if blob is None:
+                    continue
+                path = storage.path(name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    stat = None
+                if stat is not None and stat.st_mtime >= cutoff.timestamp():
+                    # Saved again by an upload whose recipe isn't saved yet
+                    continue
+                if not options["dry_run"]:
+                    blob.delete()
+                    if stat is not None:
+                        storage.delete(name)
+                    image_deleted.send(sender=Recipe, name=name)
+            deleted += 1
+            reclaimed += stat.st_size if stat is not None else 0
+
+        action = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{action} {deleted} files, {reclaimed} bytes"))
+
+    def recount(self, batch_size: int) -> None:
+        start = time.perf_counter()
+        counts = (
+            Recipe.objects.exclude(image__isnull=True)
+            .exclude(image="")
+            .values_list("image")
+            .annotate(references=Count("id"))
+            .order_by("image")
+        )
+        now = timezone.now()
+        with transaction.atomic():
+            ImageBlob.objects.filter(references__gt=0).update(references=0, modified_at=now)
+            batch = []
+            for name, references in counts.iterator(chunk_size=batch_size):
+                batch.append(ImageBlob(name=name, references=references, modified_at=now))
+                if len(batch) == batch_size:
+                    self._upsert(batch)
+                    batch = []
+            self._upsert(batch)
+        self.stdout.write(f"Counted the references in {time.perf_counter() - start:.1f}s")
+
+    def _upsert(self, blobs: list[ImageBlob]) -> None:
+        ImageBlob.objects.bulk_create(
+            blobs,
+            update_conflicts=True,
+            unique_fields=["name"],
+            update_fields=["references", "modified_at"],
+        )
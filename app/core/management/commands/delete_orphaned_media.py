@@ -0,0 +1,141 @@
+"""
+Django management command to delete the recipe media files no recipe refers to.
+
+Replacing an image or deleting a recipe, also with its user, leaves the image's file and its
+variants under `MEDIA_ROOT/recipe`, unless `RECIPE_IMAGE_DELETE_ON_REPLACE` is set. This walks
+that directory and looks the files up in `Recipe.image`, and in the `image_variants` of the recipe
+each variant is named after, a batch of files per query, so neither the files nor the recipes are
+ever all in memory. Files saved within `--grace-hours` are kept: an upload saves the image before
+its recipe, and the variants are written before they're listed on it.
+
+The temporary files of interrupted uploads are deleted too, as are the `ImageBlob` counts of the
+deleted images.
+"""
+
+import itertools
+import os
+import re
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, cast
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandParser
+from recipe.images import VARIANTS_DIR
+
+from core.models import ImageBlob, Recipe
+from core.signals import image_deleted
+
+MEDIA_DIR = "recipe"
+
+# `<image>-<width>w.<extension>`
+VARIANT_NAME = re.compile(r"(?P<image>.+)-\d+w\.\w+")
+
+type MediaFile = tuple[str, int]
+
+
+class Command(BaseCommand):
+    """Command that deletes the recipe images and variants no recipe refers to."""
+
+    help = "Delete the files under MEDIA_ROOT/recipe that no recipe refers to"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--grace-hours",
+            type=float,
+            default=24,
+            help="Keep the files saved within this many hours (default: 24)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the files to delete without deleting them",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Files looked up per query (default: 1000)",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        start = time.perf_counter()
+        cutoff = time.time() - options["grace_hours"] * 60 * 60
+        scanned = deleted = reclaimed = 0
+
+        for batch in itertools.batched(self.files(cutoff), options["batch_size"], strict=False):
+            scanned += len(batch)
+            referenced = self.referenced([name for name, _ in batch])
+            orphans = []
+            for name, size in batch:
+                if name in referenced:
+                    continue
+                if not options["dry_run"] and not self.delete(name, cutoff):
+                    continue
+                orphans.append(name)
+                reclaimed += size
+            if not options["dry_run"]:
+                ImageBlob.objects.filter(name__in=orphans).delete()
+            deleted += len(orphans)
+
+        action = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} {deleted} of {scanned} files older than the grace period, "
+                f"{reclaimed} bytes, in {time.perf_counter() - start:.1f}s"
+            )
+        )
+
+    def files(self, cutoff: float) -> Iterator[MediaFile]:
+        """The files under `MEDIA_ROOT/recipe` last modified before `cutoff`, and their sizes."""
+        root = Path(settings.MEDIA_ROOT)
+
+        def scan(directory: Path) -> Iterator[MediaFile]:
+            # `os.scandir` rather than `os.walk`, which lists each directory in memory
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        yield from scan(Path(entry.path))
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_mtime < cutoff:
+                        yield Path(entry.path).relative_to(root).as_posix(), stat.st_size
+
+        if (root / MEDIA_DIR).is_dir():
+            yield from scan(root / MEDIA_DIR)
+
+    def delete(self, name: str, cutoff: float) -> bool:
+        path = default_storage.path(name)
+        try:
+            if os.path.getmtime(path) >= cutoff:
+                # Saved again since the scan, by an upload of the same content
+                return False
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        directory, _, basename = name.rpartition("/")
+        if directory == MEDIA_DIR and not basename.startswith("."):
+            image_deleted.send(sender=Recipe, name=name)
+        return True
+
+    def referenced(self, names: list[str]) -> set[str]:
+        """Those of the files that are the image of a recipe, or one of its variants."""
+        images = set()
+        for name in names:
+            directory, _, basename = name.rpartition("/")
+            if directory == VARIANTS_DIR:
+                match = VARIANT_NAME.fullmatch(basename)
+                if match:
+                    images.add(f"{MEDIA_DIR}/{match['image']}")
+            elif not basename.startswith("."):
+                # Not the temporary file of an upload
+                images.add(name)
+
+        referenced: set[str] = set()
+        recipes = Recipe.objects.filter(image__in=images).values_list("image", "image_variants")
+        for image, variants in recipes.iterator():
+            referenced.add(cast(str, image))
+            referenced.update(variant["name"] for variant in variants)
+        return referenced
@@ -0,0 +1,60 @@
+"""
+Django management command to generate the resized variants of the recipe images.
+
+Uploads queue the generation of their variants in the process that received them, see
+`recipe.images`, so the generations still queued when a process stops are lost. This generates the
+variants of the images that have none, or of all the images with `--all`, for instance after
+changing `RECIPE_IMAGE_VARIANTS`. Those rewrite the variants of each image once, then list them on
+its other recipes.
+"""
+
+from typing import Any, cast
+
+from django.core.management.base import BaseCommand, CommandParser
+from recipe.images import generate_variants
+
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """Command that generates the missing variants of the recipe images."""
+
+    help = "Generate the resized variants of the recipe images that have none"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Generate the variants of all the images again",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Recipes read per query (default: 500)",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        recipes = Recipe.objects.exclude(image__isnull=True).exclude(image="")
+        if not options["all"]:
+            recipes = recipes.filter(image_variants=[])
+
+        generated = failed = 0
+        previous = None
+        # By image, the recipes with the same one follow each other
+        rows = recipes.order_by("image", "id").values_list("id", "image")
+        for recipe_id, image in rows.iterator(chunk_size=options["batch_size"]):
+            name = cast(str, image)
+            replace = options["all"] and name != previous
+            previous = name
+            try:
+                generate_variants(recipe_id, name, replace=replace)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Recipe {recipe_id}: {name}: {e}")
+            else:
+                generated += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated the variants of {generated} images, {failed} failed")
+        )
@@ -0,0 +1,287 @@
+"""
+Django management command to fill the database with a large, realistic looking dataset.
+
+The data is skewed like real usage: a few users own most of the recipes, and of a user's tags and
+ingredients a few are on most recipes while the rest are rare (Zipf distributed). Everything is
+written with bulk inserts, and the users share one password hash computed up front, so millions of
+rows take minutes rather than hours. The same `--seed` and counts produce the same data.
+"""
+
+import functools
+import itertools
+import random
+import time
+from collections.abc import Sequence
+from decimal import Decimal
+from typing import Any
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection, transaction
+from django.db.models import QuerySet
+
+from core.models import ContentVersion, Ingredient, Recipe, Tag, User
+
+# Seeded users are recognized, and replaced, by the domain of their email
+EMAIL_DOMAIN = "seed.example.com"
+
+ADJECTIVES = [
+    "Spicy", "Creamy", "Crispy", "Smoky", "Quick", "Rustic", "Classic", "Zesty", "Hearty",
+    "Golden", "Tangy", "Roasted", "Grilled", "Braised", "Sticky", "Fresh", "Lemony", "Garlicky",
+]  # fmt: skip
+MAINS = [
+    "Chicken", "Tofu", "Salmon", "Lentil", "Mushroom", "Pork", "Beef", "Chickpea", "Shrimp",
+    "Pumpkin", "Eggplant", "Noodle", "Rice", "Bean", "Potato", "Cauliflower", "Lamb", "Halloumi",
+]  # fmt: skip
+DISHES = [
+    "Curry", "Stew", "Salad", "Soup", "Tacos", "Bowl", "Pie", "Stir Fry", "Bake", "Risotto",
+    "Pasta", "Burger", "Skewers", "Wraps", "Traybake", "Chili", "Frittata", "Dumplings",
+]  # fmt: skip
+TAGS = [
+    "dinner", "vegetarian", "quick", "vegan", "lunch", "healthy", "comfort food", "breakfast",
+    "gluten free", "spicy", "meal prep", "dessert", "budget", "family", "one pot", "summer",
+    "winter", "party", "low carb", "high protein", "baking", "grill", "slow cooker", "kids",
+    "italian", "mexican", "indian", "thai", "japanese", "french", "greek", "korean", "brunch",
+    "snack", "side dish", "soup", "salad", "holiday", "picnic", "dairy free",
+]  # fmt: skip
+INGREDIENTS = [
+    "salt", "olive oil", "garlic", "onion", "black pepper", "butter", "eggs", "flour",
+    "sugar", "lemon", "tomato", "milk", "rice", "parsley", "cumin", "chili flakes", "ginger",
+    "soy sauce", "carrot", "potato", "chicken thighs", "cheddar", "parmesan", "basil",
+    "coriander", "paprika", "spinach", "bell pepper", "honey", "yogurt", "cream", "lime",
+    "chickpeas", "coconut milk", "mushrooms", "thyme", "oregano", "vinegar", "stock", "pasta",
+]  # fmt: skip
+# Exponent of the Zipf distributions, around 1 for most popularity rankings
+SKEW = 1.1
+# Weights of 0 to 6 tags on a recipe
+TAG_COUNT_WEIGHTS = [10, 20, 25, 20, 12, 8, 5]
+
+type Links = list[tuple[Recipe, list[int], list[int]]]
+
+
+class Command(BaseCommand):
+    """Command that bulk inserts seeded users, recipes, tags and ingredients."""
+
+    help = "Generate users with recipes, tags and ingredients, skewed like production data"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=100,
+            help="Users to create (default: 100)",
+        )
+        parser.add_argument(
+            "--recipes",
+            type=int,
+            default=10_000,
+            help="Recipes to create, spread over the users (default: 10000)",
+        )
+        parser.add_argument(
+            "--tags",
+            type=int,
+            default=60,
+            help="Tags per user (default: 60)",
+        )
+        parser.add_argument(
+            "--ingredients",
+            type=int,
+            default=300,
+            help="Ingredients per user (default: 300)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed, the same seed and counts produce the same data (default: 0)",
+        )
+        parser.add_argument(
+            "--password",
+            default="password",
+            help="Password of all the users (default: password)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Recipes inserted per transaction (default: 5000)",
+        )
+        parser.add_argument(
+            "--replace",
+            action="store_true",
+            help="Delete the previously seeded users and their data first",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        user_count: int = options["users"]
+        recipe_count: int = options["recipes"]
+        batch_size: int = options["batch_size"]
+        if min(user_count, recipe_count, options["tags"], options["ingredients"]) < 0:
+            raise CommandError("Counts can't be negative")
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive")
+        if recipe_count and not user_count:
+            raise CommandError("Recipes need users, pass --users")
+
+        seeded = User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}")
+        if options["replace"]:
+            delete_users(seeded)
+        elif seeded.exists():
+            raise CommandError("The database has seeded users, pass --replace to replace them")
+
+        start = time.perf_counter()
+        rng = random.Random(options["seed"])
+        tag_names = names(TAGS, options["tags"])
+        ingredient_names = names(INGREDIENTS, options["ingredients"])
+        # Hashing is deliberately slow, hash once for all the users
+        password = make_password(options["password"])
+
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                User(email=f"user{n}@{EMAIL_DOMAIN}", name=f"Seed User {n}", password=password)
+                for n in range(1, user_count + 1)
+            )
+            # Bulk inserts don't send `post_save`, which creates these
+            ContentVersion.objects.bulk_create(ContentVersion(user_id=user.id) for user in users)
+
+        created = 0
+        pending: Links = []
+        for user, count in zip(users, zipf_counts(rng, recipe_count, user_count), strict=True):
+            # Each user favors different tags and ingredients
+            tags = create_attrs(Tag, user, rng.sample(tag_names, len(tag_names)))
+            ingredients = create_attrs(
+                Ingredient, user, rng.sample(ingredient_names, len(ingredient_names))
+            )
+            for _ in range(count):
+                pending.append(
+                    (
+                        random_recipe(rng, user),
+                        zipf_sample(rng, tags, rng.choices(range(7), TAG_COUNT_WEIGHTS)[0]),
+                        zipf_sample(rng, ingredients, round(rng.lognormvariate(2, 0.4))),
+                    )
+                )
+                if len(pending) == batch_size:
+                    created += insert(pending)
+                    pending = []
+                    rate = created / (time.perf_counter() - start)
+                    self.stdout.write(f"{created:,} recipes created ({rate:,.0f} recipes/s)")
+        created += insert(pending)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {len(users):,} users and {created:,} recipes in {elapsed:.1f}s "
+                f"({created / elapsed:,.0f} recipes/s)"
+            )
+        )
+
+
+def names(base: Sequence[str], count: int) -> list[str]:
+    """`count` distinct names, the base names followed by numbered variants of them."""
+    variants = (f"{name} {n}" for n in itertools.count(2) for name in base)
+    return list(itertools.islice(itertools.chain(base, variants), count))
+
+
+@functools.cache
+def zipf_weights(count: int) -> list[float]:
+    """Cumulative weights of `count` items whose popularity falls off with their rank."""
+    return list(itertools.accumulate(1 / rank**SKEW for rank in range(1, count + 1)))
+
+
+def zipf_counts(rng: random.Random, total: int, count: int) -> list[int]:
+    """`total` split over `count` buckets in Zipf proportions, in random order."""
+    weights = zipf_weights(count)
+    counts = [0] * count
+    for index in rng.choices(range(count), cum_weights=weights, k=total):
+        counts[index] += 1
+    rng.shuffle(counts)
+    return counts
+
+
+def zipf_sample(rng: random.Random, ids: list[int], k: int) -> list[int]:
+    """Up to `k` distinct ids, the first ones the most likely."""
+    if not ids or k < 1:
+        return []
+    picked = rng.choices(ids, cum_weights=zipf_weights(len(ids)), k=k)
+    return list(dict.fromkeys(picked))
+
+
+def create_attrs[T: (Tag, Ingredient)](model: type[T], user: User, names: list[str]) -> list[int]:
+    """Ids of the user's tags or ingredients with the names, in the same order."""
+    created = model.objects.bulk_create(model(user_id=user.id, name=name) for name in names)
+    return [attr.id for attr in created]
+
+
+def random_recipe(rng: random.Random, user: User) -> Recipe:
+    title = f"{rng.choice(ADJECTIVES)} {rng.choice(MAINS)} {rng.choice(DISHES)}"
+    return Recipe(
+        user_id=user.id,
+        title=title,
+        description=f"{title}, serves {rng.randint(1, 8)}." if rng.random() < 0.7 else "",
+        # Mostly under an hour, a long tail of slow cooked ones
+        time_minutes=min(600, max(5, round(rng.lognormvariate(3.4, 0.6)))),
+        price=Decimal(rng.randint(100, 5000)) / 100,
+        link=f"https://example.com/recipes/{rng.getrandbits(32):08x}" if rng.random() < 0.4 else "",
+    )
+
+
+def delete_users(users: QuerySet[User]) -> None:
+    """
+    Delete the users with their data. The bulk of it goes first, with plain `DELETE` statements:
+    `QuerySet.delete()` would load every row and send `post_delete` for it, and there's no need to
+    version deleted content. Only the users themselves, and what's left, go through the collector.
+    """
+    quote = connection.ops.quote_name
+    user_ids, params = users.values("id").query.sql_with_params()
+    recipe_ids = (
+        f"SELECT {quote('id')} FROM {quote(Recipe._meta.db_table)} "
+        f"WHERE {quote('user_id')} IN ({user_ids})"
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        for field in ("tags", "ingredients"):
+            through = getattr(Recipe, field).through
+            cursor.execute(
+                f"DELETE FROM {quote(through._meta.db_table)} "
+                f"WHERE {quote('recipe_id')} IN ({recipe_ids})",
+                params,
+            )
+        for model in (Recipe, Tag, Ingredient):
+            cursor.execute(
+                f"DELETE FROM {quote(model._meta.db_table)} "
+                f"WHERE {quote('user_id')} IN ({user_ids})",
+                params,
+            )
+        users.delete()
+
+
+def insert(pending: Links) -> int:
+    """Insert the recipes and their links, return the number of recipes."""
+    if not pending:
+        return 0
+    with transaction.atomic():
+        recipes = Recipe.objects.bulk_create(recipe for recipe, _, _ in pending)
+        ids = [recipe.id for recipe in recipes]
+        link("tags", [(r, t) for r, (_, tags, _) in zip(ids, pending, strict=True) for t in tags])
+        link(
+            "ingredients",
+            [
+                (r, i)
+                for r, (_, _, ingredients) in zip(ids, pending, strict=True)
+                for i in ingredients
+            ],
+        )
+    return len(recipes)
+
+
+def link(field: str, rows: list[tuple[int, int]]) -> None:
+    # Plain rows, building a model instance per link costs more than inserting it. The
+    # recipes and tags/ingredients are new, so these need no signals or conflict handling.
+    descriptor = getattr(Recipe, field)
+    target = f"{descriptor.field.m2m_reverse_field_name()}_id"
+    quote = connection.ops.quote_name
+    sql = (
+        f"INSERT INTO {quote(descriptor.through._meta.db_table)} "
+        f"({quote('recipe_id')}, {quote(target)}) VALUES (%s, %s)"
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
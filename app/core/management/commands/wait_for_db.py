@@ -4,9 +4,10 @@ import time
 from typing import Any
 
 from django.core.management.base import BaseCommand, CommandParser
-from django.db import connections
 from django.db.utils import OperationalError
 
+from core.health import check_database
+
 
 class Command(BaseCommand):
     """Command that waits for database to be available before proceeding."""
@@ -36,7 +37,7 @@ class Command(BaseCommand):
 
         while time.time() - start < timeout:
             try:
-                connections["default"].ensure_connection()
+                check_database()
                 self.stdout.write(self.style.SUCCESS("Database is ready!"))
                 return
             except OperationalError as e:
@@ -0,0 +1,231 @@
+"""
+Request, database and cache metrics in the Prometheus text format, served at `/metrics`.
+
+`MetricsMiddleware` (see core.middleware) records every request in the process' `registry`:
+one lock acquisition and a few dict updates. Cache statistics are read from the caches when
+the metrics are collected.
+
+Gunicorn runs several worker processes, and a scrape reaches only one of them. With
+`METRICS["MULTIPROCESS_DIR"]` set, every process writes its samples to `<pid>.json` in that
+directory every `FLUSH_INTERVAL` seconds (and before serving `/metrics`), and `/metrics` serves
+the sum over the files. Counters of exited processes stay in the sum so that totals never
+decrease; gauges only count live processes. The directory must be emptied when the server
+starts, as `docker/entrypoint.sh` does.
+"""
+
+import atexit
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+from typing import Any, Protocol
+
+from django.conf import settings
+
+type Labels = tuple[tuple[str, str], ...]
+type Sample = tuple[str, Labels, float]
+
+# Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help), also the order of the exposition
+METRICS = {
+    "http_requests_total": ("counter", "Requests by view, method and status code"),
+    "http_request_duration_seconds": ("histogram", "Request latency by view and method"),
+    "db_queries_total": ("counter", "Database queries by view"),
+    "db_query_duration_seconds_total": ("counter", "Time spent in database queries by view"),
+    "token_auth_cache_hits_total": ("counter", "Token authentication cache hits"),
+    "token_auth_cache_misses_total": ("counter", "Token authentication cache misses"),
+    "token_auth_cache_evictions_total": ("counter", "Token authentication cache evictions"),
+    "token_auth_cache_entries": ("gauge", "Tokens in the authentication caches"),
+    "response_cache_hits_total": ("counter", "Recipe API response cache hits"),
+    "response_cache_misses_total": ("counter", "Recipe API response cache misses"),
+}
+
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+
+class SupportsStats(Protocol):
+    def stats(self) -> dict[str, Any]: ...
+
+
+class Registry:
+    """Thread-safe counters and latency histograms of one process."""
+
+    def __init__(self, directory: str | None, flush_interval: float) -> None:
+        self.directory = Path(directory) if directory else None
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters: defaultdict[tuple[str, Labels], float] = defaultdict(float)
+        # Per label set: the count of each bucket and of +Inf, then the sum
+        self._histograms: dict[tuple[str, Labels], list[float]] = {}
+        self._collectors: list[Callable[[], Iterable[Sample]]] = []
+        self._flusher_pid: int | None = None
+        self._flush_lock = threading.Lock()
+
+    def record_request(
+        self,
+        view: str,
+        method: str,
+        status: int,
+        duration: float,
+        queries: int,
+        query_duration: float,
+    ) -> None:
+        method = method if method in METHODS else "other"
+        labels: Labels = (("view", view), ("method", method))
+        view_labels: Labels = (("view", view),)
+        bucket = bisect.bisect_left(BUCKETS, duration)
+        with self._lock:
+            self._counters["http_requests_total", (*labels, ("status", str(status)))] += 1
+            self._counters["db_queries_total", view_labels] += queries
+            self._counters["db_query_duration_seconds_total", view_labels] += query_duration
+            histogram = self._histograms.get(("http_request_duration_seconds", labels))
+            if histogram is None:
+                histogram = [0.0] * (len(BUCKETS) + 2)
+                self._histograms["http_request_duration_seconds", labels] = histogram
+            histogram[bucket] += 1
+            histogram[-1] += duration
+        if self.directory is not None and self._flusher_pid != os.getpid():
+            self._start_flusher()
+
+    def register_cache(self, prefix: str, cache: SupportsStats) -> None:
+        """Export the hits, misses and, if counted, evictions and entries of a cache."""
+
+        def collect() -> Iterator[Sample]:
+            stats = cache.stats()
+            for stat in ("hits", "misses", "evictions"):
+                if stat in stats:
+                    yield f"{prefix}_{stat}_total", (), stats[stat]
+            if "entries" in stats:
+                yield f"{prefix}_entries", (), stats["entries"]
+
+        self._collectors.append(collect)
+
+    def samples(self) -> list[Sample]:
+        """This process' samples, histograms as their `_bucket`, `_sum` and `_count` samples."""
+        with self._lock:
+            samples: list[Sample] = [
+                (name, labels, v) for (name, labels), v in self._counters.items()
+            ]
+            histograms = [(key, list(counts)) for key, counts in self._histograms.items()]
+        for (name, labels), counts in histograms:
+            cumulative = 0.0
+            for bound, count in zip((*map(str, BUCKETS), "+Inf"), counts[:-1], strict=True):
+                cumulative += count
+                samples.append((f"{name}_bucket", (*labels, ("le", bound)), cumulative))
+            samples.append((f"{name}_sum", labels, counts[-1]))
+            samples.append((f"{name}_count", labels, cumulative))
+        for collect in self._collectors:
+            samples.extend(collect())
+        return samples
+
+    def collect(self) -> list[Sample]:
+        """The samples of all the processes sharing the directory, or of this one."""
+        if self.directory is None:
+            return self.samples()
+
+        self.flush()
+        totals: defaultdict[tuple[str, Labels], float] = defaultdict(float)
+        for path in self.directory.glob("*.json"):
+            try:
+                process = json.loads(path.read_text())
+            except OSError:
+                # Removed since listing. Files are replaced atomically, never read half written.
+                continue
+            alive = _is_alive(int(path.stem))
+            for name, labels, value in process:
+                if alive or not _is_gauge(name):
+                    totals[name, tuple((key, val) for key, val in labels)] += value
+        return [(name, labels, value) for (name, labels), value in totals.items()]
+
+    def flush(self) -> None:
+        """Write this process' samples for the other processes to read."""
+        assert self.directory is not None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        with self._flush_lock:
+            tmp.write_text(json.dumps(self.samples()))
+            tmp.replace(path)
+
+    def _start_flusher(self) -> None:
+        with self._lock:
+            # Threads don't survive a fork, each process starts its own
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_periodically, name="metrics-flush", daemon=True).start()
+        # Also write the last requests when the worker exits
+        atexit.register(self.flush)
+
+    def _flush_periodically(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            with contextlib.suppress(OSError):
+                self.flush()
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # Also when the signal isn't permitted, the process exists
+    except PermissionError:
+        pass
+    return True
+
+
+def _is_gauge(name: str) -> bool:
+    return METRICS.get(name, ("counter",))[0] == "gauge"
+
+
+def _family(name: str) -> str:
+    for suffix in ("_bucket", "_sum", "_count"):
+        family = name.removesuffix(suffix)
+        if family != name and METRICS.get(family, ("",))[0] == "histogram":
+            return family
+    return name
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def exposition(samples: Iterable[Sample]) -> str:
+    """The samples in the Prometheus text format."""
+    families: defaultdict[str, list[Sample]] = defaultdict(list)
+    for sample in samples:
+        families[_family(sample[0])].append(sample)
+
+    lines = []
+    for family in sorted(families, key=list(METRICS).index):
+        kind, help_text = METRICS[family]
+        lines += [f"# HELP {family} {help_text}", f"# TYPE {family} {kind}"]
+        for name, labels, value in sorted(families[family], key=_sort_key):
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels)
+            value_text = str(int(value)) if float(value).is_integer() else repr(float(value))
+            lines.append(
+                f"{name}{{{label_text}}} {value_text}" if labels else f"{name} {value_text}"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def _sort_key(sample: Sample) -> tuple[Any, ...]:
+    # Buckets in ascending order of their bound, after the other samples of the label set
+    name, labels, _ = sample
+    bound = dict(labels).get("le")
+    other = tuple(label for label in labels if label[0] != "le")
+    return (other, name, float(bound) if bound is not None else 0.0)
+
+
+registry = Registry(
+    directory=settings.METRICS["MULTIPROCESS_DIR"],
+    flush_interval=settings.METRICS["FLUSH_INTERVAL"],
+)
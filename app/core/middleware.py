@@ -0,0 +1,243 @@
+"""
+Request timing and metrics middleware.
+
+`ServerTimingMiddleware` times a sample of the requests (`SERVER_TIMING["SAMPLE_RATE"]`): the
+database queries and their count, serialization (`core.timing.TimedModelSerializer`), rendering
+and the whole request. The timings are sent in a `Server-Timing` header, shown by the browsers'
+developer tools, and/or logged as one `key=value` line to the `core.timing` logger.
+
+`MetricsMiddleware` counts every request, its latency and database queries in the Prometheus
+metrics (see core.metrics).
+
+Both go first in `MIDDLEWARE` so that their timings cover the other middleware, and both are
+async capable, so that under ASGI Django doesn't run each of them in a thread of its own.
+Streaming responses are timed until the response starts, not while the body is produced.
+
+`HealthCheckMiddleware` answers the liveness and readiness probes (see core.health) before
+them.
+"""
+
+import logging
+import random
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from typing import Any, cast
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpRequest, HttpResponseBase, HttpResponseNotAllowed, JsonResponse
+from django.template.response import SimpleTemplateResponse
+from django.utils.cache import add_never_cache_headers
+
+from core.health import readiness
+from core.metrics import registry
+from core.timing import Timings, current, recording, wrapping_queries
+
+logger = logging.getLogger("core.timing")
+
+# The next middleware or the view, a coroutine function when served by ASGI
+type GetResponse = Callable[[HttpRequest], HttpResponseBase | Awaitable[HttpResponseBase]]
+
+
+class SyncAndAsyncMiddleware(ABC):
+    """Base of the middleware, whose `__call__` returns a coroutine when served by ASGI."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: GetResponse) -> None:
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @abstractmethod
+    def __call__(self, request: HttpRequest) -> HttpResponseBase | Awaitable[HttpResponseBase]:
+        pass
+
+    def _response(self, request: HttpRequest) -> HttpResponseBase:
+        return cast(HttpResponseBase, self.get_response(request))
+
+    async def _aresponse(self, request: HttpRequest) -> HttpResponseBase:
+        return await cast(Awaitable[HttpResponseBase], self.get_response(request))
+
+
+class HealthCheckMiddleware(SyncAndAsyncMiddleware):
+    """
+    Answers `/healthz` and `/readyz` before any other middleware, so that probes skip the
+    sessions, authentication, CSRF and host validation, and aren't counted in the metrics.
+    """
+
+    def __call__(self, request: HttpRequest) -> HttpResponseBase | Awaitable[HttpResponseBase]:
+        if request.path_info not in ("/healthz", "/readyz"):
+            return self.get_response(request)
+        if self.async_mode:
+            return self.__acall__(request)
+        checks = readiness.results() if request.path_info == "/readyz" else {}
+        return self._probe(request, checks)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        checks = {}
+        if request.path_info == "/readyz":
+            # Running the checks, or waiting for another request running them, blocks
+            checks = readiness.cached() or await sync_to_async(readiness.results)()
+        return self._probe(request, checks)
+
+    def _probe(self, request: HttpRequest, checks: dict[str, bool]) -> HttpResponseBase:
+        if request.method not in ("GET", "HEAD"):
+            return HttpResponseNotAllowed(["GET", "HEAD"])
+        ok = all(checks.values())
+        response = JsonResponse(
+            {
+                "status": "ok" if ok else "unavailable",
+                "checks": {name: "ok" if passed else "failed" for name, passed in checks.items()},
+            },
+            status=200 if ok else 503,
+        )
+        add_never_cache_headers(response)
+        return response
+
+
+class ServerTimingMiddleware(SyncAndAsyncMiddleware):
+    def __call__(self, request: HttpRequest) -> HttpResponseBase | Awaitable[HttpResponseBase]:
+        if self.async_mode:
+            return self.__acall__(request)
+
+        timings = self._sample()
+        if timings is None:
+            return self._response(request)
+        with self._recording(timings):
+            response = self._response(request)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        timings = self._sample()
+        if timings is None:
+            return await self._aresponse(request)
+        with self._recording(timings):
+            response = await self._aresponse(request)
+        return self._finish(request, response, timings)
+
+    def _sample(self) -> Timings | None:
+        rate = settings.SERVER_TIMING["SAMPLE_RATE"]
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return None
+        return Timings()
+
+    @contextmanager
+    def _recording(self, timings: Timings) -> Iterator[None]:
+        start = time.perf_counter()
+        with recording(timings), wrapping_queries(timings):
+            yield
+        timings.add("total", time.perf_counter() - start)
+
+    def _finish(
+        self, request: HttpRequest, response: HttpResponseBase, timings: Timings
+    ) -> HttpResponseBase:
+        config = settings.SERVER_TIMING
+        if config["HEADER"]:
+            response["Server-Timing"] = server_timing(timings)
+        if config["LOG"]:
+            self._log(request, response, timings)
+        return response
+
+    def process_template_response(
+        self, request: HttpRequest, response: SimpleTemplateResponse
+    ) -> SimpleTemplateResponse:
+        # DRF responses are rendered after this, the last hook before that
+        timings = current()
+        if timings is not None:
+            start = time.perf_counter()
+            response.add_post_render_callback(
+                lambda _: timings.add("render", time.perf_counter() - start)
+            )
+        return response
+
+    def _log(self, request: HttpRequest, response: HttpResponseBase, timings: Timings) -> None:
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": timings.queries,
+        } | {
+            f"{name}_ms": round(duration * 1000, 2) for name, duration in timings.durations.items()
+        }
+        logger.info(
+            " ".join(f"{key}={value}" for key, value in fields.items()),
+            extra={"timings": fields},
+        )
+
+
+class MetricsMiddleware(SyncAndAsyncMiddleware):
+    def __call__(self, request: HttpRequest) -> HttpResponseBase | Awaitable[HttpResponseBase]:
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.METRICS["ENABLED"]:
+            return self._response(request)
+
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with wrapping_queries(queries):
+            response = self._response(request)
+        self._record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        if not settings.METRICS["ENABLED"]:
+            return await self._aresponse(request)
+
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with wrapping_queries(queries):
+            response = await self._aresponse(request)
+        self._record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    def _record(
+        self,
+        request: HttpRequest,
+        response: HttpResponseBase,
+        duration: float,
+        queries: QueryCounter,
+    ) -> None:
+        # The view name rather than the path, which would be a label per recipe
+        match = request.resolver_match
+        registry.record_request(
+            match.view_name if match else "unmatched",
+            request.method or "",
+            response.status_code,
+            duration,
+            queries.count,
+            queries.duration,
+        )
+
+
+class QueryCounter:
+    """An execute wrapper counting the queries and their time, see `wrapping_queries()`."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(
+        self, execute: Callable[..., Any], sql: str, params: Any, many: bool, context: Any
+    ) -> Any:
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+def server_timing(timings: Timings) -> str:
+    """The `Server-Timing` header value, durations in milliseconds."""
+    metrics = []
+    for name, duration in timings.durations.items():
+        metric = f"{name};dur={duration * 1000:.2f}"
+        if name == "db":
+            metric += f';desc="{timings.queries} queries"'
+        metrics.append(metric)
+    return ", ".join(metrics)
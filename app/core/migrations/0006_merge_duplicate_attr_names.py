@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:26
+
+from django.db import migrations, models
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """
+    Merge each user's tags/ingredients that share a name into the oldest one, so that the
+    unique constraints can be added. Recipes linked to a duplicate are relinked to the survivor.
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field).through
+        target = f'{model_name.lower()}_id'
+
+        duplicates = (
+            model.objects.values('user_id', 'name')
+            .annotate(keep=models.Min('id'), count=models.Count('id'))
+            .filter(count__gt=1)
+        )
+        for group in duplicates.iterator():
+            others = model.objects.filter(user_id=group['user_id'], name=group['name']).exclude(
+                id=group['keep']
+            )
+            other_ids = list(others.values_list('id', flat=True))
+            linked = through.objects.filter(**{f'{target}__in': other_ids})
+            already = set(
+                through.objects.filter(**{target: group['keep']}).values_list('recipe_id', flat=True)
+            )
+            through.objects.bulk_create(
+                [
+                    through(recipe_id=recipe_id, **{target: group['keep']})
+                    for recipe_id in set(linked.values_list('recipe_id', flat=True)) - already
+                ]
+            )
+            linked.delete()
+            others.delete()
+
+
+class Migration(migrations.Migration):
+    # Apart from the constraints (see 0007): on PostgreSQL the deleted rows leave deferred
+    # foreign key checks pending until the transaction commits, and ALTER TABLE fails on those.
+
+    dependencies = [
+        ('core', '0005_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:34
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_content_versions(apps, schema_editor):
+    User = apps.get_model('core', 'User')
+    ContentVersion = apps.get_model('core', 'ContentVersion')
+    ContentVersion.objects.bulk_create(
+        ContentVersion(user_id=user_id) for user_id in User.objects.values_list('id', flat=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_indexes_unique_attr_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('modified_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='modified_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(create_content_versions, migrations.RunPython.noop),
+    ]
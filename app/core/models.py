@@ -7,8 +7,11 @@ from typing import Any
 from django.conf import settings
 from django.contrib.auth.base_user import AbstractBaseUser, BaseUserManager
 from django.contrib.auth.models import PermissionsMixin
-from django.db import models
-from django.db.models import ManyToManyField
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, ManyToManyField
+from django.utils import timezone
+
+from core.storage import recipe_image_storage
 
 
 # Why there's no circular dependency although the two classes refer to each other?
@@ -62,7 +65,24 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     tags: ManyToManyField[Tag, Any] = models.ManyToManyField("Tag")
     ingredients: ManyToManyField[Ingredient, Any] = models.ManyToManyField("Ingredient")
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # Stored once per distinct content, see core.storage. Indexed for the media collectors, which
+    # look the files up by name.
+    image = models.ImageField(
+        null=True, upload_to=recipe_image_file_path, storage=recipe_image_storage, db_index=True
+    )
+    # Resized copies of the image, `{"width", "format", "name"}` each, see recipe.images
+    image_variants = models.JSONField(default=list, blank=True)
+    # Also bumped when the recipe's tags/ingredients change, see core.signals
+    modified_at = models.DateTimeField(auto_now=True)
+
+    # The name of the image when loaded or last saved, set by core.signals
+    _loaded_image: str | None
+
+    class Meta:
+        indexes = [
+            # Recipes are always listed per user, newest first
+            models.Index(fields=["user", "-id"], name="core_recipe_user_id_desc_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -72,6 +92,12 @@ class Tag(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
 
+    class Meta:
+        constraints = [
+            # Also the (user, name) index for name lookups and ordering
+            models.UniqueConstraint(fields=["user", "name"], name="core_tag_unique_user_name"),
+        ]
+
     def __str__(self) -> str:
         return self.name
 
@@ -80,5 +106,92 @@ class Ingredient(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            # Also the (user, name) index for name lookups and ordering
+            models.UniqueConstraint(
+                fields=["user", "name"], name="core_ingredient_unique_user_name"
+            ),
+        ]
+
     def __str__(self) -> str:
         return self.name
+
+
+class ContentVersion(models.Model):
+    """
+    Version of a user's recipes, tags and ingredients as a whole, bumped on every write
+    (see core.signals). Lets list endpoints answer conditional GETs with one primary key lookup.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True
+    )
+    version = models.PositiveBigIntegerField(default=0)
+    modified_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def bump(cls, user_id: int) -> None:
+        now = timezone.now()
+        if cls.objects.filter(user_id=user_id).update(version=F("version") + 1, modified_at=now):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, version=1, modified_at=now)
+        except IntegrityError:
+            # Created concurrently
+            cls.objects.filter(user_id=user_id).update(version=F("version") + 1, modified_at=now)
+
+
+class RecipeImport(models.Model):
+    """
+    Progress of `manage.py import_recipes` through a file, committed with each chunk of
+    imported recipes so that an interrupted import resumes where it stopped.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Absolute path of the imported file
+    source = models.CharField(max_length=1024)
+    # Bytes of the file imported so far, and their SHA-256 to detect a changed file
+    offset = models.PositiveBigIntegerField(default=0)
+    digest = models.CharField(max_length=64, blank=True)
+    rows = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "source"], name="core_recipeimport_unique_user_source"
+            ),
+        ]
+
+
+class ImageBlob(models.Model):
+    """
+    A file of `core.storage.ContentAddressedStorage` and the number of recipes whose image it is,
+    kept by `core.signals`. `manage.py collect_image_blobs` deletes the files no recipe has
+    referred to for a while, and recounts the references.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    references = models.PositiveIntegerField(default=0)
+    # When `references` last changed
+    modified_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def reference(cls, name: str) -> None:
+        now = timezone.now()
+        if cls.objects.filter(name=name).update(references=F("references") + 1, modified_at=now):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(name=name, references=1, modified_at=now)
+        except IntegrityError:
+            # Created concurrently
+            cls.objects.filter(name=name).update(references=F("references") + 1, modified_at=now)
+
+    @classmethod
+    def release(cls, name: str) -> None:
+        cls.objects.filter(name=name, references__gt=0).update(
+            references=F("references") - 1, modified_at=timezone.now()
+        )
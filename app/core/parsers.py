@@ -0,0 +1,51 @@
+"""
+JSON parser backed by orjson, when it's installed; DRF's `JSONParser` otherwise.
+
+orjson only reads UTF-8, requests declaring another charset are parsed by `JSONParser`.
+Like `JSONParser` with the default `STRICT_JSON`, `NaN` and `Infinity` are rejected.
+"""
+
+from __future__ import annotations
+
+import codecs
+from collections.abc import Mapping
+from typing import IO, Any
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from core.renderers import FastJSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    # Only an error for mypy when orjson is installed
+    orjson = None  # type: ignore[assignment, unused-ignore]
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(
+        self,
+        stream: IO[Any],
+        media_type: str | None = None,
+        parser_context: Mapping[str, Any] | None = None,
+    ) -> Any:
+        if orjson is None or not self.strict or not _is_utf8(parser_context or {}):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}") from exc
+
+
+def _is_utf8(parser_context: Mapping[str, Any]) -> bool:
+    # The request's charset, like `JSONParser` uses
+    encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+    try:
+        return codecs.lookup(encoding).name == "utf-8"
+    except LookupError:
+        return False
@@ -0,0 +1,54 @@
+"""
+JSON renderer backed by orjson, when it's installed.
+
+`FastJSONRenderer` produces the same bytes as DRF's `JSONRenderer` for the default compact,
+unicode output: values orjson doesn't handle natively (`Decimal`, lazy translation strings,
+`timedelta`, querysets) and datetimes, which orjson would format differently, go through DRF's
+`JSONEncoder.default`. Output orjson can't produce the same way (indented, ASCII only or with
+spaced separators) and data it rejects (e.g. integers over 64 bits) is rendered by `JSONRenderer`.
+Without orjson it's `JSONRenderer`.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    # Only an error for mypy when orjson is installed
+    orjson = None  # type: ignore[assignment, unused-ignore]
+
+HAS_ORJSON = orjson is not None
+
+
+class FastJSONRenderer(JSONRenderer):
+    # Dict keys that aren't strings are converted like `json.dumps` does, e.g. the
+    # index-keyed errors of list fields.
+    options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(
+        self,
+        data: Any,
+        accepted_media_type: str | None = None,
+        renderer_context: Mapping[str, Any] | None = None,
+    ) -> bytes:
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type or "", renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret: bytes = orjson.dumps(
+                data, default=self.encoder_class().default, option=self.options
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Like `JSONRenderer`, escape these to keep the output a strict JavaScript subset
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
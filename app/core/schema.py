@@ -0,0 +1,67 @@
+"""
+The OpenAPI schema, generated once rather than on every request.
+
+drf-spectacular introspects every view and serializer to generate the schema, some 40 ms per
+request to `/api/schema/`. `schema_cache` keeps it in memory instead, each format rendered once
+with an `ETag` of its content. The schema is read from `settings.API_SCHEMA_FILE` when the file
+exists, as `docker/entrypoint.sh` writes it at startup with `manage.py spectacular`, so that the
+worker processes don't each generate it; otherwise the first request of the process does.
+
+The schema only changes with the code, so nothing invalidates it but a deploy, which restarts
+the processes and rewrites the file.
+"""
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Any, cast
+
+from django.conf import settings
+from django.utils.http import quote_etag
+from drf_spectacular.settings import spectacular_settings
+from rest_framework.renderers import BaseRenderer
+
+
+def generate_schema() -> dict[str, Any]:
+    """The schema as `manage.py spectacular` generates it, with all the endpoints."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema: dict[str, Any] = generator.get_schema(request=None, public=True)
+    return schema
+
+
+class SchemaCache:
+    """The schema of the process, and its renderings with their ETags."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._schema: dict[str, Any] | None = None
+        self._rendered: dict[str, tuple[bytes, str]] = {}
+
+    def schema(self) -> dict[str, Any]:
+        with self._lock:
+            if self._schema is None:
+                path = settings.API_SCHEMA_FILE
+                if path and Path(path).exists():
+                    self._schema = json.loads(Path(path).read_text())
+                else:
+                    self._schema = generate_schema()
+            return self._schema
+
+    def rendered(self, renderer: BaseRenderer) -> tuple[bytes, str]:
+        """The schema rendered by the renderer, and its ETag."""
+        key = f"{renderer.media_type}:{renderer.format}"
+        rendered = self._rendered.get(key)
+        if rendered is None:
+            content = cast(bytes, renderer.render(self.schema(), renderer_context={}))
+            etag = quote_etag(hashlib.md5(content, usedforsecurity=False).hexdigest())
+            rendered = self._rendered[key] = content, etag
+        return rendered
+
+    def clear(self) -> None:
+        with self._lock:
+            self._schema = None
+            self._rendered.clear()
+
+
+schema_cache = SchemaCache()
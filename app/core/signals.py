@@ -0,0 +1,209 @@
+"""
+Keep `ContentVersion` and `Recipe.modified_at` current for conditional GETs.
+
+Any write to a user's recipes, tags or ingredients bumps the user's `ContentVersion`. A recipe's
+`modified_at` is also touched when its links change, or when a linked tag or ingredient is
+renamed or deleted, since those change the recipe's representation.
+
+Bulk writes (`bulk_create`, `bulk_update`, `QuerySet.update`) don't send signals; code using
+them must call `content_changed` itself.
+
+A single request can fire several of these signals (saving a recipe, then setting its tags and
+ingredients). Inside `batched_content_changes()` they're collected and written once on exit.
+
+Saving a recipe with another image, or deleting it, also counts the references to its images in
+`ImageBlob`. `manage.py collect_image_blobs --recount` corrects the counts after bulk writes.
+With `RECIPE_IMAGE_DELETE_ON_REPLACE`, the file of the previous image is also deleted once
+committed, unless another recipe has the same image or the file was saved within
+`RECENTLY_SAVED_SECONDS`, possibly for a recipe being saved. Those are left to
+`manage.py delete_orphaned_media`. The files derived from a deleted image's file, its variants
+and transformations, are deleted by recipe.signals on `image_deleted`.
+"""
+
+import contextlib
+import os
+import time
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from typing import Any
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Model
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from core.models import ContentVersion, ImageBlob, Ingredient, Recipe, Tag, User
+from core.storage import recipe_image_storage
+
+RECENTLY_SAVED_SECONDS = 10 * 60
+
+# Sent with the `name` of a recipe image once its file is deleted, here or by the commands
+# collecting the files
+image_deleted = Signal()
+
+# user id -> ids of the recipes to touch, while batching
+_pending: ContextVar[dict[int, set[int]] | None] = ContextVar(
+    "pending_content_changes", default=None
+)
+
+
+def content_changed(user_id: int, recipe_ids: Iterable[int] = ()) -> None:
+    """Bump the user's content version and touch `modified_at` of the given recipes."""
+    pending = _pending.get()
+    if pending is not None:
+        pending[user_id].update(recipe_ids)
+        return
+
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        Recipe.objects.filter(id__in=recipe_ids).update(modified_at=timezone.now())
+    ContentVersion.bump(user_id)
+
+
+@contextmanager
+def batched_content_changes() -> Iterator[None]:
+    """Collect `content_changed` calls and apply them together when the block exits."""
+    if _pending.get() is not None:
+        # Already batching, the outermost block writes
+        yield
+        return
+
+    pending: dict[int, set[int]] = defaultdict(set)
+    token = _pending.set(pending)
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+    for user_id, recipe_ids in pending.items():
+        content_changed(user_id, recipe_ids)
+
+
+def _deleting_user(origin: Any) -> bool:
+    # Everything of a deleted user goes away with it, there's nothing left to version.
+    model = getattr(origin, "model", type(origin))
+    return model is User
+
+
+def _linked_recipe_ids(attr: Tag | Ingredient) -> list[int]:
+    recipes = attr.recipe_set.all()  # type: ignore[union-attr]
+    return list(recipes.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender: type[User], instance: User, created: bool, **kwargs: Any) -> None:
+    # Created up front, so that bumping it is always a single `UPDATE`
+    if created:
+        ContentVersion.objects.create(user=instance)
+
+
+def _image_name(recipe: Recipe) -> str | None:
+    # Not from `recipe.image`, which would load the image if it's deferred
+    image = recipe.__dict__.get("image")
+    return getattr(image, "name", image) or None
+
+
+@receiver(post_init, sender=Recipe)
+def recipe_loaded(sender: type[Recipe], instance: Recipe, **kwargs: Any) -> None:
+    # The image as loaded, to tell on save whether it changed
+    instance._loaded_image = _image_name(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(
+    sender: type[Recipe],
+    instance: Recipe,
+    update_fields: frozenset[str] | None,
+    **kwargs: Any,
+) -> None:
+    content_changed(instance.user_id)
+
+    if "image" not in instance.__dict__ or (update_fields and "image" not in update_fields):
+        # Deferred or not saved, unchanged
+        return
+    loaded, image = instance._loaded_image, _image_name(instance)
+    if image != loaded:
+        if image:
+            ImageBlob.reference(image)
+        if loaded:
+            _release_image(loaded)
+        instance._loaded_image = image
+
+
+def _release_image(name: str) -> None:
+    ImageBlob.release(name)
+    if settings.RECIPE_IMAGE_DELETE_ON_REPLACE:
+        transaction.on_commit(partial(_delete_unreferenced_image, name))
+
+
+def _delete_unreferenced_image(name: str) -> None:
+    storage = recipe_image_storage()
+    with contextlib.suppress(FileNotFoundError):
+        if time.time() - os.path.getmtime(storage.path(name)) < RECENTLY_SAVED_SECONDS:
+            return
+    if Recipe.objects.filter(image=name).exists():
+        return
+    storage.delete(name)
+    ImageBlob.objects.filter(name=name).delete()
+    image_deleted.send(sender=Recipe, name=name)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def content_deleted(
+    sender: type[Model], instance: Recipe | Tag | Ingredient, **kwargs: Any
+) -> None:
+    if isinstance(instance, Recipe):
+        # Also when the user is deleted, the files outlive the recipes
+        image = _image_name(instance)
+        if image:
+            _release_image(image)
+    if not _deleting_user(kwargs.get("origin")):
+        content_changed(instance.user_id)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def attr_saved(sender: type[Model], instance: Tag | Ingredient, **kwargs: Any) -> None:
+    content_changed(instance.user_id, _linked_recipe_ids(instance))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def attr_deleting(sender: type[Model], instance: Tag | Ingredient, **kwargs: Any) -> None:
+    # The links are gone by `post_delete`, touch the linked recipes while they're still known.
+    if not _deleting_user(kwargs.get("origin")):
+        recipe_ids = _linked_recipe_ids(instance)
+        if recipe_ids:
+            content_changed(instance.user_id, recipe_ids)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def links_changed(
+    sender: type[Model],
+    instance: Recipe | Tag | Ingredient,
+    action: str,
+    reverse: bool,
+    pk_set: set[int] | None,
+    **kwargs: Any,
+) -> None:
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if action == "post_add" and not pk_set:
+        return
+
+    if not reverse:
+        # `instance` is the recipe
+        recipe_ids: Iterable[int] = [instance.pk]
+    elif action == "pre_clear":
+        recipe_ids = _linked_recipe_ids(instance)  # type: ignore[arg-type]
+    else:
+        recipe_ids = pk_set or ()
+
+    content_changed(instance.user_id, recipe_ids)
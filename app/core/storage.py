@@ -0,0 +1,64 @@
+"""
+Content-addressed storage of the recipe images, each distinct image stored once.
+
+A file is saved under the SHA-256 of its content, in the directory and with the extension of the
+name it was given: the same photo uploaded to a thousand recipes is written once, and they all
+refer to `recipe/<digest>.jpg`. `ImageBlob` counts the recipes referring to each file, and
+`manage.py collect_image_blobs` deletes the files no recipe has referred to for a while.
+"""
+
+import contextlib
+import hashlib
+import os
+import posixpath
+import tempfile
+from typing import Any
+
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible(path="core.storage.ContentAddressedStorage")
+class ContentAddressedStorage(FileSystemStorage):
+    """A `FileSystemStorage` naming the files after the SHA-256 of their content."""
+
+    def get_available_name(self, name: str, max_length: int | None = None) -> str:
+        # The name is replaced by that of the content in `_save`, taken or not
+        return name
+
+    def _save(self, name: str, content: File[Any]) -> str:
+        directory, basename = posixpath.split(name)
+        extension = posixpath.splitext(basename)[1].lower()
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+
+        # Hashed while copied next to the final path, the content is read once
+        digest = hashlib.sha256()
+        fd, temp = tempfile.mkstemp(dir=full_directory, prefix=".", suffix=".upload")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    file.write(chunk)
+            name = posixpath.join(directory, f"{digest.hexdigest()}{extension}")
+            path = self.path(name)
+            try:
+                # Stored already, and from now on exempt from collection for the grace period
+                os.utime(path)
+            except FileNotFoundError:
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp, self.file_permissions_mode)
+                os.replace(temp, path)
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp)
+        return name
+
+
+_recipe_image_storage = ContentAddressedStorage()
+
+
+def recipe_image_storage() -> ContentAddressedStorage:
+    """The storage of `Recipe.image`, under `MEDIA_ROOT` like the default storage."""
+    return _recipe_image_storage
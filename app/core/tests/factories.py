@@ -5,9 +5,12 @@ from typing import Any
 import factory
 from django.db import models
 from factory.django import DjangoModelFactory
+from faker import Faker
 
 from core.models import Ingredient, Recipe, Tag, User
 
+fake = Faker()
+
 
 class BaseFactory[T: models.Model](DjangoModelFactory[T]):
     """Base factory with common utilities for all model factories."""
@@ -111,12 +114,14 @@ class TagFactory(BaseFactory[Tag]):
         model = Tag
 
     user = factory.SubFactory(UserFactory)
-    name = factory.Faker("word")
+    # Names are unique per user, suffix the word so that batches don't collide
+    name = factory.Sequence(lambda n: f"{fake.word()}-{n}")
 
 
 class IngredientFactory(BaseFactory[Ingredient]):
     class Meta:
         model = Ingredient
 
-    name = factory.Faker("word")
+    # Names are unique per user, suffix the word so that batches don't collide
+    name = factory.Sequence(lambda n: f"{fake.word()}-{n}")
     user = factory.SubFactory(UserFactory)
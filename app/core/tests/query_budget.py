@@ -0,0 +1,30 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    TestCase with an upper-bound query assertion.
+
+    `assertNumQueries` pins an exact count, which breaks whenever an unrelated query is added
+    or removed. A budget only fails when a code path gets more expensive, and the captured
+    context lets a test compare the cost of two runs (e.g. 2 vs. 20 rows) to prove it's constant.
+    """
+
+    @contextmanager
+    def assertMaxQueries(
+        self, budget: int, using: str = DEFAULT_DB_ALIAS
+    ) -> Iterator[CaptureQueriesContext]:
+        with CaptureQueriesContext(connections[using]) as ctx:
+            yield ctx
+
+        executed = len(ctx.captured_queries)
+        if executed > budget:
+            queries = "\n".join(
+                f"{i}. {query['sql']}" for i, query in enumerate(ctx.captured_queries, start=1)
+            )
+            self.fail(f"{executed} queries executed, budget is {budget}\n{queries}")
@@ -0,0 +1,168 @@
+from http import HTTPStatus
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import CachedCredentials, TokenCache, token_cache
+from core.models import User as CustomUser
+from core.tests.factories import UserFactory
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    api_client: APIClient
+    me_url: str
+    user: CustomUser
+    token: Token
+
+    @classmethod
+    def setUpTestData(cls: type[CachedTokenAuthenticationTests]) -> None:
+        cls.me_url = reverse("user:me")
+
+    def setUp(self) -> None:
+        token_cache.clear()
+        self.user = UserFactory.create()
+        self.token = Token.objects.create(user=self.user)
+        self.api_client = APIClient()
+        self.api_client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def tearDown(self) -> None:
+        token_cache.clear()
+
+    def test_second_request_served_from_cache(self) -> None:
+        with self.assertNumQueries(1):
+            res = self.api_client.get(self.me_url)
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+
+        with self.assertNumQueries(0):
+            res = self.api_client.get(self.me_url)
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.assertEqual(res.data["email"], self.user.email)
+
+        stats = token_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_invalid_token_not_cached(self) -> None:
+        self.api_client.credentials(HTTP_AUTHORIZATION="Token invalid")
+
+        res = self.api_client.get(self.me_url)
+
+        self.assertEqual(res.status_code, HTTPStatus.UNAUTHORIZED)
+        self.assertEqual(token_cache.stats()["entries"], 0)
+
+    def test_deactivated_user_evicted(self) -> None:
+        self.api_client.get(self.me_url)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.api_client.get(self.me_url)
+
+        self.assertEqual(res.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_password_change_evicts(self) -> None:
+        self.api_client.get(self.me_url)
+
+        res = self.api_client.patch(self.me_url, {"password": "new-password"})
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.assertEqual(token_cache.stats()["entries"], 0)
+
+    def test_deleted_token_evicted(self) -> None:
+        self.api_client.get(self.me_url)
+        self.token.delete()
+
+        res = self.api_client.get(self.me_url)
+
+        self.assertEqual(res.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_deleted_user_evicted(self) -> None:
+        self.api_client.get(self.me_url)
+        self.user.delete()
+
+        res = self.api_client.get(self.me_url)
+
+        self.assertEqual(res.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_update_does_not_modify_cached_user(self) -> None:
+        self.api_client.get(self.me_url)
+        original_name = self.user.name
+
+        # Skip the write, and with it the signal that would evict the cache entry
+        with patch("core.models.User.save"):
+            res = self.api_client.patch(self.me_url, {"name": "New name"})
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        credentials = token_cache.get(self.token.key)
+        assert credentials is not None
+        self.assertEqual(credentials[0]["name"], original_name)
+
+    def test_password_hash_not_cached(self) -> None:
+        self.api_client.get(self.me_url)
+
+        credentials = token_cache.get(self.token.key)
+        assert credentials is not None
+        self.assertEqual(credentials[0]["email"], self.user.email)
+        self.assertNotIn("password", credentials[0])
+
+    def test_update_keeps_password(self) -> None:
+        self.api_client.get(self.me_url)
+
+        res = self.api_client.patch(self.me_url, {"name": "New name"})
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        # Saved without the deferred password hash, which is unchanged
+        password = self.user.password
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.name, self.user.password), ("New name", password))
+
+
+class TokenCacheTests(TestCase):
+    credentials: CachedCredentials
+
+    @classmethod
+    def setUpTestData(cls: type[TokenCacheTests]) -> None:
+        cls.credentials = ({"id": 1, "email": "user@example.com"}, timezone.now())
+
+    def test_lru_eviction(self) -> None:
+        cache = TokenCache(max_entries=2, ttl=60)
+        cache.set("a", self.credentials)
+        cache.set("b", self.credentials)
+        # Touch "a" so that "b" is the least recently used
+        cache.get("a")
+        cache.set("c", self.credentials)
+
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    @patch("core.authentication.time.monotonic")
+    def test_ttl_expiry(self, mock_monotonic: MagicMock) -> None:
+        cache = TokenCache(max_entries=2, ttl=30)
+        mock_monotonic.return_value = 100.0
+        cache.set("a", self.credentials)
+
+        mock_monotonic.return_value = 129.0
+        self.assertIsNotNone(cache.get("a"))
+        mock_monotonic.return_value = 130.0
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_shared_cache_backing(self) -> None:
+        writer = TokenCache(max_entries=2, ttl=30, cache_alias="default")
+        reader = TokenCache(max_entries=2, ttl=30, cache_alias="default")
+        writer.set("a", self.credentials)
+
+        credentials = reader.get("a")
+
+        assert credentials is not None
+        self.assertEqual(credentials, self.credentials)
+        self.assertEqual(reader.stats()["hits"], 1)
+
+        writer.evict("a")
+        reader.evict("a")
+        self.assertIsNone(reader.get("a"))
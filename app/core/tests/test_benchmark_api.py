@@ -0,0 +1,109 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from typing import Any
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import LiveServerTestCase, SimpleTestCase
+
+from core.management.commands.benchmark_api import percentiles, split
+
+
+class BenchmarkApiCommandTests(LiveServerTestCase):
+    def setUp(self) -> None:
+        call_command("seed_data", "--users=2", "--recipes=40", stdout=StringIO())
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.output = Path(tmp.name) / "results.json"
+
+    def _benchmark(self, *args: str) -> str:
+        out = StringIO()
+        call_command(
+            "benchmark_api",
+            "--clients=2",
+            "--requests=6",
+            "--scenario=recipe-list",
+            "--scenario=recipe-detail",
+            f"--output={self.output}",
+            *args,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def _results(self) -> Any:
+        return json.loads(self.output.read_text())
+
+    def test_in_process_server(self) -> None:
+        out = self._benchmark()
+
+        self.assertIn("recipe-detail", out)
+        report = self._results()
+        self.assertEqual(list(report["results"]), ["recipe-list", "recipe-detail"])
+        for result in report["results"].values():
+            self.assertEqual(result["count"], 6)
+            self.assertEqual(result["errors"], 0)
+            self.assertGreater(result["rps"], 0)
+            self.assertLessEqual(result["latency_ms"]["p50"], result["latency_ms"]["p99"])
+            self.assertGreater(result["queries_per_request"], 0)
+            self.assertGreater(result["cpu_ms_per_request"], 0)
+
+    def test_asgi_server(self) -> None:
+        self._benchmark("--server=asgi", "--query-delay=1")
+
+        report = self._results()
+        self.assertEqual(report["server"], "asgi")
+        for result in report["results"].values():
+            self.assertEqual(result["errors"], 0)
+            self.assertGreater(result["queries_per_request"], 0)
+
+    def test_threads(self) -> None:
+        self._benchmark("--threads=1")
+
+        self.assertEqual(self._results()["threads"], 1)
+        with self.assertRaisesMessage(CommandError, "WSGI"):
+            self._benchmark("--server=asgi", "--threads=1")
+
+    def test_url(self) -> None:
+        self._benchmark(f"--url={self.live_server_url}", "--scenario=me")
+
+        results = self._results()["results"]
+        self.assertEqual(results["me"]["errors"], 0)
+        # Only the in-process server counts queries and CPU time
+        self.assertIsNone(results["me"]["queries_per_request"])
+        self.assertIsNone(results["me"]["cpu_ms_per_request"])
+
+    def test_compare(self) -> None:
+        self._benchmark()
+        baseline = self._results()
+        for result in baseline["results"].values():
+            result["latency_ms"]["p95"] = 1e-6
+        baseline_path = self.output.with_name("baseline.json")
+        baseline_path.write_text(json.dumps(baseline))
+
+        out = self._benchmark(f"--compare={baseline_path}")
+        self.assertIn("%", out)
+        with self.assertRaisesMessage(CommandError, "recipe-list, recipe-detail"):
+            self._benchmark(f"--compare={baseline_path}", "--max-regression=50")
+
+    def test_unknown_password(self) -> None:
+        with self.assertRaisesMessage(CommandError, "seed_data"):
+            self._benchmark("--password=wrong")
+
+
+class BenchmarkHelperTests(SimpleTestCase):
+    def test_percentiles(self) -> None:
+        latencies = [float(ms) for ms in range(1, 101)]
+
+        result = percentiles(latencies)
+
+        self.assertEqual(result["p50"], 50.5)
+        self.assertAlmostEqual(result["p95"], 95.05)
+        self.assertAlmostEqual(result["p99"], 99.01)
+        self.assertEqual(result["max"], 100)
+        self.assertEqual(percentiles([3.0])["p99"], 3.0)
+
+    def test_split(self) -> None:
+        self.assertEqual([len(part) for part in split(range(10), 3)], [4, 3, 3])
+        self.assertEqual([len(part) for part in split(range(2), 3)], [1, 1, 0])
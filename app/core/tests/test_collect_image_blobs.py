@@ -0,0 +1,133 @@
+import os
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from PIL import Image
+
+from core.models import ImageBlob, Recipe
+from core.storage import recipe_image_storage
+from core.tests.factories import RecipeFactory, UserFactory
+
+
+def save_photo(recipe: Recipe, color: str, name: str = "photo.jpg") -> str:
+    """Save a photo as the recipe's image, and return the image's name."""
+    buffer = BytesIO()
+    Image.new("RGB", (30, 20), color).save(buffer, "JPEG")
+    recipe.image.save(name, ContentFile(buffer.getvalue()))
+    return str(recipe.image.name)
+
+
+def save_transform(name: str) -> Path:
+    """A transformation of the image, as recipe.transforms caches it."""
+    path = Path(settings.MEDIA_ROOT, "transforms", "320", f"{name}.webp")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"data")
+    return path
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self) -> None:
+        self.user = UserFactory.create()
+        self.storage = recipe_image_storage()
+
+    def _delete(self, *names: str) -> None:
+        for name in set(names):
+            self.storage.delete(name)
+
+    def test_stored_once(self) -> None:
+        recipes = RecipeFactory.create_batch(3, user=self.user)
+        names = {save_photo(recipe, "red", "photo.JPG") for recipe in recipes}
+        other = save_photo(RecipeFactory.create(user=self.user), "blue")
+        self.addCleanup(self._delete, *names, other)
+
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertRegex(name, r"^recipe/[0-9a-f]{64}\.jpg$")
+        self.assertNotEqual(other, name)
+        self.assertEqual(os.listdir(self.storage.path("recipe")).count(name[7:]), 1)
+        self.assertEqual(ImageBlob.objects.get(name=name).references, 3)
+        self.assertEqual(ImageBlob.objects.get(name=other).references, 1)
+        # No temporary file left
+        self.assertFalse(any(n.startswith(".") for n in os.listdir(self.storage.path("recipe"))))
+
+    def test_references_released(self) -> None:
+        recipes = RecipeFactory.create_batch(3, user=self.user)
+        name = [save_photo(recipe, "red") for recipe in recipes][0]
+        self.addCleanup(self._delete, name, "recipe/other.jpg")
+
+        recipes[0].delete()
+        recipes[1].image = "recipe/other.jpg"
+        recipes[1].save()
+        # Loaded again, unchanged
+        Recipe.objects.get(id=recipes[2].id).save()
+
+        self.assertEqual(ImageBlob.objects.get(name=name).references, 1)
+        self.assertEqual(ImageBlob.objects.get(name="recipe/other.jpg").references, 1)
+        recipes[2].user.delete()
+        self.assertEqual(ImageBlob.objects.get(name=name).references, 0)
+
+
+class CollectImageBlobsCommandTests(TestCase):
+    def setUp(self) -> None:
+        self.storage = recipe_image_storage()
+        self.recipe = RecipeFactory.create(user=UserFactory.create())
+        self.kept = save_photo(self.recipe, "red")
+        self.image = save_photo(self.recipe, "blue")
+        self.addCleanup(self.storage.delete, self.kept)
+        self.addCleanup(self.storage.delete, self.image)
+        self.hour_ago = time.time() - 3600
+
+    def _collect(self, *args: str) -> str:
+        out = StringIO()
+        call_command("collect_image_blobs", *args, stdout=out)
+        return out.getvalue()
+
+    def _age(self, name: str) -> None:
+        ImageBlob.objects.filter(name=name).update(modified_at=timezone.now() - timedelta(hours=1))
+        os.utime(self.storage.path(name), (self.hour_ago, self.hour_ago))
+
+    def test_unreferenced_collected(self) -> None:
+        released = self.kept
+        self._age(released)
+        size = self.storage.size(released)
+        transform = save_transform(released)
+
+        self.assertIn("Would delete 1 files", self._collect("--grace-hours=0.5", "--dry-run"))
+        self.assertTrue(self.storage.exists(released))
+        self.assertTrue(transform.exists())
+
+        out = self._collect("--grace-hours=0.5")
+
+        self.assertIn(f"Deleted 1 files, {size} bytes", out)
+        self.assertFalse(self.storage.exists(released))
+        self.assertFalse(ImageBlob.objects.filter(name=released).exists())
+        self.assertFalse(transform.exists())
+        self.assertTrue(self.storage.exists(self.image))
+
+    def test_grace_period(self) -> None:
+        self.assertIn("Deleted 0 files", self._collect())
+
+        # Uploaded again, for a recipe not saved yet
+        ImageBlob.objects.filter(name=self.kept).update(
+            modified_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertIn("Deleted 0 files", self._collect("--grace-hours=0.5"))
+        self.assertTrue(self.storage.exists(self.kept))
+
+    def test_recount(self) -> None:
+        # Writes without signals
+        Recipe.objects.filter(id=self.recipe.id).update(image=self.kept)
+        RecipeFactory.create(user=self.recipe.user, image=self.kept)
+        ImageBlob.objects.all().delete()
+
+        out = self._collect("--recount", "--batch-size=1")
+
+        self.assertIn("Counted the references", out)
+        self.assertEqual(dict(ImageBlob.objects.values_list("name", "references")), {self.kept: 2})
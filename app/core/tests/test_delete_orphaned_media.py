@@ -0,0 +1,167 @@
+import os
+import time
+from io import BytesIO, StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from core.models import ImageBlob, Recipe
+from core.tests.factories import RecipeFactory, UserFactory
+
+
+def save_photo(recipe: Recipe, color: str) -> str:
+    buffer = BytesIO()
+    Image.new("RGB", (30, 20), color).save(buffer, "JPEG")
+    recipe.image.save("photo.jpg", ContentFile(buffer.getvalue()))
+    return str(recipe.image.name)
+
+
+def save_file(name: str, content: bytes = b"data") -> str:
+    return default_storage.save(name, ContentFile(content))
+
+
+def age(*names: str) -> None:
+    day_ago = time.time() - 24 * 60 * 60
+    for name in names:
+        os.utime(default_storage.path(name), (day_ago, day_ago))
+
+
+def save_transform(name: str) -> Path:
+    """A transformation of the image, as recipe.transforms caches it."""
+    path = Path(settings.MEDIA_ROOT, "transforms", "320", f"{name}.webp")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"data")
+    return path
+
+
+class DeleteOrphanedMediaCommandTests(TestCase):
+    def setUp(self) -> None:
+        self.recipe = RecipeFactory.create(user=UserFactory.create())
+        self.replaced = save_photo(self.recipe, "red")
+        self.image = save_photo(self.recipe, "blue")
+        image_name = self.image.rpartition("/")[2]
+        self.variant = save_file(f"recipe/variants/{image_name}-320w.webp")
+        self.recipe.image_variants = [{"width": 320, "format": "webp", "name": self.variant}]
+        self.recipe.save()
+        self.stale_variant = save_file(f"recipe/variants/{image_name}-640w.webp")
+        self.upload = save_file("recipe/.interrupted.upload")
+        self.names = [self.replaced, self.image, self.variant, self.stale_variant, self.upload]
+        for name in self.names:
+            self.addCleanup(default_storage.delete, name)
+
+    def _delete(self, *args: str) -> str:
+        out = StringIO()
+        call_command("delete_orphaned_media", "--batch-size=2", *args, stdout=out)
+        return out.getvalue()
+
+    def test_orphans_deleted(self) -> None:
+        age(*self.names)
+        replaced_transform, transform = save_transform(self.replaced), save_transform(self.image)
+        self.addCleanup(transform.unlink)
+        orphans = [self.replaced, self.stale_variant, self.upload]
+        size = sum(default_storage.size(name) for name in orphans)
+
+        out = self._delete()
+
+        self.assertIn(f"Deleted 3 of 5 files older than the grace period, {size} bytes", out)
+        self.assertEqual(
+            [default_storage.exists(name) for name in self.names],
+            [False, True, True, False, False],
+        )
+        self.assertFalse(replaced_transform.exists())
+        self.assertTrue(transform.exists())
+        self.assertFalse(ImageBlob.objects.filter(name=self.replaced).exists())
+        self.assertTrue(ImageBlob.objects.filter(name=self.image).exists())
+
+    def test_dry_run(self) -> None:
+        age(*self.names)
+
+        out = self._delete("--dry-run")
+
+        self.assertIn("Would delete 3 of 5 files", out)
+        self.assertTrue(all(default_storage.exists(name) for name in self.names))
+
+    def test_grace_period(self) -> None:
+        age(self.replaced)
+
+        self.assertIn("Deleted 1 of 1 files", self._delete())
+        self.assertIn("Deleted 0 of 0 files", self._delete("--grace-hours=48"))
+        self.assertTrue(default_storage.exists(self.stale_variant))
+
+    def test_deleted_recipe(self) -> None:
+        age(*self.names)
+        self.recipe.user.delete()
+
+        self._delete()
+
+        # The variants go with the image's file, before the walk reaches them
+        self.assertFalse(any(default_storage.exists(name) for name in self.names))
+
+
+@override_settings(RECIPE_IMAGE_DELETE_ON_REPLACE=True)
+class DeleteOnReplaceTests(TestCase):
+    def setUp(self) -> None:
+        self.user = UserFactory.create()
+        self.recipe = RecipeFactory.create(user=self.user)
+
+    def _replace(self, color: str) -> str:
+        with self.captureOnCommitCallbacks(execute=True):
+            name = save_photo(self.recipe, color)
+        self.addCleanup(default_storage.delete, name)
+        return name
+
+    def test_replaced_image_deleted(self) -> None:
+        first = self._replace("red")
+        age(first)
+        transform = save_transform(first)
+
+        self._replace("blue")
+
+        self.assertFalse(default_storage.exists(first))
+        self.assertFalse(ImageBlob.objects.filter(name=first).exists())
+        self.assertFalse(transform.exists())
+
+    def test_shared_image_kept(self) -> None:
+        first = self._replace("red")
+        age(first)
+        variant = save_file(f"recipe/variants/{first.rpartition('/')[2]}-320w.webp")
+        self.addCleanup(default_storage.delete, variant)
+        save_photo(RecipeFactory.create(user=self.user), "red")
+
+        self._replace("blue")
+
+        self.assertTrue(default_storage.exists(first))
+        self.assertTrue(default_storage.exists(variant))
+
+    def test_recently_saved_image_kept(self) -> None:
+        first = self._replace("red")
+
+        self._replace("blue")
+
+        self.assertTrue(default_storage.exists(first))
+
+    def test_deleted_recipe(self) -> None:
+        image = self._replace("red")
+        age(image)
+        variant = save_file(f"recipe/variants/{image.rpartition('/')[2]}-320w.webp")
+        self.addCleanup(default_storage.delete, variant)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+
+        self.assertFalse(default_storage.exists(image))
+        self.assertFalse(default_storage.exists(variant))
+
+    @override_settings(RECIPE_IMAGE_DELETE_ON_REPLACE=False)
+    def test_disabled(self) -> None:
+        first = self._replace("red")
+        age(first)
+
+        self._replace("blue")
+
+        self.assertTrue(default_storage.exists(first))
@@ -0,0 +1,73 @@
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from recipe.images import encode
+
+from core.models import Recipe
+from core.tests.factories import RecipeFactory, UserFactory
+
+VARIANTS = {"WIDTHS": [100], "FORMATS": ["webp"], "QUALITY": 80, "WORKERS": 0}
+
+
+@override_settings(RECIPE_IMAGE_VARIANTS=VARIANTS)
+class GenerateImageVariantsCommandTests(TestCase):
+    def setUp(self) -> None:
+        user = UserFactory.create()
+        self.recipes = RecipeFactory.create_batch(3, user=user)
+        for recipe, color in zip(self.recipes[:2], ["red", "blue"], strict=True):
+            buffer = BytesIO()
+            Image.new("RGB", (300, 200), color).save(buffer, "JPEG")
+            recipe.image.save("photo.jpg", ContentFile(buffer.getvalue()))
+        self.addCleanup(self._delete_files)
+
+    def _delete_files(self) -> None:
+        for recipe in Recipe.objects.all():
+            for variant in recipe.image_variants:
+                default_storage.delete(variant["name"])
+            if recipe.image:
+                recipe.image.delete()
+
+    def _generate(self, *args: str) -> str:
+        out = StringIO()
+        call_command("generate_image_variants", "--batch-size=1", *args, stdout=out)
+        return out.getvalue()
+
+    def test_missing_variants_generated(self) -> None:
+        out = self._generate()
+
+        self.assertIn("Generated the variants of 2 images, 0 failed", out)
+        variants = [recipe.image_variants for recipe in Recipe.objects.order_by("id")]
+        self.assertEqual([len(v) for v in variants], [1, 1, 0])
+        self.assertTrue(default_storage.exists(variants[0][0]["name"]))
+        # Only the images without variants, unless all are asked for
+        self.assertIn("of 0 images", self._generate())
+        self.assertIn("of 2 images", self._generate("--all"))
+
+    def test_all_rewrites_shared_variants_once(self) -> None:
+        image = self.recipes[0].image.name
+        Recipe.objects.filter(pk=self.recipes[2].pk).update(image=image)
+
+        with mock.patch("recipe.images.encode", wraps=encode) as encoded:
+            out = self._generate("--all")
+
+        self.assertIn("of 3 images", out)
+        self.assertEqual(encoded.call_count, 2)
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipes[2].pk).image_variants,
+            Recipe.objects.get(pk=self.recipes[0].pk).image_variants,
+        )
+
+    def test_failure_reported(self) -> None:
+        # Not saved, the recipe still lists the image
+        self.recipes[0].image.delete(save=False)
+        out, err = StringIO(), StringIO()
+
+        call_command("generate_image_variants", stdout=out, stderr=err)
+
+        self.assertIn("of 1 images, 1 failed", out.getvalue())
+        self.assertIn(f"Recipe {self.recipes[0].id}", err.getvalue())
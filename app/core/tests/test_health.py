@@ -0,0 +1,101 @@
+import os
+from http import HTTPStatus
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.health import CheckFailed, check_migrations, check_storage, readiness
+from core.metrics import registry
+
+
+class HealthCheckTests(TestCase):
+    def setUp(self) -> None:
+        readiness.clear()
+        self.addCleanup(readiness.clear)
+
+    def test_liveness(self) -> None:
+        with self.assertNumQueries(0):
+            res = self.client.get("/healthz")
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.assertEqual(res.json(), {"status": "ok", "checks": {}})
+        self.assertIn("no-store", res["Cache-Control"])
+
+    def test_readiness(self) -> None:
+        res = self.client.get("/readyz")
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            res.json(),
+            {
+                "status": "ok",
+                "checks": {"database": "ok", "migrations": "ok", "storage": "ok"},
+            },
+        )
+
+    def test_results_cached(self) -> None:
+        self.client.get("/readyz")
+
+        with self.assertNumQueries(0):
+            self.client.get("/readyz")
+        with (
+            override_settings(HEALTH_CHECKS={"CACHE_SECONDS": 0}),
+            CaptureQueriesContext(connection) as queries,
+        ):
+            self.client.get("/readyz")
+        self.assertEqual(queries[0]["sql"], "SELECT 1")
+
+    def test_failed_check(self) -> None:
+        def unreachable() -> None:
+            raise CheckFailed("unreachable")
+
+        with (
+            mock.patch.dict(readiness.checks, {"database": unreachable}),
+            self.assertLogs("core.health", "WARNING") as logs,
+        ):
+            res = self.client.get("/readyz")
+
+        self.assertEqual(res.status_code, HTTPStatus.SERVICE_UNAVAILABLE)
+        self.assertEqual(res.json()["status"], "unavailable")
+        self.assertEqual(res.json()["checks"]["database"], "failed")
+        self.assertEqual(res.json()["checks"]["storage"], "ok")
+        self.assertIn("unreachable", logs.output[0])
+        # Liveness depends on no dependency
+        self.assertEqual(self.client.get("/healthz").status_code, HTTPStatus.OK)
+
+    def test_middleware_bypassed(self) -> None:
+        before = registry.samples()
+
+        res = self.client.get("/healthz", headers={"host": "not-allowed.example"})
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, res.cookies)
+        self.assertNotIn("Server-Timing", res)
+        self.assertEqual(registry.samples(), before)
+
+    def test_method_not_allowed(self) -> None:
+        res = self.client.post("/readyz")
+
+        self.assertEqual(res.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+
+    def test_unapplied_migrations(self) -> None:
+        with (
+            mock.patch.object(MigrationExecutor, "migration_plan", return_value=[mock.Mock()]),
+            self.assertRaisesMessage(CheckFailed, "1 migrations not applied"),
+        ):
+            check_migrations()
+
+    def test_storage_check_leaves_no_file(self) -> None:
+        check_storage()
+
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, ".health")), [])
+
+    async def test_async(self) -> None:
+        res = await self.async_client.get("/readyz")
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.assertEqual(res.json()["status"], "ok")
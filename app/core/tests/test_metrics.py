@@ -0,0 +1,160 @@
+import json
+import os
+import re
+import subprocess
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.metrics import BUCKETS, Registry, exposition
+from core.models import User as CustomUser
+from core.tests.factories import RecipeFactory, UserFactory
+
+
+def sample(text: str, name: str, **labels: str) -> float:
+    """The value of the sample with the name and (at least) the labels, 0 if there's none."""
+    for line in text.splitlines():
+        match = re.fullmatch(r"(\w+)(?:\{(.*)\})? (\S+)", line)
+        if not match or match[1] != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match[2] or ""))
+        if labels.items() <= found.items():
+            return float(match[3])
+    return 0.0
+
+
+class MetricsEndpointTests(TestCase):
+    api_client: APIClient
+    user: CustomUser
+
+    @classmethod
+    def setUpTestData(cls: type[MetricsEndpointTests]) -> None:
+        cls.api_client = APIClient()
+        cls.user = UserFactory.create()
+        cls.api_client.force_authenticate(cls.user)
+
+    def _metrics(self) -> str:
+        res = self.client.get(reverse("metrics"))
+        self.assertEqual(res["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        return res.content.decode()
+
+    def test_requests(self) -> None:
+        RecipeFactory.create(user=self.user)
+        view = "recipe:recipe-list"
+        before = self._metrics()
+
+        self.api_client.get(reverse(view))
+        self.api_client.get(reverse(view))
+        self.client.get("/nowhere/")
+
+        after = self._metrics()
+
+        def added(name: str, **labels: str) -> float:
+            return sample(after, name, **labels) - sample(before, name, **labels)
+
+        self.assertEqual(added("http_requests_total", view=view, method="GET", status="200"), 2)
+        self.assertEqual(added("http_request_duration_seconds_count", view=view, method="GET"), 2)
+        self.assertEqual(
+            added("http_request_duration_seconds_bucket", view=view, method="GET", le="+Inf"), 2
+        )
+        self.assertGreater(added("db_queries_total", view=view), 0)
+        self.assertEqual(added("http_requests_total", view="unmatched", status="404"), 1)
+
+    def test_cache_stats(self) -> None:
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        client = APIClient()
+        token = Token.objects.create(user=self.user)
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        client.get(reverse("user:me"))
+        client.get(reverse("user:me"))
+
+        text = self._metrics()
+        self.assertEqual(sample(text, "token_auth_cache_hits_total"), 1)
+        self.assertEqual(sample(text, "token_auth_cache_misses_total"), 1)
+        self.assertEqual(sample(text, "token_auth_cache_entries"), 1)
+        self.assertIn("# TYPE response_cache_hits_total counter", text)
+
+    def test_post_not_allowed(self) -> None:
+        self.assertEqual(self.client.post(reverse("metrics")).status_code, 405)
+
+    def test_disabled(self) -> None:
+        before = self._metrics()
+
+        with override_settings(METRICS={"ENABLED": False}):
+            self.client.get("/nowhere/")
+
+        after = self._metrics()
+        self.assertEqual(
+            sample(after, "http_requests_total", view="unmatched"),
+            sample(before, "http_requests_total", view="unmatched"),
+        )
+
+
+class RegistryTests(SimpleTestCase):
+    def test_histogram(self) -> None:
+        metrics = Registry(directory=None, flush_interval=5)
+
+        for duration in (0.001, BUCKETS[1], 0.3, 60):
+            metrics.record_request("view", "GET", 200, duration, 2, 0.001)
+        metrics.record_request("view", "BREW", 418, 0.001, 0, 0)
+
+        text = exposition(metrics.samples())
+        labels = {"view": "view", "method": "GET"}
+        buckets = {"0.005": 1, "0.01": 2, "0.25": 2, "0.5": 3, "10.0": 3, "+Inf": 4}
+        for bound, count in buckets.items():
+            with self.subTest(le=bound):
+                self.assertEqual(
+                    sample(text, "http_request_duration_seconds_bucket", **labels, le=bound), count
+                )
+        self.assertAlmostEqual(sample(text, "http_request_duration_seconds_sum", **labels), 60.311)
+        self.assertEqual(sample(text, "db_queries_total", view="view"), 8)
+        self.assertEqual(sample(text, "http_requests_total", method="other", status="418"), 1)
+        self.assertEqual(text.count("# TYPE http_request_duration_seconds histogram"), 1)
+
+    def test_exposition(self) -> None:
+        text = exposition(
+            [
+                ("http_requests_total", (("view", 'a"b\\c\nd'),), 12345678),
+                ("token_auth_cache_entries", (), 0.5),
+            ]
+        )
+
+        self.assertEqual(
+            text,
+            "# HELP http_requests_total Requests by view, method and status code\n"
+            "# TYPE http_requests_total counter\n"
+            'http_requests_total{view="a\\"b\\\\c\\nd"} 12345678\n'
+            "# HELP token_auth_cache_entries Tokens in the authentication caches\n"
+            "# TYPE token_auth_cache_entries gauge\n"
+            "token_auth_cache_entries 0.5\n",
+        )
+
+    def test_multiprocess(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        directory = Path(tmp.name)
+        metrics = Registry(directory=tmp.name, flush_interval=3600)
+        metrics.record_request("view", "GET", 200, 0.01, 1, 0.001)
+        other = [
+            ["http_requests_total", [["view", "view"], ["method", "GET"], ["status", "200"]], 2],
+            ["token_auth_cache_entries", [], 3],
+        ]
+        # Samples of a live process, and of one that has exited
+        (directory / f"{os.getppid()}.json").write_text(json.dumps(other))
+        exited = subprocess.Popen(["true"])
+        exited.wait()
+        (directory / f"{exited.pid}.json").write_text(json.dumps(other))
+
+        text = exposition(metrics.collect())
+
+        # Counters of exited processes are kept, their gauges dropped
+        self.assertEqual(sample(text, "http_requests_total", view="view"), 5)
+        self.assertEqual(sample(text, "token_auth_cache_entries"), 3)
+        self.assertTrue((directory / f"{os.getpid()}.json").exists())
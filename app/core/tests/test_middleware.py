@@ -0,0 +1,94 @@
+from http import HTTPStatus
+from typing import Any
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from recipe.cache import response_cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import User as CustomUser
+from core.tests.factories import RecipeFactory, TagFactory, UserFactory
+from core.timing import current
+
+SERVER_TIMING: dict[str, Any] = {"SAMPLE_RATE": 1.0, "HEADER": True, "LOG": False}
+
+
+def metrics(header: str) -> dict[str, dict[str, str]]:
+    """Parameters of the `Server-Timing` metrics by name."""
+    parsed = {}
+    for metric in header.split(", "):
+        name, *params = metric.split(";")
+        parsed[name] = dict(param.split("=", 1) for param in params)
+    return parsed
+
+
+@override_settings(SERVER_TIMING=SERVER_TIMING)
+class ServerTimingMiddlewareTests(TestCase):
+    api_client: APIClient
+    user: CustomUser
+
+    @classmethod
+    def setUpTestData(cls: type[ServerTimingMiddlewareTests]) -> None:
+        cls.api_client = APIClient()
+        cls.user = UserFactory.create()
+        cls.api_client.force_authenticate(cls.user)
+
+    def setUp(self) -> None:
+        response_cache.clear()
+        self.addCleanup(response_cache.clear)
+
+    def test_server_timing(self) -> None:
+        RecipeFactory.create_batch(3, user=self.user, tags=[TagFactory.create(user=self.user)])
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.api_client.get(reverse("recipe:recipe-list"))
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        timings = metrics(res["Server-Timing"])
+        self.assertEqual(set(timings), {"db", "serialize", "render", "total"})
+        self.assertEqual(timings["db"]["desc"], f'"{len(queries)} queries"')
+        durations = {name: float(params["dur"]) for name, params in timings.items()}
+        self.assertLessEqual(durations["db"] + durations["render"], durations["total"])
+
+    async def test_asgi(self) -> None:
+        token = await Token.objects.acreate(user=self.user)
+
+        # The sync view runs in a thread, behind the middleware running on the event loop
+        res = await self.async_client.get(
+            reverse("user:me"), headers={"authorization": f"Token {token.key}"}
+        )
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        timings = metrics(res["Server-Timing"])
+        self.assertEqual(set(timings), {"db", "serialize", "render", "total"})
+        self.assertEqual(timings["db"]["desc"], '"1 queries"')
+
+    def test_not_sampled(self) -> None:
+        with (
+            override_settings(SERVER_TIMING=SERVER_TIMING | {"SAMPLE_RATE": 0.5}),
+            patch("core.middleware.random.random", return_value=0.7),
+        ):
+            res = self.api_client.get(reverse("user:me"))
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.assertFalse(res.has_header("Server-Timing"))
+        self.assertIsNone(current())
+
+    def test_log(self) -> None:
+        with (
+            override_settings(SERVER_TIMING=SERVER_TIMING | {"HEADER": False, "LOG": True}),
+            self.assertLogs("core.timing", "INFO") as logs,
+        ):
+            res = self.api_client.get(reverse("user:me"))
+
+        self.assertFalse(res.has_header("Server-Timing"))
+        (record,) = logs.records
+        self.assertRegex(
+            record.getMessage(),
+            r"^method=GET path=/api/user/me/ status=200 queries=\d+ .*total_ms=[\d.]+",
+        )
+        self.assertEqual(record.timings["status"], 200)  # type: ignore[attr-defined]
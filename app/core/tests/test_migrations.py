@@ -0,0 +1,57 @@
+from django.apps.registry import Apps
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MergeDuplicateNamesMigrationTests(TransactionTestCase):
+    migrate_from = [("core", "0005_recipe_image")]
+    # Through the constraints too: on PostgreSQL they fail if they share the merge's transaction
+    migrate_to = [("core", "0007_recipe_indexes_unique_attr_names")]
+
+    def _migrate(self, targets: list[tuple[str, str]]) -> Apps:
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self) -> None:
+        self.old_apps = self._migrate(self.migrate_from)
+
+    def tearDown(self) -> None:
+        executor = MigrationExecutor(connection)
+        self._migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicate_names_merged(self) -> None:
+        user_model = self.old_apps.get_model("core", "User")
+        recipe_model = self.old_apps.get_model("core", "Recipe")
+        tag_model = self.old_apps.get_model("core", "Tag")
+        ingredient_model = self.old_apps.get_model("core", "Ingredient")
+
+        user = user_model.objects.create(email="user@example.com")
+        other_user = user_model.objects.create(email="other@example.com")
+        recipe1, recipe2 = (
+            recipe_model.objects.create(user=user, title=title, time_minutes=5, price="1.00")
+            for title in ("one", "two")
+        )
+        keep = tag_model.objects.create(user=user, name="dup")
+        duplicate = tag_model.objects.create(user=user, name="dup")
+        other_users_tag = tag_model.objects.create(user=other_user, name="dup")
+        recipe1.tags.add(keep, duplicate)
+        recipe2.tags.add(duplicate)
+        salt = ingredient_model.objects.create(user=user, name="salt")
+        ingredient_model.objects.create(user=user, name="salt")
+
+        # Later migrations change these models, check them as of `migrate_to`
+        new_apps = self._migrate(self.migrate_to)
+        recipe_model = new_apps.get_model("core", "Recipe")
+        tag_model = new_apps.get_model("core", "Tag")
+        ingredient_model = new_apps.get_model("core", "Ingredient")
+
+        self.assertEqual(
+            list(tag_model.objects.order_by("id").values_list("id", flat=True)),
+            [keep.id, other_users_tag.id],
+        )
+        self.assertEqual(list(ingredient_model.objects.values_list("id", flat=True)), [salt.id])
+        for recipe_id in (recipe1.id, recipe2.id):
+            recipe = recipe_model.objects.get(id=recipe_id)
+            self.assertEqual(list(recipe.tags.values_list("id", flat=True)), [keep.id])
@@ -1,15 +1,22 @@
 import random
+import re
 from pathlib import PurePosixPath
+from typing import Any
+from unittest import skipUnless
 from unittest.mock import MagicMock, patch
 
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
+from django.db.models import QuerySet
 from django.test import TestCase
 from faker import Faker
+from recipe.views import TagViewSet
+from rest_framework.test import APIRequestFactory, force_authenticate
 
 from core import models
 from core.models import Ingredient, Recipe, Tag
 from core.models import User as CustomUser
-from core.tests.factories import RecipeFactory, UserFactory
+from core.tests.factories import IngredientFactory, RecipeFactory, TagFactory, UserFactory
 
 User: type[CustomUser] = get_user_model()
 
@@ -81,3 +88,78 @@ class ModelTests(TestCase):
         # PurePosixPath(...).as_posix() gives a consistent "recipe/test-uuid.jpg" string
         # regardless of what the OS separator is (\ vs /).
         self.assertEqual(PurePosixPath(file_path).as_posix(), expected)
+
+    def test_tag_name_unique_per_user(self) -> None:
+        tag = TagFactory.create()
+        TagFactory.create(name=tag.name)
+
+        with self.assertRaises(IntegrityError):
+            Tag.objects.create(user=tag.user, name=tag.name)
+
+    def test_ingredient_name_unique_per_user(self) -> None:
+        ingredient = IngredientFactory.create()
+        IngredientFactory.create(name=ingredient.name)
+
+        with self.assertRaises(IntegrityError):
+            Ingredient.objects.create(user=ingredient.user, name=ingredient.name)
+
+
+@skipUnless(connection.vendor in ("sqlite", "postgresql"), "EXPLAIN output is vendor specific")
+class IndexUsageTests(TestCase):
+    user: CustomUser
+
+    @classmethod
+    def setUpTestData(cls: type[IndexUsageTests]) -> None:
+        cls.user = UserFactory.create()
+
+    def _plan(self, qs: QuerySet[Any]) -> str:
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                # Scanning the tiny test tables is cheaper than any index, make the planner
+                # show the index it would pick for a real table instead.
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return qs.explain()
+
+    def assertIndexSearch(
+        self, qs: QuerySet[Any], table: str, columns: str, index_name: str
+    ) -> None:
+        plan = self._plan(qs)
+        if connection.vendor == "sqlite":
+            # SQLite names the index backing a UNIQUE constraint `sqlite_autoindex_*`,
+            # match on the columns it searches instead.
+            self.assertRegex(
+                plan, rf"SEARCH {table} USING (COVERING )?INDEX \S+ \({re.escape(columns)}\)"
+            )
+            self.assertNotIn("TEMP B-TREE", plan)
+        else:
+            self.assertIn(index_name, plan)
+            self.assertIsNone(re.search(r"^\s*(->\s*)?Sort", plan, re.MULTILINE), plan)
+
+    def test_recipe_list_uses_user_id_index(self) -> None:
+        qs = Recipe.objects.filter(user=self.user).order_by("-id")
+
+        self.assertIndexSearch(qs, "core_recipe", "user_id=?", "core_recipe_user_id_desc_idx")
+        if connection.vendor == "sqlite":
+            self.assertIn("core_recipe_user_id_desc_idx", self._plan(qs))
+
+    def test_tag_name_lookup_uses_unique_index(self) -> None:
+        qs = Tag.objects.filter(user=self.user, name__in=["a", "b"])
+
+        self.assertIndexSearch(qs, "core_tag", "user_id=? AND name=?", "core_tag_unique_user_name")
+
+    def test_tag_list_uses_unique_index(self) -> None:
+        request = APIRequestFactory().get("/api/recipe/tags/")
+        force_authenticate(request, self.user)
+        view = TagViewSet(action_map={"get": "list"}, format_kwarg=None)
+        view.request = view.initialize_request(request)
+        # The list's query, ordered and distinct
+        qs = view.get_queryset()
+
+        self.assertIndexSearch(qs, "core_tag", "user_id=?", "core_tag_unique_user_name")
+
+    def test_ingredient_name_lookup_uses_unique_index(self) -> None:
+        qs = Ingredient.objects.filter(user=self.user, name="a")
+
+        self.assertIndexSearch(
+            qs, "core_ingredient", "user_id=? AND name=?", "core_ingredient_unique_user_name"
+        )
@@ -0,0 +1,86 @@
+import io
+import uuid
+from datetime import UTC, date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import HAS_ORJSON, FastJSONRenderer
+
+DATA: dict[Any, Any] = {
+    "price": Decimal("12.50"),
+    "label": gettext_lazy("Recipe"),
+    "created": datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=UTC),
+    "naive": datetime(2024, 5, 1, 12, 30),
+    "day": date(2024, 5, 1),
+    "at": time(8, 15, 30, 5),
+    "took": timedelta(minutes=90),
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "bytes": b"raw",
+    "separators": "line paragraph ",
+    "unicode": "crème brûlée",
+    "nested": [{"id": 1, "tags": ("a", "b")}, None, True, 1.5],
+    0: {"title": ["This field is required."]},
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def _assert_same(self, data: Any, accepted_media_type: str | None = None) -> None:
+        expected = JSONRenderer().render(data, accepted_media_type)
+        self.assertEqual(FastJSONRenderer().render(data, accepted_media_type), expected)
+
+    def test_same_output_as_json_renderer(self) -> None:
+        self._assert_same(DATA)
+
+    def test_same_output_without_orjson(self) -> None:
+        with patch("core.renderers.orjson", None):
+            self._assert_same(DATA)
+
+    def test_indented(self) -> None:
+        self._assert_same(DATA, "application/json; indent=4")
+
+    def test_none(self) -> None:
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_unsupported_by_orjson_falls_back(self) -> None:
+        self._assert_same({"big": 2**70})
+
+    def test_unserializable(self) -> None:
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render({"obj": object()})
+
+
+class FastJSONParserTests(SimpleTestCase):
+    def _parse(self, body: bytes, encoding: str = "utf-8") -> Any:
+        return FastJSONParser().parse(io.BytesIO(body), "application/json", {"encoding": encoding})
+
+    def test_same_result_as_json_parser(self) -> None:
+        body = JSONRenderer().render(DATA)
+
+        self.assertEqual(self._parse(body), JSONParser().parse(io.BytesIO(body)))
+
+    def test_other_charset(self) -> None:
+        body = '{"name": "crème"}'.encode("latin-1")
+
+        self.assertEqual(self._parse(body, "latin-1"), {"name": "crème"})
+
+    def test_invalid(self) -> None:
+        for body in (b"{", b'{"price": NaN}'):
+            with self.subTest(body=body), self.assertRaises(ParseError):
+                self._parse(body)
+
+    @skipIf(not HAS_ORJSON, "orjson is not installed")
+    def test_uses_orjson(self) -> None:
+        with patch("core.parsers.orjson") as mock_orjson:
+            mock_orjson.loads.return_value = [1]
+            self._parse(b"[1]")
+
+        mock_orjson.loads.assert_called_once_with(b"[1]")
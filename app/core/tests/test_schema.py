@@ -0,0 +1,68 @@
+import json
+import tempfile
+from http import HTTPStatus
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core.schema import generate_schema, schema_cache
+
+SCHEMA_URL = reverse("api-schema")
+
+
+class SchemaViewTests(SimpleTestCase):
+    def setUp(self) -> None:
+        schema_cache.clear()
+        self.addCleanup(schema_cache.clear)
+
+    def test_generated_once(self) -> None:
+        with mock.patch("core.schema.generate_schema", wraps=generate_schema) as generate:
+            yaml_res = self.client.get(SCHEMA_URL)
+            json_res = self.client.get(SCHEMA_URL, {"format": "json"})
+            again = self.client.get(SCHEMA_URL, {"format": "json"})
+
+        generate.assert_called_once()
+        self.assertEqual(yaml_res.status_code, HTTPStatus.OK)
+        self.assertEqual(yaml_res["Content-Type"], "application/vnd.oai.openapi; charset=utf-8")
+        self.assertIn(b"openapi: 3.0.3", yaml_res.content)
+        self.assertEqual(json.loads(json_res.content), json.loads(json.dumps(generate_schema())))
+        self.assertEqual(again.content, json_res.content)
+        self.assertEqual(again["ETag"], json_res["ETag"])
+        self.assertNotEqual(yaml_res["ETag"], json_res["ETag"])
+        self.assertEqual(json_res["Cache-Control"], "public, no-cache")
+
+    def test_not_modified(self) -> None:
+        etag = self.client.get(SCHEMA_URL)["ETag"]
+
+        res = self.client.get(SCHEMA_URL, headers={"if-none-match": etag})
+
+        self.assertEqual(res.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+        self.assertEqual(res.content, b"")
+
+    def test_schema_file(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = Path(tmp.name) / "openapi.json"
+        schema = json.loads(json.dumps(generate_schema()))
+        schema["info"]["title"] = "From the file"
+        path.write_text(json.dumps(schema))
+
+        with (
+            override_settings(API_SCHEMA_FILE=str(path)),
+            mock.patch("core.schema.generate_schema") as generate,
+        ):
+            res = self.client.get(SCHEMA_URL, {"format": "json"})
+
+        generate.assert_not_called()
+        self.assertEqual(json.loads(res.content), schema)
+
+    def test_translation_generated(self) -> None:
+        with mock.patch("core.schema.generate_schema") as generate:
+            res = self.client.get(SCHEMA_URL, {"lang": "en-us"})
+
+        generate.assert_not_called()
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.assertNotIn("ETag", res)
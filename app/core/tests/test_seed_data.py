@@ -0,0 +1,112 @@
+from collections import Counter
+from io import StringIO
+from typing import Any
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import F
+from django.test import TestCase
+
+from core.models import ContentVersion, Ingredient, Recipe, Tag, User
+from core.tests.factories import RecipeFactory, TagFactory, UserFactory
+
+
+class SeedDataCommandTests(TestCase):
+    def _seed(self, *args: str) -> str:
+        out = StringIO()
+        call_command(
+            "seed_data",
+            "--users=5",
+            "--recipes=200",
+            "--tags=20",
+            "--ingredients=30",
+            "--batch-size=64",
+            *args,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def _snapshot(self) -> list[tuple[Any, ...]]:
+        recipes = Recipe.objects.order_by("id").prefetch_related("tags", "ingredients")
+        return [
+            (
+                recipe.user.email,
+                recipe.title,
+                recipe.time_minutes,
+                recipe.price,
+                sorted(tag.name for tag in recipe.tags.all()),
+                sorted(ingredient.name for ingredient in recipe.ingredients.all()),
+            )
+            for recipe in recipes.select_related("user")
+        ]
+
+    def test_seed(self) -> None:
+        other = UserFactory.create()
+
+        out = self._seed()
+
+        self.assertIn("Created 5 users and 200 recipes", out)
+        users = User.objects.exclude(id=other.id)
+        self.assertEqual(users.count(), 5)
+        self.assertEqual(Recipe.objects.count(), 200)
+        self.assertEqual(Tag.objects.filter(user__in=users).count(), 5 * 20)
+        self.assertEqual(Ingredient.objects.filter(user__in=users).count(), 5 * 30)
+        self.assertEqual(ContentVersion.objects.filter(user__in=users).count(), 5)
+        self.assertTrue(users.first().check_password("password"))  # type: ignore[union-attr]
+        # Recipes only link to their own user's tags and ingredients
+        for field in ("tag", "ingredient"):
+            links = getattr(Recipe, f"{field}s").through.objects
+            self.assertFalse(links.exclude(recipe__user=F(f"{field}__user")).exists())
+
+    def test_skewed(self) -> None:
+        self._seed()
+
+        recipes_per_user = sorted(
+            Counter(Recipe.objects.values_list("user_id", flat=True)).values(), reverse=True
+        )
+        self.assertGreater(recipes_per_user[0], 2 * recipes_per_user[-1])
+        tag_use = sorted(
+            Counter(Recipe.tags.through.objects.values_list("tag_id", flat=True)).values(),
+            reverse=True,
+        )
+        self.assertGreater(tag_use[0], 4 * tag_use[len(tag_use) // 2])
+        ingredients = Counter(
+            Recipe.ingredients.through.objects.values_list("recipe_id", flat=True)
+        ).values()
+        self.assertGreater(max(ingredients), min(ingredients))
+
+    def test_deterministic(self) -> None:
+        self._seed("--seed=7")
+        first = self._snapshot()
+
+        self._seed("--seed=7", "--replace")
+
+        self.assertEqual(self._snapshot(), first)
+        self._seed("--seed=8", "--replace")
+        self.assertNotEqual(self._snapshot(), first)
+
+    def test_replace_keeps_other_users(self) -> None:
+        self._seed()
+        other = UserFactory.create()
+        recipe = RecipeFactory.create(user=other)
+        tag = TagFactory.create(user=other)
+        recipe.tags.add(tag)
+
+        self._seed("--seed=8", "--replace")
+
+        self.assertEqual(Recipe.objects.count(), 201)
+        self.assertEqual(
+            list(Recipe.objects.get(id=recipe.id).tags.all()), list(other.tag_set.all())
+        )
+        self.assertEqual(Recipe.tags.through.objects.filter(recipe__user__isnull=True).count(), 0)
+
+    def test_refuses_to_seed_twice(self) -> None:
+        self._seed()
+
+        with self.assertRaisesMessage(CommandError, "--replace"):
+            self._seed()
+
+    def test_invalid_counts(self) -> None:
+        for args in (["--recipes=-1"], ["--batch-size=0"], ["--users=0"]):
+            with self.subTest(args=args), self.assertRaises(CommandError):
+                self._seed(*args)
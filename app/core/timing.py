@@ -0,0 +1,123 @@
+"""
+Per-request timings of database queries, serialization and rendering.
+
+`ServerTimingMiddleware` (see core.middleware) starts a `Timings` for a sampled request and makes
+it current for the request's context. Code being timed reports to the current one, if any, so
+requests that aren't sampled only pay for a context variable lookup.
+
+Database queries are observed with `wrapping_queries()` rather than `connection.execute_wrapper()`,
+which only applies to the current thread's connection. Under ASGI, the middleware runs on the
+event loop and the queries in another thread.
+"""
+
+import functools
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.backends.signals import connection_created
+from django.db.models import Model
+from django.dispatch import receiver
+from rest_framework import serializers
+
+# A `connection.execute_wrapper()`
+type ExecuteWrapper = Callable[[Callable[..., Any], str, Any, bool, Any], Any]
+
+
+class Timings:
+    """Durations in seconds by name, and the number of database queries."""
+
+    def __init__(self) -> None:
+        self.durations: defaultdict[str, float] = defaultdict(float)
+        self.queries = 0
+        # Set while a serializer is timed, nested serializers are part of its time
+        self.serializing = False
+
+    def add(self, name: str, duration: float) -> None:
+        self.durations[name] += duration
+
+    def __call__(
+        self, execute: Callable[..., Any], sql: str, params: Any, many: bool, context: Any
+    ) -> Any:
+        # An execute wrapper, see `wrapping_queries()`
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add("db", time.perf_counter() - start)
+            self.queries += 1
+
+
+_current: ContextVar[Timings | None] = ContextVar("timings", default=None)
+
+
+def current() -> Timings | None:
+    """The timings of the current request, `None` when it isn't sampled."""
+    return _current.get()
+
+
+@contextmanager
+def recording(timings: Timings) -> Iterator[Timings]:
+    """Make `timings` the current timings within the block."""
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+_query_wrappers: ContextVar[tuple[ExecuteWrapper, ...]] = ContextVar("query_wrappers", default=())
+
+
+@contextmanager
+def wrapping_queries(*wrappers: ExecuteWrapper) -> Iterator[None]:
+    """
+    Run the queries made within the block through the execute wrappers, on any connection and
+    in any thread the block's context is carried to, such as `sync_to_async()`'s.
+    """
+    token = _query_wrappers.set(_query_wrappers.get() + wrappers)
+    try:
+        yield
+    finally:
+        _query_wrappers.reset(token)
+
+
+def run_query_wrappers(
+    execute: Callable[..., Any], sql: str, params: Any, many: bool, context: Any
+) -> Any:
+    for wrapper in _query_wrappers.get():
+        execute = functools.partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_wrappers(
+    sender: type[BaseDatabaseWrapper], connection: BaseDatabaseWrapper, **kwargs: Any
+) -> None:
+    # Sent again when a connection object reconnects
+    if run_query_wrappers not in connection.execute_wrappers:
+        connection.execute_wrappers.append(run_query_wrappers)
+
+
+class TimedModelSerializer[T: Model](serializers.ModelSerializer[T]):
+    """
+    Model serializer whose representation time is recorded as "serialize". Lazily loaded
+    related objects count as both database and serialization time.
+    """
+
+    def to_representation(self, instance: T) -> dict[str, Any]:
+        timings = _current.get()
+        if timings is None or timings.serializing:
+            return super().to_representation(instance)
+
+        timings.serializing = True
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            timings.serializing = False
+            timings.add("serialize", time.perf_counter() - start)
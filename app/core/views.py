@@ -0,0 +1,46 @@
+from typing import Any
+
+from django.http import HttpRequest, HttpResponse, HttpResponseBase
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+from rest_framework.request import Request
+
+from core.metrics import exposition, registry
+from core.schema import schema_cache
+
+
+@require_GET
+def metrics(request: HttpRequest) -> HttpResponse:
+    """The Prometheus metrics of all the server's processes."""
+    return HttpResponse(
+        exposition(registry.collect()), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+# The OpenAPI schema, served from `core.schema.schema_cache`. No docstring, it would replace
+# the endpoint's description in the schema.
+class SchemaView(SpectacularAPIView):
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        # Translations and versions of the schema are generated as they're requested
+        if request.query_params.get("lang") or request.query_params.get("version"):
+            response: HttpResponseBase = super().get(  # type: ignore[no-untyped-call]
+                request, *args, **kwargs
+            )
+            return response
+
+        renderer = request.accepted_renderer
+        content, etag = schema_cache.rendered(renderer)
+        filename = f"{spectacular_settings.TITLE or 'schema'}.{renderer.format}"
+        response = get_conditional_response(request._request, etag=etag) or HttpResponse(
+            content,
+            content_type=f"{request.accepted_media_type}; charset={renderer.charset}",
+            headers={"Content-Disposition": f'inline; filename="{filename}"'},
+        )
+        response["ETag"] = etag
+        # The same for every client, which should revalidate it after a deploy
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
@@ -0,0 +1,76 @@
+"""
+Cache of serialized recipe API responses.
+
+Entries are keyed by the response's ETag (see recipe.conditional), which is derived from the
+user, the URL including its query parameters (`tags`, `ingredients`, `assigned_only`, cursor),
+the accepted media type and the user's `ContentVersion` or the recipe's `modified_at`. The
+signals in core.signals bump those on every write, so a write moves the affected responses to
+new keys and the old entries are never read again; they're left to expire. There's no need to
+find and delete every cached page that might include a changed recipe.
+
+The cached value is the serializer output, not the rendered bytes, so that the response still
+goes through content negotiation and the renderer, and works with any of them.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+from core.metrics import registry
+from django.conf import settings
+from django.core.cache import caches
+
+
+class ResponseCache:
+    """Thread-safe hit/miss counting around a Django cache alias, `None` disables caching."""
+
+    def __init__(self, cache_alias: str | None, ttl: float) -> None:
+        self.cache_alias = cache_alias
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, etag: str) -> str:
+        digest = etag.strip('"')
+        return f"recipe-response:{digest}"
+
+    def get(self, etag: str) -> Any | None:
+        if self.cache_alias is None:
+            return None
+
+        data = caches[self.cache_alias].get(self._key(etag))
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def set(self, etag: str, data: Any) -> None:
+        if self.cache_alias is not None:
+            caches[self.cache_alias].set(self._key(etag), data, self.ttl)
+
+    def clear(self) -> None:
+        """Reset the counters, and clear the whole cache alias."""
+        if self.cache_alias is not None:
+            caches[self.cache_alias].clear()
+        with self._lock:
+            self.hits = self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate}
+
+
+response_cache = ResponseCache(
+    cache_alias=settings.RESPONSE_CACHE["CACHE_ALIAS"],
+    ttl=settings.RESPONSE_CACHE["TTL"],
+)
+registry.register_cache("response_cache", response_cache)
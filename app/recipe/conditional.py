@@ -0,0 +1,112 @@
+"""
+Conditional GET support for the recipe API.
+
+List responses are validated against the user's `ContentVersion`, recipe details against the
+recipe's `modified_at`, both read with a single primary key lookup. When the client's
+`If-None-Match` / `If-Modified-Since` still match, a 304 is returned without running the main
+query or the serializer.
+
+Responses that do have to be sent are served from `recipe.cache` when possible.
+
+`Last-Modified` only has one second resolution, so a client relying on `If-Modified-Since`
+alone may miss a change made within the second it last fetched; `ETag` has no such gap and
+takes precedence when both are sent.
+"""
+
+import hashlib
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any, cast
+
+from core.models import ContentVersion, Recipe
+from django.core.exceptions import ValidationError
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from recipe.cache import response_cache
+
+
+def collection_validators(request: Request) -> tuple[str, datetime | None]:
+    """ETag and Last-Modified of a list response, from the user's content version."""
+    version, modified_at = ContentVersion.objects.filter(
+        user_id=cast(int, request.user.pk)
+    ).values_list("version", "modified_at").first() or (0, None)
+    # `modified_at` too, in case a user's row is recreated
+    parts = (request.user.pk, version, modified_at.isoformat() if modified_at else None)
+    return _etag(request, *parts), modified_at
+
+
+def recipe_validators(request: Request, pk: Any) -> tuple[str, datetime | None] | None:
+    """ETag and Last-Modified of a recipe detail response, `None` if there's no such recipe."""
+    if (pk := _recipe_pk(pk)) is None:
+        return None
+    modified_at = (
+        Recipe.objects.filter(pk=pk, user_id=cast(int, request.user.pk))
+        .values_list("modified_at", flat=True)
+        .first()
+    )
+    if modified_at is None:
+        return None
+    return _etag(request, request.user.pk, pk, modified_at.isoformat()), modified_at
+
+
+def _recipe_pk(pk: Any) -> Any:
+    """The primary key from the URL, `None` if it isn't one; the view then answers 404."""
+    try:
+        return Recipe._meta.pk.to_python(pk)
+    except ValidationError:
+        return None
+
+
+def _etag(request: Request, *parts: Any) -> str:
+    # The same version renders differently per query string (filters, cursor) and format, and
+    # per host since URLs in the response are absolute.
+    accepted = getattr(request, "accepted_media_type", "")
+    key = "|".join(map(str, (*parts, request.build_absolute_uri(), accepted)))
+    return quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+
+
+def conditional_get(
+    request: Request,
+    validators: tuple[str, datetime | None] | None,
+    render: Callable[[], Response],
+) -> Response:
+    """Answer with 304 if the client's copy is current, otherwise `render()` the response."""
+    if request.method not in ("GET", "HEAD") or validators is None:
+        return render()
+
+    etag, modified_at = validators
+    headers = {"ETag": etag}
+    last_modified = None
+    if modified_at is not None:
+        last_modified = int(modified_at.timestamp())
+        headers["Last-Modified"] = http_date(last_modified)
+
+    not_modified = get_conditional_response(
+        request._request, etag=etag, last_modified=last_modified
+    )
+    if not_modified is not None:
+        response = Response(status=not_modified.status_code, headers=headers)
+    else:
+        response = _render_cached(etag, render)
+        if response.status_code != 200:
+            return response
+        for header, value in headers.items():
+            response[header] = value
+
+    # Responses are per user, and clients should revalidate before reusing them.
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _render_cached(etag: str, render: Callable[[], Response]) -> Response:
+    data = response_cache.get(etag)
+    if data is not None:
+        return Response(data)
+
+    response = render()
+    if response.status_code == 200:
+        response_cache.set(etag, response.data)
+    return response
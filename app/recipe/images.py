@@ -0,0 +1,192 @@
+"""
+Resized variants of the recipe images, for clients to download instead of the original.
+
+Uploading an image queues the generation of its variants, one per width of
+`RECIPE_IMAGE_VARIANTS["WIDTHS"]` (capped at the image's width) and format (WebP, JPEG), once
+the upload is committed. A pool of `WORKERS` threads per process generates them, so the upload
+request only saves the original. The threads run niced, and Pillow releases the GIL while it
+decodes, resizes and encodes, so the requests of the process keep the CPU while the pool works
+through its queue in their idle time. With `WORKERS` 0 the variants are generated during the
+upload.
+
+The variants are saved under `recipe/variants/`, named after the image and the configured width
+they're for (`<image>-<width>w.webp`), and listed in `Recipe.image_variants` when they are all
+written, which touches `modified_at` so that conditional GETs and the response cache of the recipe
+detail see them. Until then the detail lists none. Like the image's file (see core.storage), the
+variants are shared by the recipes with the same image: a generation skips those already written,
+and they're deleted along with the image's file once no recipe references it (see recipe.signals).
+
+Queued generations are lost when a process stops; `manage.py generate_image_variants` generates
+the variants of the images that have none.
+"""
+
+import contextlib
+import io
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Any
+
+from core.models import Recipe
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils import timezone
+from PIL import ExifTags, Image, ImageOps
+
+logger = logging.getLogger("recipe.images")
+
+VARIANTS_DIR = "recipe/variants"
+
+# format -> (Pillow format, extension, save options). WebP's default method 4 takes over 3 times
+# as long to encode as method 2, for barely smaller files.
+FORMATS: dict[str, tuple[str, str, dict[str, Any]]] = {
+    "webp": ("WEBP", "webp", {"method": 2}),
+    "jpeg": ("JPEG", "jpg", {"optimize": True}),
+}
+
+# Niceness of the worker threads, from 0 for the request threads to 19
+WORKER_NICENESS = 10
+
+_pool: ThreadPoolExecutor | None = None
+_pool_pid: int | None = None
+_pool_lock = threading.Lock()
+
+
+def queue_variants(recipe_id: int, name: str) -> None:
+    """Generate the variants of the recipe's image `name` in the background."""
+    workers = settings.RECIPE_IMAGE_VARIANTS["WORKERS"]
+    if not workers:
+        generate_variants(recipe_id, name)
+        return
+    _worker_pool(workers).submit(_generate_in_worker, recipe_id, name)
+
+
+def _worker_pool(workers: int) -> ThreadPoolExecutor:
+    global _pool, _pool_pid
+    with _pool_lock:
+        # Threads don't survive a fork, each process starts its own
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(
+                workers, thread_name_prefix="image-variants", initializer=_lower_priority
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _lower_priority() -> None:
+    # Linux schedules threads apart, a niced worker leaves the CPU to the requests when they
+    # need it
+    with contextlib.suppress(AttributeError, OSError):
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), WORKER_NICENESS)
+
+
+def _generate_in_worker(recipe_id: int, name: str) -> None:
+    try:
+        generate_variants(recipe_id, name)
+    except Exception:
+        logger.exception("Generating the variants of %s failed", name)
+    finally:
+        # The thread's own connections, nothing else closes them
+        connections.close_all()
+
+
+def generate_variants(recipe_id: int, name: str, replace: bool = False) -> list[dict[str, Any]]:
+    """
+    Write the variants of the image, except those already written unless `replace`, and list
+    them on the recipe, if it still has the image.
+    """
+    config = settings.RECIPE_IMAGE_VARIANTS
+    with default_storage.open(name) as file, Image.open(file) as original:
+        # Variant width -> the configured width naming it, the smallest of those capped to it
+        named_after: dict[int, int] = {}
+        for width in sorted(config["WIDTHS"]):
+            named_after.setdefault(min(width, upright_width(original)), width)
+        variants = [
+            {
+                "width": width,
+                "format": variant_format,
+                "name": variant_name(name, named_after[width], variant_format),
+            }
+            for width in sorted(named_after, reverse=True)
+            for variant_format in config["FORMATS"]
+        ]
+        missing = [
+            variant
+            for variant in variants
+            if replace or not default_storage.exists(variant["name"])
+        ]
+        if missing:
+            image = prepare(original, missing[0]["width"])
+            # Largest first, each resized from the previous one
+            for variant in missing:
+                image = resize(image, variant["width"])
+                content = encode(image, variant["format"], config["QUALITY"])
+                write_atomically(Path(default_storage.path(variant["name"])), content)
+
+    # Only the detail shows the variants, the user's lists are unchanged
+    updated = Recipe.objects.filter(pk=recipe_id, image=name).update(
+        image_variants=variants, modified_at=timezone.now()
+    )
+    # Deleted, or given another image meanwhile. The variants stay for the other recipes with
+    # the image, or go with its file.
+    return variants if updated else []
+
+
+def variant_name(image_name: str, width: int, variant_format: str) -> str:
+    # After the image, for `manage.py delete_orphaned_media` to find its recipes
+    return f"{VARIANTS_DIR}/{PurePosixPath(image_name).name}-{width}w.{FORMATS[variant_format][1]}"
+
+
+def delete_variants(image_name: str) -> None:
+    """Delete the variants of the image, one name per configured width and format."""
+    for width in settings.RECIPE_IMAGE_VARIANTS["WIDTHS"]:
+        for variant_format in FORMATS:
+            default_storage.delete(variant_name(image_name, width, variant_format))
+
+
+def write_atomically(path: Path, content: bytes) -> None:
+    """Write the file under a temporary name and rename it, nginx never serves part of a file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".tmp")
+    with os.fdopen(fd, "wb") as temp_file:
+        temp_file.write(content)
+    # Readable by nginx, unlike the temporary file
+    os.chmod(temp, settings.FILE_UPLOAD_PERMISSIONS or 0o644)
+    os.replace(temp, path)
+
+
+def upright_width(original: Image.Image) -> int:
+    """The width of the image once turned upright by its EXIF orientation."""
+    rotated = original.getexif().get(ExifTags.Base.Orientation, 1) in (5, 6, 7, 8)
+    return original.height if rotated else original.width
+
+
+def prepare(original: Image.Image, width: int) -> Image.Image:
+    """The image upright and in a mode to encode, decoded at no less than `width` if it can be."""
+    # JPEGs are decoded at 1/2, 1/4 or 1/8 of their size when that's still large enough
+    original.draft("RGB", (width, width))
+    image = ImageOps.exif_transpose(original)
+    return image.convert("RGBA" if image.has_transparency_data else "RGB")
+
+
+def resize(image: Image.Image, width: int) -> Image.Image:
+    if image.width == width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def encode(image: Image.Image, format: str, quality: int) -> bytes:
+    pillow_format, _, options = FORMATS[format]
+    if pillow_format == "JPEG" and image.mode == "RGBA":
+        # No transparency in JPEG, show it as white
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, pillow_format, quality=quality, **options)
+    return buffer.getvalue()
@@ -0,0 +1,115 @@
+"""
+Django management command to compare the recipe list filters with their join based predecessor.
+
+The tags and ingredients filters of the recipe list are correlated `EXISTS` subqueries (see
+`recipe.views.linked_to`). They used to join the through tables, which can produce a row per
+matching link and so needs `DISTINCT` over the recipe rows; `match=all` joins once per id. This
+times both on the configured database, e.g. after `manage.py seed_data`, for the user with the
+most recipes and its most used tags: the full result, and the first page of the list.
+
+`match=all` is timed on fewer tags, `--all-tags`, for some recipes to have all of them.
+"""
+
+import time
+from typing import Any
+
+from core.models import Recipe, Tag, User
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db.models import Count, QuerySet
+
+from recipe.views import RecipeViewSet, linked_to
+
+# The columns of the list action
+COLUMNS = RecipeViewSet.recipe_columns["list"]
+
+
+class Command(BaseCommand):
+    """Command that times the recipe filters with `EXISTS` and with joins."""
+
+    help = "Compare the EXISTS based recipe filters with joins and DISTINCT"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--tags",
+            type=int,
+            default=10,
+            help="Tags to filter on, the user's most used (default: 10)",
+        )
+        parser.add_argument(
+            "--all-tags",
+            type=int,
+            default=2,
+            help="Tags to filter on with match=all (default: 2)",
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=100,
+            help="Recipes of the first page (default: 100)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Queries per measurement (default: 20)",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        user = (
+            User.objects.annotate(recipe_count=Count("recipe"))
+            .filter(recipe_count__gt=0)
+            .order_by("-recipe_count")
+            .first()
+        )
+        if user is None:
+            raise CommandError("No recipes, run `manage.py seed_data` first")
+        tag_ids = list(
+            Tag.objects.filter(user=user)
+            .annotate(recipe_count=Count("recipe"))
+            .order_by("-recipe_count")
+            .values_list("id", flat=True)[: options["tags"]]
+        )
+        recipes = Recipe.objects.filter(user=user).only(*COLUMNS).order_by("-id")
+        self.stdout.write(f"{user.email}: {recipes.count():,} recipes, {len(tag_ids)} tags")
+
+        self.stdout.write(f"{'filter':<18}{'rows':>8}{'join ms':>10}{'exists ms':>11}")
+        for match, ids in (("any", tag_ids), ("all", tag_ids[: options["all_tags"]])):
+            exists = recipes.filter(*linked_to("tags", ids, match))
+            joined = joined_filter(recipes, ids, match)
+            if list(joined.values_list("id", flat=True)) != list(
+                exists.values_list("id", flat=True)
+            ):
+                raise CommandError(f"The {match} filters return different recipes")
+
+            page = options["page_size"]
+            for name, join_query, exists_query in (
+                (f"{match} full", joined, exists),
+                (f"{match} page", joined[:page], exists[:page]),
+            ):
+                rows = len(exists_query)
+                self.stdout.write(
+                    f"{name:<18}{rows:>8,}"
+                    f"{measure(join_query, options['repeat']):>10.1f}"
+                    f"{measure(exists_query, options['repeat']):>11.1f}"
+                )
+
+
+def joined_filter(recipes: QuerySet[Recipe], tag_ids: list[int], match: str) -> QuerySet[Recipe]:
+    """The filter as it was: joins to the through table, and `DISTINCT` over the recipes."""
+    if match == "all":
+        for tag_id in tag_ids:
+            # A join per `filter()` call over a multi-valued relation
+            recipes = recipes.filter(tags__id=tag_id)
+    else:
+        recipes = recipes.filter(tags__id__in=tag_ids)
+    return recipes.distinct()
+
+
+def measure(query: QuerySet[Recipe], repeat: int) -> float:
+    """Milliseconds per evaluation of `query`."""
+    list(query.all())  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        # `all()` for a copy without the result cache
+        list(query.all())
+    return (time.perf_counter() - start) / repeat * 1000
@@ -0,0 +1,287 @@
+"""
+Django management command to import a user's recipes from an NDJSON or CSV file.
+
+The file has the format of the recipe export (see recipe.export): the recipe fields, and the
+names of its tags and ingredients, a list in NDJSON and joined with `|` in CSV. Other fields,
+like `id`, are ignored.
+
+Recipes are imported in chunks, each in a transaction that also records how far into the file
+the import got (`RecipeImport`). Running the command again after a failure resumes after the
+last committed chunk, provided the part of the file imported so far hasn't changed; rows
+appended to an imported file are imported by running it again.
+"""
+
+import csv
+import hashlib
+import itertools
+import json
+import time
+from collections.abc import Iterable, Iterator, Mapping
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, cast
+
+from core.models import Ingredient, Recipe, RecipeImport, Tag, User
+from core.signals import content_changed
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection, transaction
+from django.db.models import Field, Model
+from django.utils import timezone
+
+from recipe.export import CSVRenderer
+from recipe.serializers import get_or_create_attrs
+
+FIELDS = ["title", "description", "time_minutes", "price", "link"]
+ATTR_FIELDS = ["tags", "ingredients"]
+# The recipe columns COPY writes, every NOT NULL one: the model's defaults aren't the database's
+COPY_COLUMNS = ["id", "user_id", *FIELDS, "image", "image_variants", "modified_at"]
+
+
+class Command(BaseCommand):
+    """Command that imports recipes with their tags and ingredients in chunks."""
+
+    help = "Import recipes with their tags and ingredients for a user from an NDJSON or CSV file"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("path", type=Path, help="File to import")
+        parser.add_argument(
+            "--user",
+            required=True,
+            help="Email of the user to import the recipes for",
+        )
+        parser.add_argument(
+            "--format",
+            choices=["ndjson", "csv"],
+            help="File format (default: from the file extension)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Recipes inserted per transaction (default: 1000)",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Import the file from the beginning, even if it was (partly) imported",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Insert with bulk_create on PostgreSQL too, instead of COPY",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        path: Path = options["path"].resolve()
+        chunk_size: int = options["chunk_size"]
+        file_format: str = options["format"] or path.suffix.lstrip(".").lower()
+        if file_format not in ("ndjson", "csv"):
+            raise CommandError(f"Unknown format of {path.name}, pass --format")
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        try:
+            user = User.objects.get(email=options["user"])
+        except User.DoesNotExist as e:
+            raise CommandError(f"No user with email {options['user']}") from e
+
+        self.use_copy = connection.vendor == "postgresql" and not options["no_copy"]
+        if self.use_copy:
+            from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+            # psycopg2's COPY API is different, and it's on its way out
+            self.use_copy = is_psycopg3
+        job, _ = RecipeImport.objects.get_or_create(user=user, source=str(path))
+        if options["restart"]:
+            job.offset, job.digest, job.rows = 0, "", 0
+
+        with path.open("rb") as file:
+            source = Source(file, job)
+            rows = source.ndjson_rows() if file_format == "ndjson" else source.csv_rows()
+
+            imported = 0
+            start = time.perf_counter()
+            for chunk in itertools.batched(rows, chunk_size, strict=False):
+                recipes = [clean_row(job.rows + i, row) for i, row in enumerate(chunk, 1)]
+                with transaction.atomic():
+                    self._insert(user, recipes)
+                    content_changed(user.id)
+                    job.offset, job.digest = source.offset, source.hasher.hexdigest()
+                    job.rows += len(chunk)
+                    job.save()
+
+                imported += len(chunk)
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"{job.rows:,} rows imported ({imported / elapsed:,.0f} rows/s)")
+
+        if not imported:
+            self.stdout.write("Nothing to import")
+            return
+        elapsed = time.perf_counter() - start
+        rate = imported / elapsed
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {imported:,} recipes in {elapsed:.1f}s ({rate:,.0f} rows/s)"
+            )
+        )
+
+    def _insert(self, user: User, recipes: list[dict[str, Any]]) -> None:
+        """Insert the recipes and link them to their tags and ingredients, resolved by name."""
+        if self.use_copy:
+            ids = self._copy_recipes(user, recipes)
+        else:
+            created = Recipe.objects.bulk_create(
+                [Recipe(user=user, **{f: recipe[f] for f in FIELDS}) for recipe in recipes]
+            )
+            ids = [recipe.id for recipe in created]
+
+        tags = get_or_create_attrs(Tag, user, _names(recipes, "tags"))
+        self._link("tags", ids, recipes, tags)
+        ingredients = get_or_create_attrs(Ingredient, user, _names(recipes, "ingredients"))
+        self._link("ingredients", ids, recipes, ingredients)
+
+    def _link(
+        self,
+        field: str,
+        ids: list[int],
+        recipes: list[dict[str, Any]],
+        attrs: Mapping[str, Tag | Ingredient],
+    ) -> None:
+        descriptor = getattr(Recipe, field)
+        target = f"{descriptor.field.m2m_reverse_field_name()}_id"
+        links = [
+            (recipe_id, attrs[name].id)
+            for recipe_id, recipe in zip(ids, recipes, strict=True)
+            for name in recipe[field]
+        ]
+        if self.use_copy:
+            copy(descriptor.through._meta.db_table, ["recipe_id", target], links)
+        else:
+            descriptor.through.objects.bulk_create(
+                [descriptor.through(recipe_id=r, **{target: t}) for r, t in links]
+            )
+
+    def _copy_recipes(self, user: User, recipes: list[dict[str, Any]]) -> list[int]:
+        # COPY doesn't return the generated ids, take them from the sequence up front
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [Recipe._meta.db_table, len(recipes)],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+
+        now = timezone.now()
+        copy(
+            Recipe._meta.db_table,
+            COPY_COLUMNS,
+            (copy_row(id_, user.id, recipe, now) for id_, recipe in zip(ids, recipes, strict=True)),
+        )
+        return ids
+
+
+class Source:
+    """
+    Rows of the file after what `job` already imported. `offset` and `hasher` follow the
+    bytes read, and are at the end of the last row returned.
+    """
+
+    def __init__(self, file: IO[bytes], job: RecipeImport) -> None:
+        self.file = file
+        self.hasher = hashlib.sha256()
+        self.offset = 0
+
+        remaining = job.offset
+        while remaining:
+            block = file.read(min(remaining, 1 << 20))
+            if not block:
+                break
+            self.hasher.update(block)
+            remaining -= len(block)
+        if job.offset and (remaining or self.hasher.hexdigest() != job.digest):
+            raise CommandError(
+                "The file changed since it was (partly) imported, pass --restart to import "
+                "it from the beginning"
+            )
+        self.offset = job.offset
+
+    def _lines(self) -> Iterator[str]:
+        for line in self.file:
+            self.offset += len(line)
+            self.hasher.update(line)
+            yield line.decode("utf-8-sig" if self.offset == len(line) else "utf-8")
+
+    def ndjson_rows(self) -> Iterator[dict[str, Any]]:
+        for line in self._lines():
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    start = self.offset - len(line.encode())
+                    raise CommandError(f"Invalid JSON at byte {start}: {e}") from e
+
+    def csv_rows(self) -> Iterator[dict[str, Any]]:
+        reader = csv.reader(self._lines())
+        if self.offset:
+            # Resuming, the header has been read before
+            position = self.file.tell()
+            self.file.seek(0)
+            header = next(csv.reader([self.file.readline().decode("utf-8-sig")]))
+            self.file.seek(position)
+        else:
+            header = next(reader, [])
+
+        for row in reader:
+            if row:
+                yield dict(zip(header, row, strict=False))
+
+
+def clean_row(number: int, row: Any) -> dict[str, Any]:
+    """Validate a row like the model fields would, CSV values are all strings."""
+    if not isinstance(row, dict):
+        raise CommandError(f"Row {number}: expected an object")
+
+    try:
+        recipe = {
+            name: _model_field(Recipe, name).clean(row.get(name, ""), None) for name in FIELDS
+        }
+        for field in ATTR_FIELDS:
+            names = row.get(field) or []
+            if isinstance(names, str):
+                names = names.split(CSVRenderer.separator)
+            # Tag and ingredient names are the same kind of field
+            name_field = _model_field(Tag, "name")
+            recipe[field] = list(dict.fromkeys(name_field.clean(n, None) for n in _strs(names)))
+    except ValidationError as e:
+        raise CommandError(f"Row {number}: {'; '.join(e.messages)}") from e
+
+    return recipe
+
+
+def _model_field(model: type[Model], name: str) -> Field[Any, Any]:
+    return cast("Field[Any, Any]", model._meta.get_field(name))
+
+
+def _names(recipes: list[dict[str, Any]], field: str) -> Iterator[str]:
+    return (name for recipe in recipes for name in recipe[field])
+
+
+def _strs(values: Iterable[Any]) -> Iterator[str]:
+    for value in values:
+        if not isinstance(value, str):
+            raise ValidationError(f"Expected a name, got {value!r}")
+        yield value
+
+
+def copy_row(id_: int, user_id: int, recipe: Mapping[str, Any], now: datetime) -> tuple[Any, ...]:
+    """The `COPY_COLUMNS` of a recipe, the fields not imported as `bulk_create` inserts them."""
+    return (id_, user_id, *(recipe[f] for f in FIELDS), None, "[]", now)
+
+
+def copy(table: str, columns: list[str], rows: Iterable[Iterable[Any]]) -> None:
+    """`COPY` the rows into the table, PostgreSQL with psycopg 3 only."""
+    quote = connection.ops.quote_name
+    sql = f"COPY {quote(table)} ({', '.join(map(quote, columns))}) FROM STDIN"
+    with connection.cursor() as cursor, cursor.copy(sql) as writer:
+        for row in rows:
+            writer.write_row(row)
@@ -0,0 +1,24 @@
+from rest_framework.pagination import CursorPagination
+
+# Cursor (keyset) pagination seeks to the position encoded in the cursor with an indexed
+# `WHERE` clause instead of an `OFFSET`, so the cost of fetching a page doesn't grow with how
+# deep into the result set it is, and no `COUNT(*)` over the user's rows is needed.
+# The cursor is an opaque base64 token; clients follow the `next`/`previous` links.
+#
+# The default page size comes from `REST_FRAMEWORK["PAGE_SIZE"]`; clients may ask for a
+# different one with `?page_size=`, capped at `max_page_size`.
+
+
+class RecipeCursorPagination(CursorPagination):
+    ordering = "-id"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class RecipeAttrCursorPagination(CursorPagination):
+    # The cursor holds the position in the first ordering field only, with an offset over the
+    # rows sharing that name: `id` makes the order of those rows deterministic, not the position.
+    # Names are unique per user, so the user's lists have no such rows.
+    ordering = ("-name", "id")
+    page_size_query_param = "page_size"
+    max_page_size = 1000
@@ -1,11 +1,21 @@
+from collections import defaultdict
+from collections.abc import Iterable
 from typing import Any
 
 from core.models import Ingredient, Recipe, Tag
+from core.models import User as CustomUser
+from core.signals import batched_content_changes, content_changed
+from core.timing import TimedModelSerializer
+from django.core.files.storage import default_storage
+from django.db import models, transaction
 from django.db.models import Model
+from django.utils import timezone
 from rest_framework import serializers
 
+from recipe.uploads import HeaderImageField
 
-class AbstractAttrSerializer[T: Model](serializers.ModelSerializer[T]):
+
+class AbstractAttrSerializer[T: Model](TimedModelSerializer[T]):
     """Shared serializer for Tag and Ingredient."""
 
     class Meta:
@@ -25,27 +35,58 @@ class IngredientSerializer(AbstractAttrSerializer[Ingredient]):
         model = Ingredient
 
 
+def get_or_create_attrs[T: (Tag, Ingredient)](
+    model: type[T], user: CustomUser, names: Iterable[str]
+) -> dict[str, T]:
+    """
+    Set-based `get_or_create` for the user's tags or ingredients, keyed by name.
+
+    Looks up all existing names in one query and inserts the missing ones in one more,
+    instead of a `get_or_create` round trip per item. Adding the result to the M2M
+    relation then writes all through-table rows in a single `INSERT`.
+    """
+    # Preserve request order, drop repeated names
+    unique_names = list(dict.fromkeys(names))
+    if not unique_names:
+        return {}
+
+    existing = {obj.name: obj for obj in model.objects.filter(user=user, name__in=unique_names)}
+    missing = [model(user=user, name=name) for name in unique_names if name not in existing]
+    # A concurrent request may insert the same name between the lookup and the insert;
+    # upserting on the (user, name) constraint returns that row instead of failing.
+    created = {
+        obj.name: obj
+        for obj in model.objects.bulk_create(
+            missing, update_conflicts=True, unique_fields=["user", "name"], update_fields=["name"]
+        )
+    }
+
+    return {name: existing.get(name) or created[name] for name in unique_names}
+
+
 # Serializers / Actions:
 #   - RecipeSerializer        : list (GET /recipes/) & create/update (POST/PUT/PATCH)
 #   - RecipeDetailSerializer  : retrieve (GET /recipes/{id}/)
 #   - RecipeImageSerializer   : upload action (POST /recipes/{id}/upload-image/)
+#   - RecipeBulkSerializer    : bulk action (POST /recipes/bulk/), see below
 #
-# +--------------+------------------+------------------------+-----------------------+
-# | Field        | RecipeSerializer | RecipeDetailSerializer | RecipeImageSerializer |
-# +--------------+------------------+------------------------+-----------------------+
-# | id           | R                | R                      | R                     |
-# | title        | RW               | RW                     | —                     |
-# | time_minutes | RW               | RW                     | —                     |
-# | price        | RW               | RW                     | —                     |
-# | link         | RW               | RW                     | —                     |
-# | description  | W                | R                      | —                     |
-# | image        | —                | R                      | W                     |
-# +--------------+------------------+------------------------+-----------------------+
+# +----------------+------------------+------------------------+-----------------------+
+# | Field          | RecipeSerializer | RecipeDetailSerializer | RecipeImageSerializer |
+# +----------------+------------------+------------------------+-----------------------+
+# | id             | R                | R                      | R                     |
+# | title          | RW               | RW                     | —                     |
+# | time_minutes   | RW               | RW                     | —                     |
+# | price          | RW               | RW                     | —                     |
+# | link           | RW               | RW                     | —                     |
+# | description    | W                | R                      | —                     |
+# | image          | —                | R                      | W                     |
+# | image_variants | —                | R                      | —                     |
+# +----------------+------------------+------------------------+-----------------------+
 #
 # Legend: R = read-only, W = write-only, RW = read & write, — = not included
 
 
-class RecipeSerializer(serializers.ModelSerializer[Recipe]):
+class RecipeSerializer(TimedModelSerializer[Recipe]):
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
     description = serializers.CharField(write_only=True, required=False)
@@ -67,55 +108,75 @@ class RecipeSerializer(serializers.ModelSerializer[Recipe]):
     def create(self, validated_data: dict[str, Any]) -> Recipe:
         tags: list[dict[str, Any]] = validated_data.pop("tags", [])
         ingredients: list[dict[str, Any]] = validated_data.pop("ingredients", [])
-        recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
+        with batched_content_changes():
+            recipe = Recipe.objects.create(**validated_data)
+            recipe.tags.add(*self._get_or_create_attrs(Tag, tags))
+            recipe.ingredients.add(*self._get_or_create_attrs(Ingredient, ingredients))
 
         return recipe
 
     def update(self, instance: Recipe, validated_data: dict[str, Any]) -> Recipe:
         tags: list[dict[str, Any]] | None = validated_data.pop("tags", None)
         ingredients: list[dict[str, Any]] | None = validated_data.pop("ingredients", None)
-        if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
-        if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+        # `set` diffs against the current links and only deletes/inserts the delta,
+        # so resubmitting unchanged tags or ingredients doesn't touch the through tables.
+        with batched_content_changes():
+            if tags is not None:
+                instance.tags.set(self._get_or_create_attrs(Tag, tags))
+            if ingredients is not None:
+                instance.ingredients.set(self._get_or_create_attrs(Ingredient, ingredients))
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+            changed = [
+                attr for attr, value in validated_data.items() if getattr(instance, attr) != value
+            ]
+            for attr in changed:
+                setattr(instance, attr, validated_data[attr])
 
-        instance.save()
+            if changed:
+                # `auto_now` fields are only saved when listed
+                instance.save(update_fields=[*changed, "modified_at"])
         return instance
 
-    def _get_or_create_tags(self, tags: list[dict[str, Any]], instance: Recipe) -> None:
+    def _get_or_create_attrs[T: (Tag, Ingredient)](
+        self, model: type[T], attrs: list[dict[str, Any]]
+    ) -> list[T]:
         user = self.context["request"].user
-        for tag in tags:
-            tag_obj, _ = Tag.objects.get_or_create(user=user, **tag)
-            instance.tags.add(tag_obj)
+        return list(get_or_create_attrs(model, user, (attr["name"] for attr in attrs)).values())
 
-    def _get_or_create_ingredients(
-        self, ingredients: list[dict[str, Any]], instance: Recipe
-    ) -> None:
-        user = self.context["request"].user
-        for ingredient in ingredients:
-            ingredient_obj, _ = Ingredient.objects.get_or_create(user=user, **ingredient)
-            instance.ingredients.add(ingredient_obj)
+
+class ImageVariantSerializer(serializers.Serializer[dict[str, Any]]):
+    """A resized copy of a recipe image, see recipe.images."""
+
+    width = serializers.IntegerField()
+    format = serializers.CharField()
+    url = serializers.SerializerMethodField()
+
+    def get_url(self, variant: dict[str, Any]) -> str:
+        # Absolute like the image's URL
+        url = default_storage.url(variant["name"])
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
 
 
 class RecipeDetailSerializer(RecipeSerializer):
     description = serializers.CharField(read_only=True)
     image = serializers.ImageField(read_only=True)
+    # Empty until the variants of the image are generated
+    image_variants = ImageVariantSerializer(many=True, read_only=True)
 
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ["image"]
-        read_only_fields = RecipeSerializer.Meta.read_only_fields + ["image"]
+        fields = RecipeSerializer.Meta.fields + ["image", "image_variants"]
+        read_only_fields = RecipeSerializer.Meta.read_only_fields + ["image", "image_variants"]
 
 
 # Separate serializer because it's best practice to upload one type of data to an API;
 # we don't want the same API to accept form data as well as an image (multipart form).
 class RecipeImageSerializer(serializers.ModelSerializer[Recipe]):
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: HeaderImageField,
+    }
+
     class Meta:
         model = Recipe
         fields = ["id", "image"]
@@ -123,5 +184,221 @@ class RecipeImageSerializer(serializers.ModelSerializer[Recipe]):
         extra_kwargs = {"image": {"required": True}}
 
 
+class RecipeBulkUpdateSerializer(RecipeSerializer):
+    """A bulk update item: the recipe id plus the fields to change."""
+
+    id = serializers.IntegerField()
+
+    class Meta(RecipeSerializer.Meta):
+        read_only_fields = []
+        extra_kwargs = {
+            "title": {"required": False},
+            "time_minutes": {"required": False},
+            "price": {"required": False},
+        }
+
+
+# Request and response have the same shape:
+#   {"create": [recipe, ...], "update": [{"id": 1, ...}, ...], "delete": [id, ...]}
+#
+# Every item is validated before anything is written; if any item is invalid, nothing is
+# written and the errors are returned per item (by position). Otherwise, the tags and
+# ingredients of the whole batch are resolved with a handful of set-based queries, and all
+# writes happen in a single transaction. The response echoes the written recipes in request
+# order.
+class RecipeBulkSerializer(serializers.Serializer[dict[str, Any]]):
+    max_items = 1000
+
+    # The field names would shadow `create` and `update`, so they can't be class attributes.
+    def get_fields(self) -> dict[str, serializers.Field[Any, Any, Any, Any]]:
+        return {
+            "create": serializers.ListSerializer(
+                child=RecipeSerializer(), required=False, max_length=self.max_items
+            ),
+            "update": serializers.ListSerializer(
+                child=RecipeBulkUpdateSerializer(), required=False, max_length=self.max_items
+            ),
+            "delete": serializers.ListField(
+                child=serializers.IntegerField(), required=False, max_length=self.max_items
+            ),
+        }
+
+    def validate(self, attrs: dict[str, Any]) -> dict[str, Any]:
+        update_ids = [item["id"] for item in attrs.get("update", [])]
+        delete_ids: list[int] = attrs.get("delete", [])
+        owned = set(
+            Recipe.objects.filter(
+                user=self.context["request"].user, id__in=update_ids + delete_ids
+            ).values_list("id", flat=True)
+        )
+
+        seen: set[int] = set()
+
+        def check(recipe_id: int) -> str | None:
+            if recipe_id not in owned:
+                return f"Recipe {recipe_id} not found."
+            if recipe_id in seen:
+                return f"Recipe {recipe_id} appears more than once."
+            seen.add(recipe_id)
+            return None
+
+        # Errors are keyed by item position, the same shape DRF uses for nested lists
+        errors: dict[str, Any] = {}
+        update_errors = {
+            idx: {"id": [msg]} for idx, i in enumerate(update_ids) if (msg := check(i))
+        }
+        if update_errors:
+            errors["update"] = update_errors
+        delete_errors = {idx: [msg] for idx, i in enumerate(delete_ids) if (msg := check(i))}
+        if delete_errors:
+            errors["delete"] = delete_errors
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        return attrs
+
+    def create(self, validated_data: dict[str, Any]) -> dict[str, Any]:
+        user = self.context["request"].user
+        creates: list[dict[str, Any]] = validated_data.get("create", [])
+        updates: list[dict[str, Any]] = validated_data.get("update", [])
+        deletes: list[int] = validated_data.get("delete", [])
+        items = creates + updates
+
+        with transaction.atomic(), batched_content_changes():
+            tags = get_or_create_attrs(
+                Tag, user, (tag["name"] for item in items for tag in item.get("tags", []))
+            )
+            ingredients = get_or_create_attrs(
+                Ingredient,
+                user,
+                (
+                    ingredient["name"]
+                    for item in items
+                    for ingredient in item.get("ingredients", [])
+                ),
+            )
+
+            created = Recipe.objects.bulk_create(
+                [Recipe(user=user, **self._recipe_fields(item)) for item in creates]
+            )
+            updated = self._bulk_update(updates)
+            recipes = list(zip(created, creates, strict=True)) + list(
+                zip(updated, updates, strict=True)
+            )
+
+            self._set_links(
+                "tags",
+                {
+                    recipe.id: {tags[tag["name"]].id for tag in item["tags"]}
+                    for recipe, item in recipes
+                    if "tags" in item
+                },
+            )
+            self._set_links(
+                "ingredients",
+                {
+                    recipe.id: {
+                        ingredients[ingredient["name"]].id for ingredient in item["ingredients"]
+                    }
+                    for recipe, item in recipes
+                    if "ingredients" in item
+                },
+            )
+
+            Recipe.objects.filter(user=user, id__in=deletes).delete()
+            # The bulk writes above send no signals. They've already set `modified_at`.
+            if recipes:
+                content_changed(user.id)
+
+        written = Recipe.objects.prefetch_related("tags", "ingredients").in_bulk(
+            [recipe.id for recipe, _ in recipes]
+        )
+        return {
+            "create": [written[recipe.id] for recipe in created],
+            "update": [written[recipe.id] for recipe in updated],
+            "delete": deletes,
+        }
+
+    def _recipe_fields(self, item: dict[str, Any]) -> dict[str, Any]:
+        return {k: v for k, v in item.items() if k not in ("id", "tags", "ingredients")}
+
+    def _bulk_update(self, updates: list[dict[str, Any]]) -> list[Recipe]:
+        """
+        Apply the update items with a single `UPDATE` covering every changed field. Every
+        updated recipe's `modified_at` is stamped too, its links may have changed.
+        """
+        by_id = Recipe.objects.in_bulk([item["id"] for item in updates])
+        recipes = [by_id[item["id"]] for item in updates]
+
+        now = timezone.now()
+        changed = {"modified_at"}
+        for recipe, item in zip(recipes, updates, strict=True):
+            recipe.modified_at = now
+            for attr, value in self._recipe_fields(item).items():
+                if getattr(recipe, attr) != value:
+                    setattr(recipe, attr, value)
+                    changed.add(attr)
+
+        if recipes:
+            Recipe.objects.bulk_update(recipes, sorted(changed))
+        return recipes
+
+    def _set_links(self, field: str, links: dict[int, set[int]]) -> None:
+        """
+        Like `RelatedManager.set` for many recipes at once: one query reads the current
+        links of all recipes, one deletes the stale ones and one inserts the new ones.
+        """
+        if not links:
+            return
+
+        descriptor = getattr(Recipe, field)
+        through = descriptor.through
+        source = f"{descriptor.field.m2m_field_name()}_id"
+        target = f"{descriptor.field.m2m_reverse_field_name()}_id"
+
+        current: dict[int, set[int]] = defaultdict(set)
+        stale: list[int] = []
+        rows = through.objects.filter(**{f"{source}__in": links}).values_list("pk", source, target)
+        for pk, recipe_id, target_id in rows:
+            if target_id in links[recipe_id]:
+                current[recipe_id].add(target_id)
+            else:
+                stale.append(pk)
+
+        if stale:
+            through.objects.filter(pk__in=stale).delete()
+        through.objects.bulk_create(
+            [
+                through(**{source: recipe_id, target: target_id})
+                for recipe_id, target_ids in links.items()
+                for target_id in target_ids - current[recipe_id]
+            ]
+        )
+
+
+# Ids a recipe filter accepts: `match=all` adds a subquery per id, and databases limit the size
+# of a query (SQLite's expression tree to a depth of 1000)
+MAX_FILTER_IDS = 100
+
+
+class CommaSeparatedIntegersField(serializers.ListField):
+    """A list of integers given as a comma separated query parameter, e.g. `?tags=1,2`."""
+
+    # Positive ids a `BigAutoField` can hold, larger integers don't fit the database's
+    child = serializers.IntegerField(min_value=1, max_value=2**63 - 1)
+
+    def to_internal_value(self, data: Any) -> list[int]:
+        # Query params arrive as a list of (possibly repeated) raw values
+        values = [data] if isinstance(data, str) else data
+        parts = [part for value in values for part in str(value).split(",") if part]
+        return super().to_internal_value(parts)
+
+
+class RecipeFilterParamsSerializer(serializers.Serializer[dict[str, Any]]):
+    tags = CommaSeparatedIntegersField(required=False, max_length=MAX_FILTER_IDS)
+    ingredients = CommaSeparatedIntegersField(required=False, max_length=MAX_FILTER_IDS)
+    match = serializers.ChoiceField(choices=["any", "all"], default="any")
+
+
 class BoolParamsSerializer(serializers.Serializer[dict[str, bool | None]]):
     assigned_only = serializers.BooleanField(required=False)
@@ -0,0 +1,21 @@
+"""
+Delete the files derived from a recipe image, its variants (see recipe.images) and
+transformations (see recipe.transforms), along with the image's file. That's deleted by
+core.signals once no recipe references it, with `RECIPE_IMAGE_DELETE_ON_REPLACE`, or by the
+commands collecting the files.
+"""
+
+from typing import Any
+
+from core.models import Recipe
+from core.signals import image_deleted
+from django.dispatch import receiver
+
+from recipe.images import delete_variants
+from recipe.transforms import delete_transforms
+
+
+@receiver(image_deleted)
+def image_file_deleted(sender: type[Recipe], name: str, **kwargs: Any) -> None:
+    delete_variants(name)
+    delete_transforms(name)
@@ -0,0 +1,23 @@
+from io import StringIO
+
+from core.tests.factories import UserFactory
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+
+class BenchmarkFiltersCommandTests(TestCase):
+    def test_compares_filters(self) -> None:
+        call_command("seed_data", "--users=2", "--recipes=40", stdout=StringIO())
+        out = StringIO()
+
+        call_command("benchmark_filters", "--tags=3", "--repeat=1", stdout=out)
+
+        for name in ("any full", "any page", "all full", "all page"):
+            self.assertIn(name, out.getvalue())
+
+    def test_no_recipes(self) -> None:
+        UserFactory.create()
+
+        with self.assertRaisesMessage(CommandError, "No recipes"):
+            call_command("benchmark_filters", stdout=StringIO())
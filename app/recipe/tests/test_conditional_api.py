@@ -0,0 +1,178 @@
+from collections.abc import Callable
+from datetime import timedelta
+from http import HTTPStatus
+
+from core.models import ContentVersion, Recipe
+from core.models import User as CustomUser
+from core.tests.factories import IngredientFactory, RecipeFactory, TagFactory, UserFactory
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+
+class ConditionalGetAPITests(TestCase):
+    api_client: APIClient
+    recipes_url: str
+    tags_url: str
+    user: CustomUser
+
+    @classmethod
+    def setUpTestData(cls: type[ConditionalGetAPITests]) -> None:
+        cls.api_client = APIClient()
+        cls.user = UserFactory.create()
+        cls.api_client.force_authenticate(cls.user)
+        cls.recipes_url = reverse("recipe:recipe-list")
+        cls.tags_url = reverse("recipe:tag-list")
+
+    def _recipe_detail_url(self, recipe_id: int) -> str:
+        return reverse("recipe:recipe-detail", args=[recipe_id])
+
+    def _etag(self, url: str, **params: str) -> str:
+        res = self.api_client.get(url, params)
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        return str(res["ETag"])
+
+    def test_list_not_modified(self) -> None:
+        RecipeFactory.create_batch(2, user=self.user)
+        etag = self._etag(self.recipes_url)
+
+        # Only the content version is read
+        with self.assertNumQueries(1):
+            res = self.api_client.get(self.recipes_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+        self.assertIn("private", res["Cache-Control"])
+
+    def test_detail_not_modified(self) -> None:
+        recipe = RecipeFactory.create(user=self.user)
+        url = self._recipe_detail_url(recipe.id)
+        etag = self._etag(url)
+
+        with self.assertNumQueries(1):
+            res = self.api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_detail_if_modified_since(self) -> None:
+        recipe = RecipeFactory.create(user=self.user)
+        url = self._recipe_detail_url(recipe.id)
+        res = self.api_client.get(url)
+        last_modified = res["Last-Modified"]
+
+        res = self.api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(res.status_code, HTTPStatus.NOT_MODIFIED)
+
+        earlier = http_date((recipe.modified_at - timedelta(seconds=5)).timestamp())
+        res = self.api_client.get(url, HTTP_IF_MODIFIED_SINCE=earlier)
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+
+    def test_list_etag_changes_on_write(self) -> None:
+        recipe = RecipeFactory.create(user=self.user)
+        tag = TagFactory.create(user=self.user)
+        etags = {self._etag(self.recipes_url)}
+
+        writes: list[Callable[[], object]] = [
+            lambda: RecipeFactory.create(user=self.user),
+            lambda: recipe.tags.add(tag),
+            lambda: recipe.tags.remove(tag),
+            lambda: self.api_client.patch(
+                self._recipe_detail_url(recipe.id), {"title": "New title"}
+            ),
+            lambda: self.api_client.delete(self._recipe_detail_url(recipe.id)),
+        ]
+        for write in writes:
+            write()
+            etags.add(self._etag(self.recipes_url))
+
+        self.assertEqual(len(etags), len(writes) + 1)
+
+    def test_detail_etag_changes_on_linked_attr_rename(self) -> None:
+        tag = TagFactory.create(user=self.user)
+        recipe = RecipeFactory.create(user=self.user, tags=[tag])
+        url = self._recipe_detail_url(recipe.id)
+        etag = self._etag(url)
+
+        res = self.api_client.patch(
+            reverse("recipe:tag-detail", args=[tag.id]), {"name": "renamed"}
+        )
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+
+        res = self.api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.assertEqual(res.data["tags"][0]["name"], "renamed")
+
+    def test_detail_etag_changes_on_linked_attr_delete(self) -> None:
+        ingredient = IngredientFactory.create(user=self.user)
+        recipe = RecipeFactory.create(user=self.user, ingredients=[ingredient])
+        url = self._recipe_detail_url(recipe.id)
+        etag = self._etag(url)
+
+        ingredient.delete()
+
+        res = self.api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.assertEqual(res.data["ingredients"], [])
+
+    def test_bulk_write_changes_etags(self) -> None:
+        recipe = RecipeFactory.create(user=self.user)
+        url = self._recipe_detail_url(recipe.id)
+        list_etag = self._etag(self.recipes_url)
+        detail_etag = self._etag(url)
+
+        payload = {"update": [{"id": recipe.id, "tags": [{"name": "bulk"}]}]}
+        res = self.api_client.post(reverse("recipe:recipe-bulk"), payload, format="json")
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+
+        self.assertNotEqual(self._etag(self.recipes_url), list_etag)
+        self.assertNotEqual(self._etag(url), detail_etag)
+
+    def test_etag_differs_by_query(self) -> None:
+        tag = TagFactory.create(user=self.user)
+        RecipeFactory.create(user=self.user, tags=[tag])
+
+        self.assertNotEqual(
+            self._etag(self.recipes_url), self._etag(self.recipes_url, tags=str(tag.id))
+        )
+
+    def test_etag_differs_by_user(self) -> None:
+        other = UserFactory.create()
+        etag = self._etag(self.tags_url)
+
+        self.api_client.force_authenticate(other)
+        res = self.api_client.get(self.tags_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+
+    def test_tag_list_not_modified(self) -> None:
+        TagFactory.create(user=self.user)
+        etag = self._etag(self.tags_url)
+
+        res = self.api_client.get(self.tags_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, HTTPStatus.NOT_MODIFIED)
+
+        TagFactory.create(user=self.user)
+        res = self.api_client.get(self.tags_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+
+    def test_missing_recipe_not_found(self) -> None:
+        recipe = RecipeFactory.create(user=UserFactory.create())
+
+        res = self.api_client.get(self._recipe_detail_url(recipe.id), HTTP_IF_NONE_MATCH="*")
+
+        self.assertEqual(res.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_invalid_recipe_id_not_found(self) -> None:
+        res = self.api_client.get("/api/recipe/recipes/abc/", HTTP_IF_NONE_MATCH="*")
+
+        self.assertEqual(res.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_deleting_user_removes_content_version(self) -> None:
+        user = UserFactory.create()
+        RecipeFactory.create(user=user, tags=TagFactory.create_batch(2, user=user))
+
+        user.delete()
+
+        self.assertFalse(ContentVersion.objects.filter(user_id=user.id).exists())
+        self.assertFalse(Recipe.objects.filter(user_id=user.id).exists())
@@ -0,0 +1,111 @@
+import io
+import os
+import shutil
+from http import HTTPStatus
+from pathlib import Path
+from unittest import mock
+
+from core.models import Recipe
+from core.tests.factories import RecipeFactory, UserFactory
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from recipe.transforms import TRANSFORMS_DIR, evict, render_transform, transform_path
+
+TRANSFORMS = {"WIDTHS": [100, 200, 800], "QUALITY": 80, "MAX_BYTES": 1024**2}
+
+
+@override_settings(RECIPE_IMAGE_TRANSFORMS=TRANSFORMS)
+class ImageTransformTests(TestCase):
+    recipe: Recipe
+
+    @classmethod
+    def setUpTestData(cls: type[ImageTransformTests]) -> None:
+        cls.recipe = RecipeFactory.create(user=UserFactory.create())
+        buffer = io.BytesIO()
+        Image.new("RGB", (400, 300), "red").save(buffer, "JPEG")
+        cls.recipe.image.save("photo.jpg", ContentFile(buffer.getvalue()))
+
+    @classmethod
+    def tearDownClass(cls: type[ImageTransformTests]) -> None:
+        cls.recipe.image.delete(save=False)
+        super().tearDownClass()
+
+    def setUp(self) -> None:
+        self.addCleanup(
+            shutil.rmtree, Path(settings.MEDIA_ROOT, TRANSFORMS_DIR), ignore_errors=True
+        )
+
+    def _url(self, width: int, name: str) -> str:
+        return f"/media/transforms/{width}/{name}"
+
+    def test_rendered_and_cached(self) -> None:
+        name = f"{self.recipe.image.name}.webp"
+
+        res = self.client.get(self._url(200, name))
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.assertEqual(res["Content-Type"], "image/webp")
+        self.assertIn("immutable", res["Cache-Control"])
+        content = b"".join(res.streaming_content)  # type: ignore[attr-defined]
+        with Image.open(io.BytesIO(content)) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (200, 150)))
+        # Written where nginx looks for it, for the next requests
+        path = transform_path(200, name)
+        self.assertEqual(path.read_bytes(), content)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o644)
+        with mock.patch("recipe.transforms.encode") as encode:
+            self.assertEqual(render_transform(200, name), path)
+        encode.assert_not_called()
+
+    def test_not_enlarged(self) -> None:
+        res = self.client.get(self._url(800, f"{self.recipe.image.name}.jpg"))
+
+        content = b"".join(res.streaming_content)  # type: ignore[attr-defined]
+        with Image.open(io.BytesIO(content)) as image:
+            self.assertEqual((image.format, image.size), ("JPEG", (400, 300)))
+
+    def test_not_found(self) -> None:
+        image = self.recipe.image.name
+        for width, name in [
+            (300, f"{image}.webp"),  # Width not allowed
+            (200, f"{image}.gif"),
+            (200, "recipe/missing.jpg.webp"),
+            (200, "recipe/variants/photo-320w.jpg.webp"),
+            (200, "recipe/../.health/x.webp"),
+        ]:
+            with self.subTest(width=width, name=name):
+                self.assertEqual(
+                    self.client.get(self._url(width, name)).status_code, HTTPStatus.NOT_FOUND
+                )
+
+    def test_least_recently_used_evicted(self) -> None:
+        paths = []
+        for n in range(10):
+            path = transform_path(100, f"recipe/{n}.jpg.webp")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"x" * 100)
+            os.utime(path, (1000 + n, 1000 + n))
+            paths.append(path)
+        # Used recently, although written first
+        os.utime(paths[0], (2000, 1000))
+
+        self.assertEqual(evict(1000), (0, 0))
+        with self.assertLogs("recipe.transforms") as logs:
+            # Down to 90% of the limit
+            self.assertEqual(evict(900), (2, 200))
+            self.assertEqual(evict(500), (4, 400))
+        self.assertIn("Evicted 2 image transforms, 200 bytes", logs.output[0])
+
+        self.assertEqual([path.exists() for path in paths], [True] + [False] * 6 + [True] * 3)
+
+    def test_eviction_after_writes(self) -> None:
+        with (
+            override_settings(RECIPE_IMAGE_TRANSFORMS={**TRANSFORMS, "MAX_BYTES": 100}),
+            mock.patch("recipe.transforms.evict") as evict,
+        ):
+            render_transform(100, f"{self.recipe.image.name}.webp")
+
+        evict.assert_called_once_with(100)
@@ -0,0 +1,193 @@
+import json
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from typing import Any
+
+from core.models import ContentVersion, Recipe, RecipeImport, Tag
+from core.models import User as CustomUser
+from core.tests.factories import TagFactory, UserFactory
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import NOT_PROVIDED
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from recipe.management.commands.import_recipes import COPY_COLUMNS, copy_row
+
+
+def recipe_row(i: int, **kwargs: Any) -> dict[str, Any]:
+    return {
+        "title": f"Recipe {i}",
+        "time_minutes": i,
+        "price": "5.50",
+        "tags": ["vegan", f"tag-{i % 2}"],
+        "ingredients": ["salt"],
+    } | kwargs
+
+
+class ImportRecipesCommandTests(TestCase):
+    user: CustomUser
+
+    @classmethod
+    def setUpTestData(cls: type[ImportRecipesCommandTests]) -> None:
+        cls.user = UserFactory.create()
+
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def _write_ndjson(self, rows: list[Any], name: str = "recipes.ndjson") -> Path:
+        path = self.dir / name
+        path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+        return path
+
+    def _import(self, path: Path, *args: str) -> str:
+        out = StringIO()
+        call_command("import_recipes", str(path), "--user", self.user.email, *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_ndjson(self) -> None:
+        existing = TagFactory.create(user=self.user, name="vegan")
+        version = ContentVersion.objects.get(user=self.user).version
+        path = self._write_ndjson([recipe_row(i, id=1000 + i) for i in range(1, 6)])
+
+        out = self._import(path, "--chunk-size", "2")
+
+        self.assertIn("Imported 5 recipes", out)
+        self.assertIn("rows/s", out)
+        recipes = Recipe.objects.filter(user=self.user).order_by("id")
+        self.assertEqual([r.title for r in recipes], [f"Recipe {i}" for i in range(1, 6)])
+        self.assertEqual(recipes[0].price, Decimal("5.50"))
+        self.assertEqual(sorted(recipes[0].tags.values_list("name", flat=True)), ["tag-1", "vegan"])
+        self.assertIn(existing, recipes[4].tags.all())
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(recipes[2].ingredients.get().name, "salt")
+        self.assertGreater(ContentVersion.objects.get(user=self.user).version, version)
+
+    def test_import_csv(self) -> None:
+        path = self.dir / "recipes.csv"
+        path.write_text(
+            "﻿id,title,time_minutes,price,link,tags,ingredients\n"
+            '7,"Salt, ""pepper""",10,1.00,,a|b,\n'
+            "8,Plain,5,2.00,https://example.com,,salt\n"
+        )
+
+        self._import(path)
+
+        first, second = Recipe.objects.filter(user=self.user).order_by("id")
+        self.assertEqual(first.title, 'Salt, "pepper"')
+        self.assertEqual(sorted(first.tags.values_list("name", flat=True)), ["a", "b"])
+        self.assertFalse(first.ingredients.exists())
+        self.assertEqual(second.link, "https://example.com")
+        self.assertEqual(second.ingredients.get().name, "salt")
+
+    def test_query_count_independent_of_chunk_size(self) -> None:
+        small = self._write_ndjson([recipe_row(i) for i in range(2)], "small.ndjson")
+        # New tags and ingredients in both, so both create them
+        large = self._write_ndjson(
+            [recipe_row(i, tags=["a", f"b-{i % 5}"], ingredients=["pepper"]) for i in range(50)],
+            "large.ndjson",
+        )
+
+        with self.assertNumQueries(16) as few:
+            self._import(small, "--chunk-size", "100")
+        with self.assertNumQueries(len(few.captured_queries)):
+            self._import(large, "--chunk-size", "100")
+
+    def test_invalid_row(self) -> None:
+        for row, error in (
+            (recipe_row(1, title=""), "cannot be blank"),
+            (recipe_row(1, price="abc"), "decimal"),
+            (recipe_row(1, tags=[1]), "Expected a name"),
+            ([], "expected an object"),
+        ):
+            path = self._write_ndjson([recipe_row(0), row])
+            with self.subTest(row=row), self.assertRaisesMessage(CommandError, error):
+                self._import(path, "--restart")
+
+    def test_resume_after_failure(self) -> None:
+        rows: list[Any] = [recipe_row(i) for i in range(1, 6)]
+        rows.append(recipe_row(6, time_minutes="x"))
+        path = self._write_ndjson(rows)
+
+        with self.assertRaisesMessage(CommandError, "Row 6"):
+            self._import(path, "--chunk-size", "2")
+        # The chunks before the failing one are kept
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 4)
+
+        rows[5] = recipe_row(6)
+        path = self._write_ndjson(rows)
+        out = self._import(path, "--chunk-size", "2")
+
+        self.assertIn("Imported 2 recipes", out)
+        titles = Recipe.objects.filter(user=self.user).values_list("title", flat=True)
+        self.assertCountEqual(titles, [f"Recipe {i}" for i in range(1, 7)])
+        self.assertEqual(RecipeImport.objects.get(user=self.user).rows, 6)
+
+    def test_imported_file_not_reimported(self) -> None:
+        path = self._write_ndjson([recipe_row(1)])
+        self._import(path)
+
+        out = self._import(path)
+
+        self.assertIn("Nothing to import", out)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_appended_rows_imported(self) -> None:
+        path = self._write_ndjson([recipe_row(1)])
+        self._import(path)
+        self._write_ndjson([recipe_row(1), recipe_row(2)])
+
+        self._import(path)
+
+        titles = Recipe.objects.filter(user=self.user).values_list("title", flat=True)
+        self.assertCountEqual(titles, ["Recipe 1", "Recipe 2"])
+
+    def test_changed_file_needs_restart(self) -> None:
+        path = self._write_ndjson([recipe_row(1)])
+        self._import(path)
+        self._write_ndjson([recipe_row(2)])
+
+        with self.assertRaisesMessage(CommandError, "--restart"):
+            self._import(path)
+        self._import(path, "--restart")
+
+        titles = Recipe.objects.filter(user=self.user).values_list("title", flat=True)
+        self.assertCountEqual(titles, ["Recipe 1", "Recipe 2"])
+
+    def test_resume_csv(self) -> None:
+        path = self.dir / "recipes.csv"
+        path.write_text("title,time_minutes,price\nOne,1,1.00\n")
+        self._import(path)
+        path.write_text("title,time_minutes,price\nOne,1,1.00\nTwo,2,2.00\n")
+
+        self._import(path)
+
+        titles = Recipe.objects.filter(user=self.user).values_list("title", flat=True)
+        self.assertCountEqual(titles, ["One", "Two"])
+
+    def test_unknown_user(self) -> None:
+        path = self._write_ndjson([recipe_row(1)])
+
+        with self.assertRaisesMessage(CommandError, "No user"):
+            call_command("import_recipes", str(path), "--user", "nobody@example.com")
+
+
+class CopyColumnsTests(SimpleTestCase):
+    def test_not_null_columns_copied(self) -> None:
+        # COPY leaves the columns it doesn't write to their database defaults
+        required = {
+            field.column
+            for field in Recipe._meta.concrete_fields
+            if not field.null and field.db_default is NOT_PROVIDED
+        }
+
+        self.assertLessEqual(required, set(COPY_COLUMNS))
+        self.assertEqual(len(set(COPY_COLUMNS)), len(COPY_COLUMNS))
+        row = copy_row(1, 2, recipe_row(1, description="", link=""), timezone.now())
+        self.assertEqual(len(row), len(COPY_COLUMNS))
+        # No image, like a recipe created without one
+        self.assertIsNone(row[COPY_COLUMNS.index("image")])
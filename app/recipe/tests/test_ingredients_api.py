@@ -50,9 +50,9 @@ class PrivateIngredientsAPITests(TestCase):
 
         self.assertEqual(res.status_code, HTTPStatus.OK)
 
-        ingredients = Ingredient.objects.all().order_by("-name")
+        ingredients = Ingredient.objects.all().order_by("-name", "id")
         serializer = IngredientSerializer(ingredients, many=True)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_tags_limited_to_user(self) -> None:
         user2 = UserFactory.create()
@@ -62,8 +62,8 @@ class PrivateIngredientsAPITests(TestCase):
         res = self.api_client.get(self.ingredients_url)
 
         self.assertEqual(res.status_code, HTTPStatus.OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0], IngredientSerializer(ingredient).data)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0], IngredientSerializer(ingredient).data)
 
     def test_update_ingredient(self) -> None:
         ingredient = IngredientFactory.create(user=self.user)
@@ -78,6 +78,17 @@ class PrivateIngredientsAPITests(TestCase):
         actual = IngredientSerializer(ingredient).data
         self.assertEqual(actual, expected)
 
+    def test_rename_ingredient_to_existing_name_error(self) -> None:
+        existing, ingredient = IngredientFactory.create_batch(2, user=self.user)
+
+        url = self._ingredient_detail_url(ingredient.id)
+        res = self.api_client.patch(url, {"name": existing.name})
+
+        self.assertEqual(res.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn("name", res.data)
+        ingredient.refresh_from_db()
+        self.assertNotEqual(ingredient.name, existing.name)
+
     def test_delete_ingredient(self) -> None:
         ingredient = IngredientFactory.create(user=self.user)
 
@@ -99,8 +110,8 @@ class PrivateIngredientsAPITests(TestCase):
         s1 = IngredientSerializer(ingredient1)
         s2 = IngredientSerializer(ingredient2)
 
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data["results"])
+        self.assertNotIn(s2.data, res.data["results"])
 
     def test_filter_ingredients_unique(self) -> None:
         ingredient = IngredientFactory.create(user=self.user)
@@ -115,4 +126,4 @@ class PrivateIngredientsAPITests(TestCase):
         params = {"assigned_only": True}
         res = self.api_client.get(self.ingredients_url, params)
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
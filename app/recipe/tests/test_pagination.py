@@ -0,0 +1,35 @@
+from core.models import Tag
+from core.tests.factories import TagFactory, UserFactory
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from recipe.pagination import RecipeAttrCursorPagination
+
+
+class RecipeAttrCursorPaginationTests(TestCase):
+    tag_ids: list[int]
+
+    @classmethod
+    def setUpTestData(cls: type[RecipeAttrCursorPaginationTests]) -> None:
+        # Unique per user only, so the same name needs a user per tag
+        tags = [TagFactory.create(user=UserFactory.create(), name="Vegan") for _ in range(7)]
+        tags += [TagFactory.create(user=tags[0].user, name=name) for name in ("Alpha", "Zeta")]
+        cls.tag_ids = [t.id for t in tags]
+
+    def test_pages_through_equal_names(self) -> None:
+        paginator = RecipeAttrCursorPagination()
+        queryset = Tag.objects.order_by("-name", "id")
+        url: str | None = "/tags/?page_size=2"
+        seen: list[int] = []
+
+        while url is not None:
+            request = Request(APIRequestFactory().get(url))
+            page = paginator.paginate_queryset(queryset, request)
+            assert page is not None
+            seen += [t.id for t in page]
+            url = paginator.get_next_link()
+
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(sorted(seen), sorted(self.tag_ids))
+        self.assertEqual(seen, list(queryset.values_list("id", flat=True)))
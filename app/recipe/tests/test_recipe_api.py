@@ -1,18 +1,36 @@
+import io
 import os
+import re
+import struct
 import tempfile
+import zlib
 from http import HTTPStatus
 from typing import Any
+from unittest import skipUnless
+from unittest.mock import patch
 
 from core.models import Recipe, Tag
 from core.models import User as CustomUser
 from core.tests.factories import IngredientFactory, RecipeFactory, TagFactory, UserFactory
-from django.test import TestCase
+from core.tests.query_budget import QueryBudgetTestCase
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from faker import Faker
-from PIL import Image
-from rest_framework.test import APIClient, APITestCase
+from PIL import Image, ImageFile
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
 
-from recipe.serializers import RecipeDetailSerializer, RecipeSerializer
+from recipe.serializers import (
+    MAX_FILTER_IDS,
+    RecipeDetailSerializer,
+    RecipeSerializer,
+    get_or_create_attrs,
+)
+from recipe.views import RecipeViewSet
+
+UPLOADS = {"MAX_BYTES": 1024**2, "MAX_PIXELS": 10**6, "FORMATS": ["JPEG", "PNG"]}
 
 
 class PublicRecipeAPITests(TestCase):
@@ -30,7 +48,7 @@ class PublicRecipeAPITests(TestCase):
         self.assertEqual(res.status_code, HTTPStatus.UNAUTHORIZED)
 
 
-class PrivateRecipeAPITests(TestCase):
+class PrivateRecipeAPITests(QueryBudgetTestCase):
     api_client: APIClient
     recipes_url: str
     user: CustomUser
@@ -56,7 +74,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, HTTPStatus.OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_recipe_list_limited_to_user(self) -> None:
         other_user = UserFactory.create()
@@ -69,7 +87,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, HTTPStatus.OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_get_recipe_detail(self) -> None:
         recipe = RecipeFactory.create(user=self.user)
@@ -80,6 +98,79 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeDetailSerializer(recipe)
         self.assertEqual(res.data, serializer.data)
 
+    def test_list_recipes_paginated_by_cursor(self) -> None:
+        recipes = RecipeFactory.create_batch(5, user=self.user)
+        expected = [r.id for r in sorted(recipes, key=lambda r: r.id, reverse=True)]
+
+        ids: list[int] = []
+        url: str | None = self.recipes_url
+        params: dict[str, Any] = {"page_size": 2}
+        pages = 0
+        while url:
+            res = self.api_client.get(url, params)
+            self.assertEqual(res.status_code, HTTPStatus.OK)
+            self.assertLessEqual(len(res.data["results"]), 2)
+            ids.extend(r["id"] for r in res.data["results"])
+            url = res.data["next"]
+            # The `next` link carries the page size along with the cursor
+            params = {}
+            pages += 1
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(ids, expected)
+
+    def test_list_recipes_invalid_cursor(self) -> None:
+        res = self.api_client.get(self.recipes_url, {"cursor": "not-a-cursor"})
+
+        self.assertEqual(res.status_code, HTTPStatus.NOT_FOUND)
+
+    def _create_recipes_with_attrs(self, count: int) -> None:
+        for _ in range(count):
+            RecipeFactory.create(
+                user=self.user,
+                tags=TagFactory.create_batch(2, user=self.user),
+                ingredients=IngredientFactory.create_batch(2, user=self.user),
+            )
+
+    def test_list_query_count_independent_of_recipe_count(self) -> None:
+        self._create_recipes_with_attrs(2)
+        # content version + recipes + prefetched tags + prefetched ingredients
+        with self.assertMaxQueries(4) as few:
+            res = self.api_client.get(self.recipes_url)
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+
+        self._create_recipes_with_attrs(10)
+        with self.assertMaxQueries(4) as many:
+            res = self.api_client.get(self.recipes_url)
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+
+        self.assertEqual(len(many.captured_queries), len(few.captured_queries))
+
+    def test_list_recipe_includes_tags_and_ingredients(self) -> None:
+        tag = TagFactory.create(user=self.user)
+        ingredient = IngredientFactory.create(user=self.user)
+        recipe = RecipeFactory.create(user=self.user, tags=[tag], ingredients=[ingredient])
+
+        res = self.api_client.get(self.recipes_url)
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.assertEqual(res.data["results"], [RecipeSerializer(recipe).data])
+
+    def test_get_recipe_detail_query_budget(self) -> None:
+        recipe = RecipeFactory.create(
+            user=self.user,
+            tags=TagFactory.create_batch(3, user=self.user),
+            ingredients=IngredientFactory.create_batch(3, user=self.user),
+        )
+        url = self._recipe_detail_url(recipe.id)
+
+        # modified_at (the conditional GET validator) + recipe + tags + ingredients
+        with self.assertMaxQueries(4):
+            res = self.api_client.get(url)
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.assertEqual(res.data, RecipeDetailSerializer(recipe).data)
+
     def test_create_recipe(self) -> None:
         payload = RecipeFactory.build_dict(user=self.user)
 
@@ -233,6 +324,62 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(res.status_code, HTTPStatus.OK)
         self.assertEqual(recipe.tags.count(), 0)
 
+    def test_update_recipe_unchanged_tags_no_writes(self) -> None:
+        tags = TagFactory.create_batch(2, user=self.user)
+        recipe = RecipeFactory.create(user=self.user, tags=tags)
+        payload = {"tags": [{"name": t.name} for t in tags], "title": recipe.title}
+        url = self._recipe_detail_url(recipe.id)
+
+        with self.assertMaxQueries(10) as ctx:
+            res = self.api_client.patch(url, payload, format="json")
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        writes = [
+            q["sql"]
+            for q in ctx.captured_queries
+            if q["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+        ]
+        self.assertEqual(writes, [])
+        self.assertCountEqual(recipe.tags.all(), tags)
+
+    def test_update_recipe_tags_writes_only_delta(self) -> None:
+        kept, removed = TagFactory.create_batch(2, user=self.user)
+        recipe = RecipeFactory.create(user=self.user, tags=[kept, removed])
+        added = TagFactory.create(user=self.user)
+        kept_link = Recipe.tags.through.objects.get(recipe=recipe, tag=kept)
+        payload = {"tags": [{"name": kept.name}, {"name": added.name}]}
+        url = self._recipe_detail_url(recipe.id)
+
+        with self.assertMaxQueries(10) as ctx:
+            res = self.api_client.patch(url, payload, format="json")
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        through = Recipe.tags.through._meta.db_table
+        statements = [q["sql"].split()[0] for q in ctx.captured_queries if through in q["sql"]]
+        # The removed link is deleted and the added one inserted (`INSERT OR IGNORE` on SQLite)
+        writes = [stmt for stmt in statements if stmt != "SELECT"]
+        self.assertEqual(writes, ["DELETE", "INSERT"])
+        # The unchanged link's row survives
+        self.assertTrue(Recipe.tags.through.objects.filter(id=kept_link.id).exists())
+        self.assertCountEqual(recipe.tags.all(), [kept, added])
+
+    def test_partial_update_saves_only_changed_fields(self) -> None:
+        recipe = RecipeFactory.create(user=self.user)
+        payload = {"title": "New recipe title", "link": recipe.link}
+        url = self._recipe_detail_url(recipe.id)
+
+        with self.assertMaxQueries(10) as ctx:
+            res = self.api_client.patch(url, payload, format="json")
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        updates = [
+            q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "core_recipe"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"title"', updates[0])
+        self.assertNotIn('"link"', updates[0])
+        self.assertNotIn('"description"', updates[0])
+
     def test_create_recipe_with_new_ingredients(self) -> None:
         ingredients = [{"name": self.fake.word()}, {"name": self.fake.word()}]
         payload = RecipeFactory.build_dict() | {"ingredients": ingredients}
@@ -273,6 +420,59 @@ class PrivateRecipeAPITests(TestCase):
             ).exists()
             self.assertTrue(exists)
 
+    def _recipe_payload_with_attrs(self, prefix: str, count: int) -> dict[str, Any]:
+        payload = RecipeFactory.build_dict() | {
+            "tags": [{"name": f"{prefix}-tag-{i}"} for i in range(count)],
+            "ingredients": [{"name": f"{prefix}-ingredient-{i}"} for i in range(count)],
+        }
+        payload.pop("user")
+        return payload
+
+    def test_create_recipe_attrs_query_count_independent_of_attr_count(self) -> None:
+        # Half of the names already exist, so both the lookup and the insert paths are taken
+        for i in range(15):
+            TagFactory.create(user=self.user, name=str(i))
+        # Includes touching the recipe's modified_at and bumping the content version
+        with self.assertMaxQueries(13) as one:
+            res = self.api_client.post(
+                self.recipes_url, self._recipe_payload_with_attrs("one", 1), format="json"
+            )
+        self.assertEqual(res.status_code, HTTPStatus.CREATED)
+
+        payload = self._recipe_payload_with_attrs("many", 30)
+        payload["tags"][:15] = [{"name": str(i)} for i in range(15)]
+        with self.assertMaxQueries(13) as many:
+            res = self.api_client.post(self.recipes_url, payload, format="json")
+        self.assertEqual(res.status_code, HTTPStatus.CREATED)
+
+        self.assertEqual(len(many.captured_queries), len(one.captured_queries))
+        recipe = Recipe.objects.get(id=res.data["id"])
+        self.assertEqual(recipe.tags.count(), 30)
+        self.assertEqual(recipe.ingredients.count(), 30)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 15 + 1 + 15)
+
+    def test_create_recipe_with_duplicate_tag_names(self) -> None:
+        name = self.fake.word()
+        payload = RecipeFactory.build_dict() | {"tags": [{"name": name}, {"name": name}]}
+        payload.pop("user")
+
+        res = self.api_client.post(self.recipes_url, payload, format="json")
+
+        self.assertEqual(res.status_code, HTTPStatus.CREATED)
+        recipe = Recipe.objects.get(id=res.data["id"])
+        self.assertEqual(list(recipe.tags.values_list("name", flat=True)), [name])
+        self.assertEqual(Tag.objects.filter(user=self.user, name=name).count(), 1)
+
+    def test_get_or_create_attrs_name_inserted_concurrently(self) -> None:
+        tag = TagFactory.create(user=self.user)
+
+        # Another request inserts the name between the lookup and the insert
+        with patch.object(Tag.objects, "filter", return_value=Tag.objects.none()):
+            resolved = get_or_create_attrs(Tag, self.user, [tag.name])
+
+        self.assertEqual(resolved[tag.name].id, tag.id)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_filter_by_tags(self) -> None:
         recipe1 = RecipeFactory.create(user=self.user)
         recipe2 = RecipeFactory.create(user=self.user)
@@ -289,9 +489,9 @@ class PrivateRecipeAPITests(TestCase):
         s2 = RecipeSerializer(recipe2)
         s3 = RecipeSerializer(recipe3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data["results"])
+        self.assertIn(s2.data, res.data["results"])
+        self.assertNotIn(s3.data, res.data["results"])
 
     def test_filter_by_ingredients(self) -> None:
         recipe1 = RecipeFactory.create(user=self.user)
@@ -309,11 +509,89 @@ class PrivateRecipeAPITests(TestCase):
         s2 = RecipeSerializer(recipe2)
         s3 = RecipeSerializer(recipe3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data["results"])
+        self.assertIn(s2.data, res.data["results"])
+        self.assertNotIn(s3.data, res.data["results"])
+
+    def test_filter_by_tags_match_all(self) -> None:
+        tag1, tag2 = TagFactory.create_batch(2, user=self.user)
+        both = RecipeFactory.create(user=self.user, tags=[tag1, tag2])
+        RecipeFactory.create(user=self.user, tags=[tag1])
+        RecipeFactory.create(user=self.user, tags=[tag2])
+
+        params = {"tags": f"{tag1.id},{tag2.id}", "match": "all"}
+        res = self.api_client.get(self.recipes_url, params)
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.assertEqual([r["id"] for r in res.data["results"]], [both.id])
+
+    def test_filter_by_tags_and_ingredients(self) -> None:
+        tag1, tag2 = TagFactory.create_batch(2, user=self.user)
+        ingredient = IngredientFactory.create(user=self.user)
+        match = RecipeFactory.create(user=self.user, tags=[tag1], ingredients=[ingredient])
+        RecipeFactory.create(user=self.user, tags=[tag2])
+        RecipeFactory.create(user=self.user, ingredients=[ingredient])
+
+        params = {"tags": f"{tag1.id},{tag2.id}", "ingredients": f"{ingredient.id}"}
+        res = self.api_client.get(self.recipes_url, params)
+
+        self.assertEqual([r["id"] for r in res.data["results"]], [match.id])
+
+    def test_filter_by_tags_no_duplicates(self) -> None:
+        tag1, tag2 = TagFactory.create_batch(2, user=self.user)
+        recipe = RecipeFactory.create(user=self.user, tags=[tag1, tag2])
+
+        params = {"tags": f"{tag1.id},{tag2.id}"}
+        with self.assertMaxQueries(4) as ctx:
+            res = self.api_client.get(self.recipes_url, params)
+
+        self.assertEqual([r["id"] for r in res.data["results"]], [recipe.id])
+        recipes_sql = ctx.captured_queries[1]["sql"]
+        self.assertIn("EXISTS", recipes_sql)
+        self.assertNotIn("DISTINCT", recipes_sql)
+        self.assertNotIn("JOIN", recipes_sql)
+
+    def test_filter_invalid_params_error(self) -> None:
+        for params in ({"tags": "1,a"}, {"ingredients": "x"}, {"match": "some"}):
+            with self.subTest(params=params):
+                res = self.api_client.get(self.recipes_url, params)
+
+                self.assertEqual(res.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_filter_ids_limited(self) -> None:
+        ids = ",".join(map(str, range(1, MAX_FILTER_IDS + 1)))
+        res = self.api_client.get(
+            self.recipes_url, {"tags": ids, "ingredients": ids, "match": "all"}
+        )
+        self.assertEqual(res.status_code, HTTPStatus.OK)
 
+        for params in (
+            {"tags": f"{ids},{MAX_FILTER_IDS + 1}", "match": "all"},
+            {"ingredients": str(2**63)},
+            {"tags": "0"},
+        ):
+            with self.subTest(params=params):
+                res = self.api_client.get(self.recipes_url, params)
 
+                self.assertEqual(res.status_code, HTTPStatus.BAD_REQUEST)
+
+    @skipUnless(connection.vendor == "sqlite", "EXPLAIN output is vendor specific")
+    def test_filter_plan_probes_through_table_index(self) -> None:
+        params = {"tags": "1,2", "ingredients": "3", "match": "all"}
+        request = Request(APIRequestFactory().get(self.recipes_url, params))
+        request.user = self.user
+        view = RecipeViewSet(action="list", request=request)
+
+        plan = view.get_queryset().explain()
+
+        self.assertNotIn("TEMP B-TREE", plan)
+        # Two tag and one ingredient `EXISTS`, each an index search on the through table
+        self.assertEqual(plan.count("CORRELATED SCALAR SUBQUERY"), 3)
+        probes = re.findall(r"SEARCH \S+ USING COVERING INDEX \S+ \(recipe_id=\? AND", plan)
+        self.assertEqual(len(probes), 3)
+
+
+@override_settings(RECIPE_IMAGE_UPLOADS=UPLOADS)
 class ImageUploadTests(APITestCase):
     api_client: APIClient
     user: CustomUser
@@ -354,3 +632,71 @@ class ImageUploadTests(APITestCase):
         res = self.api_client.post(url, payload, format="multipart")
 
         self.assertEqual(res.status_code, HTTPStatus.BAD_REQUEST)
+
+    def _upload(self, name: str, content: bytes) -> Any:
+        payload = {"image": SimpleUploadedFile(name, content)}
+        return self.api_client.post(self._image_upload_url(self.recipe.id), payload)
+
+    def _image(self, format: str, size: tuple[int, int] = (10, 10)) -> bytes:
+        buffer = io.BytesIO()
+        Image.new("RGB", size).save(buffer, format)
+        return buffer.getvalue()
+
+    def test_upload_image_header_only(self) -> None:
+        with (
+            patch("recipe.uploads.Image.open", wraps=Image.open) as image_open,
+            patch.object(ImageFile.ImageFile, "load") as load,
+        ):
+            res = self._upload("photo.jpg", self._image("JPEG"))
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        # Streamed to a temporary file, rather than read in memory, and never decoded
+        self.assertIsInstance(image_open.call_args.args[0], TemporaryUploadedFile)
+        load.assert_not_called()
+
+    def test_upload_image_format_not_allowed(self) -> None:
+        res = self._upload("photo.bmp", self._image("BMP"))
+
+        self.assertEqual(res.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(res.data["image"][0].code, "image_format")
+
+    @override_settings(
+        RECIPE_IMAGE_UPLOADS={"MAX_BYTES": 2000, "MAX_PIXELS": 5000, "FORMATS": ["PNG"]}
+    )
+    def test_upload_image_too_many_pixels(self) -> None:
+        res = self._upload("photo.png", self._image("PNG", (100, 100)))
+
+        self.assertEqual(res.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(res.data["image"][0].code, "max_pixels")
+
+    def test_upload_image_decompression_bomb(self) -> None:
+        # A 100000x100000 PNG in a few bytes, up to its compressed pixels
+        def chunk(kind: bytes, data: bytes) -> bytes:
+            return (
+                struct.pack(">I", len(data))
+                + kind
+                + data
+                + struct.pack(">I", zlib.crc32(kind + data))
+            )
+
+        ihdr = struct.pack(">IIBBBBB", 100_000, 100_000, 8, 2, 0, 0, 0)
+        header = b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", b"")
+
+        res = self._upload("bomb.png", header)
+
+        self.assertEqual(res.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(res.data["image"][0].code, "max_pixels")
+
+    @override_settings(
+        RECIPE_IMAGE_UPLOADS={"MAX_BYTES": 1000, "MAX_PIXELS": 10**6, "FORMATS": ["JPEG"]}
+    )
+    def test_upload_image_too_large(self) -> None:
+        for size in [2000, 200_000]:
+            with self.subTest(size=size):
+                # Rejected while the file is read, or by the length of the body before
+                res = self._upload("photo.jpg", os.urandom(size))
+
+                self.assertEqual(res.status_code, HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+                self.assertEqual(res.data["detail"].code, "image_too_large")
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
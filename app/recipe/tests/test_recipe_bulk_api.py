@@ -0,0 +1,154 @@
+from http import HTTPStatus
+from typing import Any
+
+from core.models import Ingredient, Recipe, Tag
+from core.models import User as CustomUser
+from core.tests.factories import RecipeFactory, TagFactory, UserFactory
+from core.tests.query_budget import QueryBudgetTestCase
+from django.test import TestCase
+from django.urls import reverse
+from faker import Faker
+from rest_framework.test import APIClient
+
+from recipe.serializers import RecipeSerializer
+
+
+class PublicRecipeBulkAPITests(TestCase):
+    api_client: APIClient
+    bulk_url: str
+
+    @classmethod
+    def setUpTestData(cls: type[PublicRecipeBulkAPITests]) -> None:
+        cls.api_client = APIClient()
+        cls.bulk_url = reverse("recipe:recipe-bulk")
+
+    def test_auth_required(self) -> None:
+        res = self.api_client.post(self.bulk_url, {"create": []}, format="json")
+
+        self.assertEqual(res.status_code, HTTPStatus.UNAUTHORIZED)
+
+
+class PrivateRecipeBulkAPITests(QueryBudgetTestCase):
+    api_client: APIClient
+    bulk_url: str
+    user: CustomUser
+    fake: Faker
+
+    @classmethod
+    def setUpTestData(cls: type[PrivateRecipeBulkAPITests]) -> None:
+        cls.api_client = APIClient()
+        cls.user = UserFactory.create()
+        cls.api_client.force_authenticate(cls.user)
+        cls.bulk_url = reverse("recipe:recipe-bulk")
+        cls.fake = Faker()
+
+    def _recipe_payload(self, **kwargs: Any) -> dict[str, Any]:
+        payload = RecipeFactory.build_dict() | kwargs
+        payload.pop("user")
+        return payload
+
+    def test_bulk_create(self) -> None:
+        existing = TagFactory.create(user=self.user)
+        payloads = [
+            self._recipe_payload(tags=[{"name": existing.name}, {"name": "shared"}]),
+            self._recipe_payload(tags=[{"name": "shared"}], ingredients=[{"name": "salt"}]),
+            self._recipe_payload(),
+        ]
+
+        res = self.api_client.post(self.bulk_url, {"create": payloads}, format="json")
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.assertEqual(len(res.data["create"]), 3)
+        for payload, data in zip(payloads, res.data["create"], strict=True):
+            recipe = Recipe.objects.get(id=data["id"], user=self.user)
+            self.assertEqual(data, RecipeSerializer(recipe).data)
+            self.assertEqual(recipe.title, payload["title"])
+            self.assertCountEqual(
+                recipe.tags.values_list("name", flat=True),
+                [tag["name"] for tag in payload.get("tags", [])],
+            )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_update_and_delete(self) -> None:
+        kept, removed = TagFactory.create_batch(2, user=self.user)
+        recipe1 = RecipeFactory.create(user=self.user, tags=[kept, removed])
+        recipe2 = RecipeFactory.create(user=self.user, tags=[kept])
+        recipe3 = RecipeFactory.create(user=self.user)
+        payload = {
+            "update": [
+                {"id": recipe1.id, "tags": [{"name": kept.name}, {"name": "new"}]},
+                {"id": recipe2.id, "title": "New title"},
+            ],
+            "delete": [recipe3.id],
+        }
+
+        res = self.api_client.post(self.bulk_url, payload, format="json")
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.assertEqual([r["id"] for r in res.data["update"]], [recipe1.id, recipe2.id])
+        self.assertEqual(res.data["delete"], [recipe3.id])
+        self.assertCountEqual(recipe1.tags.values_list("name", flat=True), [kept.name, "new"])
+        recipe2.refresh_from_db()
+        self.assertEqual(recipe2.title, "New title")
+        # Tags are only replaced when the key is present
+        self.assertCountEqual(recipe2.tags.all(), [kept])
+        self.assertFalse(Recipe.objects.filter(id=recipe3.id).exists())
+
+    def test_bulk_invalid_item_writes_nothing(self) -> None:
+        recipe = RecipeFactory.create(user=self.user)
+        invalid = self._recipe_payload()
+        invalid.pop("title")
+        payload = {
+            "create": [self._recipe_payload(), invalid],
+            "delete": [recipe.id],
+        }
+
+        res = self.api_client.post(self.bulk_url, payload, format="json")
+
+        self.assertEqual(res.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(list(res.data["create"]), [1])
+        self.assertIn("title", res.data["create"][1])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_other_users_recipe_error(self) -> None:
+        own = RecipeFactory.create(user=self.user)
+        other = RecipeFactory.create(user=UserFactory.create())
+        payload = {
+            "update": [{"id": own.id, "title": "New title"}, {"id": other.id, "title": "Hijack"}],
+            "delete": [own.id],
+        }
+
+        res = self.api_client.post(self.bulk_url, payload, format="json")
+
+        self.assertEqual(res.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(list(res.data["update"]), [1])
+        self.assertIn("id", res.data["update"][1])
+        # Updating and deleting the same recipe is ambiguous
+        self.assertIn(0, res.data["delete"])
+        other.refresh_from_db()
+        self.assertNotEqual(other.title, "Hijack")
+        self.assertTrue(Recipe.objects.filter(id=own.id).exists())
+
+    def test_bulk_query_count_independent_of_batch_size(self) -> None:
+        def payload(prefix: str, count: int) -> dict[str, Any]:
+            return {
+                "create": [
+                    self._recipe_payload(
+                        tags=[{"name": f"{prefix}-tag-{i}"}, {"name": "shared"}],
+                        ingredients=[{"name": f"{prefix}-ingredient-{i}"}],
+                    )
+                    for i in range(count)
+                ]
+            }
+
+        with self.assertMaxQueries(15) as one:
+            res = self.api_client.post(self.bulk_url, payload("one", 1), format="json")
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+
+        with self.assertMaxQueries(15) as many:
+            res = self.api_client.post(self.bulk_url, payload("many", 50), format="json")
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+
+        self.assertEqual(len(many.captured_queries), len(one.captured_queries))
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 51)
@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+from http import HTTPStatus
+from typing import Any
+from unittest.mock import patch
+
+from core.models import User as CustomUser
+from core.tests.factories import IngredientFactory, RecipeFactory, TagFactory, UserFactory
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+class PublicRecipeExportAPITests(TestCase):
+    def test_auth_required(self) -> None:
+        res = APIClient().get(reverse("recipe:recipe-export"))
+
+        self.assertEqual(res.status_code, HTTPStatus.UNAUTHORIZED)
+
+
+class PrivateRecipeExportAPITests(TestCase):
+    api_client: APIClient
+    export_url: str
+    user: CustomUser
+
+    @classmethod
+    def setUpTestData(cls: type[PrivateRecipeExportAPITests]) -> None:
+        cls.api_client = APIClient()
+        cls.user = UserFactory.create()
+        cls.api_client.force_authenticate(cls.user)
+        cls.export_url = reverse("recipe:recipe-export")
+
+    def _export(self, **params: str) -> tuple[StreamingHttpResponse, str]:
+        res = self.api_client.get(self.export_url, params)
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        assert isinstance(res, StreamingHttpResponse)
+        return res, b"".join(res.streaming_content).decode()
+
+    def test_export_ndjson(self) -> None:
+        salt, flour = (IngredientFactory.create(user=self.user, name=n) for n in ("salt", "flour"))
+        recipe = RecipeFactory.create(
+            user=self.user,
+            price="5.50",
+            tags=[TagFactory.create(user=self.user, name="vegan")],
+            ingredients=[salt, flour],
+        )
+        RecipeFactory.create(user=UserFactory.create())
+
+        res, body = self._export()
+
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        self.assertIn('filename="recipes.ndjson"', res["Content-Disposition"])
+        rows = [json.loads(line) for line in body.splitlines()]
+        expected: dict[str, Any] = {
+            "id": recipe.id,
+            "title": recipe.title,
+            "description": recipe.description,
+            "time_minutes": recipe.time_minutes,
+            "price": "5.50",
+            "link": recipe.link,
+            "tags": ["vegan"],
+            "ingredients": ["flour", "salt"],
+        }
+        self.assertEqual(rows, [expected])
+
+    def test_export_csv(self) -> None:
+        recipe = RecipeFactory.create(
+            user=self.user,
+            title='Salt, "pepper"',
+            tags=[TagFactory.create(user=self.user, name=n) for n in ("a", "b")],
+        )
+
+        res, body = self._export(format="csv")
+
+        self.assertEqual(res["Content-Type"], "text/csv; charset=utf-8")
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["id"], str(recipe.id))
+        self.assertEqual(rows[0]["title"], 'Salt, "pepper"')
+        self.assertEqual(rows[0]["tags"], "a|b")
+        self.assertEqual(rows[0]["ingredients"], "")
+
+    def test_export_csv_by_accept_header(self) -> None:
+        res = self.api_client.get(self.export_url, HTTP_ACCEPT="text/csv")
+
+        self.assertEqual(res["Content-Type"], "text/csv; charset=utf-8")
+
+    def test_export_filtered(self) -> None:
+        tag = TagFactory.create(user=self.user)
+        tagged = RecipeFactory.create(user=self.user, tags=[tag])
+        RecipeFactory.create(user=self.user)
+
+        _, body = self._export(tags=str(tag.id))
+
+        self.assertEqual([json.loads(line)["id"] for line in body.splitlines()], [tagged.id])
+
+    def test_export_invalid_params_error(self) -> None:
+        res = self.api_client.get(self.export_url, {"tags": "x"})
+
+        self.assertEqual(res.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn("tags", json.loads(res.content))
+
+    @patch("recipe.export.CHUNK_SIZE", 2)
+    def test_export_reads_in_chunks(self) -> None:
+        for _ in range(5):
+            RecipeFactory.create(
+                user=self.user,
+                tags=[TagFactory.create(user=self.user)],
+                ingredients=[IngredientFactory.create(user=self.user)],
+            )
+        res = self.api_client.get(self.export_url)
+
+        # Nothing is read until the response is consumed. Then one recipe query, and a tags and
+        # an ingredients query for each of the 3 chunks.
+        with self.assertNumQueries(1 + 3 * 2):
+            body = b"".join(res.streaming_content)  # type: ignore[attr-defined]
+
+        ids = [json.loads(line)["id"] for line in body.decode().splitlines()]
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(ids, sorted(ids, reverse=True))
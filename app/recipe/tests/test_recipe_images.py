@@ -0,0 +1,192 @@
+import io
+import threading
+from http import HTTPStatus
+from typing import Any
+from unittest import mock
+
+from core.models import Recipe
+from core.models import User as CustomUser
+from core.tests.factories import RecipeFactory, UserFactory
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient, APITestCase
+
+from recipe.images import (
+    _worker_pool,
+    delete_variants,
+    encode,
+    generate_variants,
+    queue_variants,
+)
+
+VARIANTS = {"WIDTHS": [100, 200], "FORMATS": ["webp", "jpeg"], "QUALITY": 80, "WORKERS": 0}
+
+
+def image_file(
+    size: tuple[int, int], mode: str = "RGB", format: str = "JPEG"
+) -> SimpleUploadedFile:
+    buffer = io.BytesIO()
+    Image.new(mode, size, "red").save(buffer, format)
+    return SimpleUploadedFile(f"photo.{format.lower()}", buffer.getvalue())
+
+
+@override_settings(RECIPE_IMAGE_VARIANTS=VARIANTS)
+class ImageVariantsTests(APITestCase):
+    api_client: APIClient
+    user: CustomUser
+
+    @classmethod
+    def setUpTestData(cls: type[ImageVariantsTests]) -> None:
+        cls.api_client = APIClient()
+        cls.user = UserFactory.create()
+        cls.api_client.force_authenticate(cls.user)
+
+    def setUp(self) -> None:
+        self.recipe = RecipeFactory.create(user=self.user)
+
+    def tearDown(self) -> None:
+        self.recipe.refresh_from_db()
+        delete_variants(str(self.recipe.image.name))
+        self.recipe.image.delete()
+
+    def _upload(self, file: SimpleUploadedFile) -> Any:
+        url = reverse("recipe:recipe-upload-image", args=[self.recipe.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.api_client.post(url, {"image": file}, format="multipart")
+
+    def test_variants_generated(self) -> None:
+        res = self._upload(image_file((400, 300)))
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            [(variant["width"], variant["format"]) for variant in self.recipe.image_variants],
+            [(200, "webp"), (200, "jpeg"), (100, "webp"), (100, "jpeg")],
+        )
+        for variant in self.recipe.image_variants:
+            with default_storage.open(variant["name"]) as file, Image.open(file) as image:
+                self.assertEqual(image.width, variant["width"])
+                self.assertEqual(image.format, variant["format"].upper())
+        self.assertEqual(self.recipe.image_variants[0]["name"][-5:], ".webp")
+
+    def test_detail_lists_variants(self) -> None:
+        self._upload(image_file((400, 300)))
+
+        res = self.api_client.get(reverse("recipe:recipe-detail", args=[self.recipe.id]))
+
+        self.assertEqual(len(res.data["image_variants"]), 4)
+        variant = res.data["image_variants"][0]
+        self.assertEqual(variant["width"], 200)
+        self.assertEqual(variant["format"], "webp")
+        self.assertTrue(variant["url"].startswith("http://testserver/media/recipe/variants/"))
+
+    def test_no_upscaling(self) -> None:
+        self._upload(image_file((150, 100)))
+
+        self.recipe.refresh_from_db()
+        self.assertEqual({variant["width"] for variant in self.recipe.image_variants}, {150, 100})
+
+    def test_transparency_flattened_for_jpeg(self) -> None:
+        self._upload(image_file((300, 300), mode="RGBA", format="PNG"))
+
+        self.recipe.refresh_from_db()
+        jpeg = next(v for v in self.recipe.image_variants if v["format"] == "jpeg")
+        with default_storage.open(jpeg["name"]) as file, Image.open(file) as image:
+            self.assertEqual(image.mode, "RGB")
+
+    def test_variants_named_after_configured_width(self) -> None:
+        self._upload(image_file((150, 100)))
+
+        self.recipe.refresh_from_db()
+        image_name = str(self.recipe.image.name).rpartition("/")[2]
+        self.assertEqual(
+            [variant["name"] for variant in self.recipe.image_variants],
+            [
+                f"recipe/variants/{image_name}-200w.webp",
+                f"recipe/variants/{image_name}-200w.jpg",
+                f"recipe/variants/{image_name}-100w.webp",
+                f"recipe/variants/{image_name}-100w.jpg",
+            ],
+        )
+
+    def test_variants_shared_with_same_image(self) -> None:
+        self._upload(image_file((400, 300)))
+        self.recipe.refresh_from_db()
+        other = RecipeFactory.create(user=self.user, image=self.recipe.image.name)
+
+        with mock.patch("recipe.images.encode") as encode:
+            variants = generate_variants(other.pk, str(self.recipe.image.name))
+
+        encode.assert_not_called()
+        self.assertEqual(variants, self.recipe.image_variants)
+        self.assertEqual(Recipe.objects.get(pk=other.pk).image_variants, variants)
+
+    def test_missing_variants_generated_again(self) -> None:
+        self._upload(image_file((400, 300)))
+        self.recipe.refresh_from_db()
+        missing = self.recipe.image_variants[2]["name"]
+        default_storage.delete(missing)
+
+        with mock.patch("recipe.images.encode", wraps=encode) as encoded:
+            generate_variants(self.recipe.pk, str(self.recipe.image.name))
+
+        self.assertEqual(encoded.call_count, 1)
+        self.assertTrue(default_storage.exists(missing))
+
+    def test_replaced_image_variants_kept(self) -> None:
+        self._upload(image_file((400, 300)))
+        self.recipe.refresh_from_db()
+        first = [variant["name"] for variant in self.recipe.image_variants]
+        self.addCleanup(delete_variants, str(self.recipe.image.name))
+
+        self._upload(image_file((300, 300)))
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(len(self.recipe.image_variants), 4)
+        # Left for the other recipes with the image, deleted with its file
+        self.assertTrue(all(default_storage.exists(name) for name in first))
+
+    def test_image_changed_meanwhile(self) -> None:
+        self._upload(image_file((400, 300)))
+        self.recipe.refresh_from_db()
+        name = str(self.recipe.image.name)
+        Recipe.objects.filter(pk=self.recipe.pk).update(image_variants=[], image="other.jpg")
+
+        variants = generate_variants(self.recipe.pk, name)
+
+        self.assertEqual(variants, [])
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).image_variants, [])
+        Recipe.objects.filter(pk=self.recipe.pk).update(image=name)
+
+    def test_generated_in_worker(self) -> None:
+        threads = []
+
+        def generate(recipe_id: int, name: str) -> list[dict[str, Any]]:
+            threads.append(threading.current_thread().name)
+            return []
+
+        with (
+            override_settings(RECIPE_IMAGE_VARIANTS={**VARIANTS, "WORKERS": 1}),
+            mock.patch("recipe.images.generate_variants", side_effect=generate),
+            mock.patch("recipe.images.connections"),
+        ):
+            queue_variants(self.recipe.pk, "recipe/photo.jpg")
+            _worker_pool(1).submit(lambda: None).result()
+
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith("image-variants"))
+
+    def test_worker_failure_logged(self) -> None:
+        with (
+            override_settings(RECIPE_IMAGE_VARIANTS={**VARIANTS, "WORKERS": 1}),
+            mock.patch("recipe.images.generate_variants", side_effect=OSError("full")),
+            mock.patch("recipe.images.connections"),
+            self.assertLogs("recipe.images", "ERROR") as logs,
+        ):
+            queue_variants(self.recipe.pk, "recipe/photo.jpg")
+            _worker_pool(1).submit(lambda: None).result()
+
+        self.assertIn("recipe/photo.jpg", logs.output[0])
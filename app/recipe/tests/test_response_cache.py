@@ -0,0 +1,125 @@
+from http import HTTPStatus
+from unittest.mock import patch
+
+from core.models import User as CustomUser
+from core.tests.factories import RecipeFactory, TagFactory, UserFactory
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from recipe.cache import ResponseCache, response_cache
+
+
+class ResponseCacheAPITests(TestCase):
+    api_client: APIClient
+    recipes_url: str
+    tags_url: str
+    user: CustomUser
+
+    @classmethod
+    def setUpTestData(cls: type[ResponseCacheAPITests]) -> None:
+        cls.api_client = APIClient()
+        cls.user = UserFactory.create()
+        cls.api_client.force_authenticate(cls.user)
+        cls.recipes_url = reverse("recipe:recipe-list")
+        cls.tags_url = reverse("recipe:tag-list")
+
+    def setUp(self) -> None:
+        response_cache.clear()
+
+    def tearDown(self) -> None:
+        response_cache.clear()
+
+    def _recipe_detail_url(self, recipe_id: int) -> str:
+        return reverse("recipe:recipe-detail", args=[recipe_id])
+
+    def test_list_served_from_cache(self) -> None:
+        RecipeFactory.create_batch(3, user=self.user, tags=[TagFactory.create(user=self.user)])
+        first = self.api_client.get(self.recipes_url)
+
+        # Only the content version is read
+        with self.assertNumQueries(1):
+            second = self.api_client.get(self.recipes_url)
+
+        self.assertEqual(second.status_code, HTTPStatus.OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["ETag"], first["ETag"])
+        stats = response_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_detail_served_from_cache(self) -> None:
+        recipe = RecipeFactory.create(user=self.user)
+        url = self._recipe_detail_url(recipe.id)
+        first = self.api_client.get(url)
+
+        with self.assertNumQueries(1):
+            second = self.api_client.get(url)
+
+        self.assertEqual(second.data, first.data)
+
+    def test_keyed_by_query_params(self) -> None:
+        tag = TagFactory.create(user=self.user)
+        tagged = RecipeFactory.create(user=self.user, tags=[tag])
+        RecipeFactory.create(user=self.user)
+        self.api_client.get(self.recipes_url)
+
+        res = self.api_client.get(self.recipes_url, {"tags": str(tag.id)})
+
+        self.assertEqual([r["id"] for r in res.data["results"]], [tagged.id])
+        self.assertEqual(response_cache.stats()["hits"], 0)
+
+    def test_keyed_by_user(self) -> None:
+        TagFactory.create(user=self.user)
+        self.api_client.get(self.tags_url)
+        other = UserFactory.create()
+        other_client = APIClient()
+        other_client.force_authenticate(other)
+
+        res = other_client.get(self.tags_url)
+
+        self.assertEqual(res.data["results"], [])
+
+    def test_invalidated_by_write(self) -> None:
+        tag = TagFactory.create(user=self.user)
+        recipe = RecipeFactory.create(user=self.user, tags=[tag])
+        url = self._recipe_detail_url(recipe.id)
+        self.api_client.get(self.recipes_url)
+        self.api_client.get(url)
+
+        self.api_client.patch(reverse("recipe:tag-detail", args=[tag.id]), {"name": "renamed"})
+
+        res = self.api_client.get(self.recipes_url)
+        self.assertEqual(res.data["results"][0]["tags"][0]["name"], "renamed")
+        res = self.api_client.get(url)
+        self.assertEqual(res.data["tags"][0]["name"], "renamed")
+        self.assertEqual(response_cache.stats()["hits"], 0)
+
+    def test_assigned_only_invalidated_by_link(self) -> None:
+        tag = TagFactory.create(user=self.user)
+        recipe = RecipeFactory.create(user=self.user)
+        params = {"assigned_only": "1"}
+        self.assertEqual(self.api_client.get(self.tags_url, params).data["results"], [])
+
+        recipe.tags.add(tag)
+
+        res = self.api_client.get(self.tags_url, params)
+        self.assertEqual([t["id"] for t in res.data["results"]], [tag.id])
+
+    def test_errors_not_cached(self) -> None:
+        self.api_client.get(self.recipes_url, {"tags": "x"})
+        res = self.api_client.get(self.recipes_url, {"tags": "x"})
+
+        self.assertEqual(res.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(response_cache.stats()["hits"], 0)
+
+    def test_disabled(self) -> None:
+        RecipeFactory.create(user=self.user)
+        disabled = ResponseCache(cache_alias=None, ttl=60)
+
+        with patch("recipe.conditional.response_cache", disabled):
+            self.api_client.get(self.recipes_url)
+            with self.assertNumQueries(4):
+                self.api_client.get(self.recipes_url)
+
+        self.assertEqual(disabled.stats()["misses"], 0)
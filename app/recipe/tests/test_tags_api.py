@@ -50,9 +50,9 @@ class PrivateTagsAPITests(TestCase):
 
         self.assertEqual(res.status_code, HTTPStatus.OK)
 
-        tags = Tag.objects.all().order_by("-name")
+        tags = Tag.objects.all().order_by("-name", "id")
         serializer = TagSerializer(tags, many=True)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_tags_limited_to_user(self) -> None:
         user2 = UserFactory.create()
@@ -62,8 +62,21 @@ class PrivateTagsAPITests(TestCase):
         res = self.api_client.get(self.tags_url)
 
         self.assertEqual(res.status_code, HTTPStatus.OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0], TagSerializer(tag).data)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0], TagSerializer(tag).data)
+
+    def test_tags_paginated(self) -> None:
+        tags = TagFactory.create_batch(4, user=self.user)
+        expected = [t.id for t in sorted(tags, key=lambda t: t.name, reverse=True)]
+
+        res = self.api_client.get(self.tags_url, {"page_size": 2})
+        first = [t["id"] for t in res.data["results"]]
+        res = self.api_client.get(res.data["next"])
+        second = [t["id"] for t in res.data["results"]]
+
+        self.assertEqual(res.status_code, HTTPStatus.OK)
+        self.assertEqual(first + second, expected)
+        self.assertIsNone(res.data["next"])
 
     def test_update_tag(self) -> None:
         tag = TagFactory.create(user=self.user)
@@ -78,6 +91,17 @@ class PrivateTagsAPITests(TestCase):
         actual = TagSerializer(tag).data
         self.assertEqual(actual, expected)
 
+    def test_rename_tag_to_existing_name_error(self) -> None:
+        existing, tag = TagFactory.create_batch(2, user=self.user)
+
+        url = self._tag_detail_url(tag.id)
+        res = self.api_client.patch(url, {"name": existing.name})
+
+        self.assertEqual(res.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn("name", res.data)
+        tag.refresh_from_db()
+        self.assertNotEqual(tag.name, existing.name)
+
     def test_delete_tag(self) -> None:
         tag = TagFactory.create(user=self.user)
 
@@ -99,8 +123,8 @@ class PrivateTagsAPITests(TestCase):
         s1 = TagSerializer(tag1)
         s2 = TagSerializer(tag2)
 
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data["results"])
+        self.assertNotIn(s2.data, res.data["results"])
 
     def test_filter_tags_unique(self) -> None:
         tag = TagFactory.create(user=self.user)
@@ -115,4 +139,4 @@ class PrivateTagsAPITests(TestCase):
         params = {"assigned_only": True}
         res = self.api_client.get(self.tags_url, params)
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
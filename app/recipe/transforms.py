@@ -0,0 +1,136 @@
+"""
+Recipe images resized on request, at `/media/transforms/<width>/<image>.<extension>`.
+
+For instance `/media/transforms/640/recipe/<uuid>.jpg.webp` is the image `recipe/<uuid>.jpg`
+640 pixels wide, as WebP. Widths are limited to `RECIPE_IMAGE_TRANSFORMS["WIDTHS"]`, so that
+clients can't fill the cache with every possible size, and the extensions to those of
+`recipe.images.FORMATS`.
+
+The first request for a transformation renders it, and writes it to the same path under
+`MEDIA_ROOT` for the next ones, which nginx serves from the disk without reaching Django (see
+`docker/nginx.conf`). The image names are unique, so the transformations never change and are
+cached by the clients for good. They're deleted with the image's file (see recipe.signals).
+
+The cache holds up to `RECIPE_IMAGE_TRANSFORMS["MAX_BYTES"]`. Each process adds up what it
+writes, and once that's a tenth of the limit, scans the cache and deletes the least recently
+used transformations down to 90% of the limit. Hits don't reach Python, so their access times
+on the disk tell which were used last; with the usual `relatime` mount option those are updated
+at most once a day, which is plenty to tell the popular transformations from the rest.
+"""
+
+import contextlib
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, UnidentifiedImageError
+
+from recipe.images import FORMATS, encode, prepare, resize, write_atomically
+
+logger = logging.getLogger("recipe.transforms")
+
+TRANSFORMS_DIR = "transforms"
+
+# The names `core.models.recipe_image_file_path` gives, not the variants in their subdirectory
+IMAGE_NAME = re.compile(r"recipe/[\w-]+\.\w+")
+
+EXTENSIONS = {extension: format for format, (_, extension, _) in FORMATS.items()}
+
+_written = 0
+_written_lock = threading.Lock()
+
+
+class TransformNotFound(Exception):
+    pass
+
+
+def transform_path(width: int, name: str) -> Path:
+    """The file of the transformation, `name` being that of the image plus the extension."""
+    return Path(settings.MEDIA_ROOT, TRANSFORMS_DIR, str(width), name)
+
+
+def delete_transforms(image_name: str) -> None:
+    """Delete the transformations of the image, one path per width and format."""
+    for width in settings.RECIPE_IMAGE_TRANSFORMS["WIDTHS"]:
+        for extension in EXTENSIONS:
+            transform_path(width, f"{image_name}.{extension}").unlink(missing_ok=True)
+
+
+def render_transform(width: int, name: str) -> Path:
+    """The file of the transformation, rendered unless it's cached."""
+    config = settings.RECIPE_IMAGE_TRANSFORMS
+    image_name, _, extension = name.rpartition(".")
+    if (
+        width not in config["WIDTHS"]
+        or extension not in EXTENSIONS
+        or not IMAGE_NAME.fullmatch(image_name)
+    ):
+        raise TransformNotFound(name)
+
+    path = transform_path(width, name)
+    if path.exists():
+        return path
+    try:
+        file = default_storage.open(image_name)
+    except FileNotFoundError:
+        raise TransformNotFound(name) from None
+
+    with file:
+        try:
+            original = Image.open(file)
+        except UnidentifiedImageError:
+            raise TransformNotFound(name) from None
+        with original:
+            # Never enlarged, a larger size would only be blurrier
+            image = prepare(original, width)
+            image = resize(image, min(width, image.width))
+            content = encode(image, EXTENSIONS[extension], config["QUALITY"])
+
+    write_atomically(path, content)
+    _written_to_cache(len(content))
+    return path
+
+
+def _written_to_cache(size: int) -> None:
+    global _written
+    max_bytes = settings.RECIPE_IMAGE_TRANSFORMS["MAX_BYTES"]
+    with _written_lock:
+        _written += size
+        if _written < max_bytes // 10:
+            return
+        _written = 0
+    evict(max_bytes)
+
+
+def evict(max_bytes: int) -> tuple[int, int]:
+    """
+    Delete the least recently used transformations down to 90% of `max_bytes` if the cache holds
+    more than `max_bytes`, and return the number of files and bytes deleted.
+    """
+    files = []
+    total = 0
+    for directory, _, names in os.walk(Path(settings.MEDIA_ROOT, TRANSFORMS_DIR)):
+        for name in names:
+            path = os.path.join(directory, name)
+            # Deleted by another process meanwhile
+            with contextlib.suppress(FileNotFoundError):
+                stat = os.stat(path)
+                files.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+                total += stat.st_size
+    if total <= max_bytes:
+        return 0, 0
+
+    deleted = deleted_bytes = 0
+    for _, size, path in sorted(files):
+        if total - deleted_bytes <= max_bytes * 0.9:
+            break
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+            deleted += 1
+            deleted_bytes += size
+    logger.info("Evicted %d image transforms, %d bytes", deleted, deleted_bytes)
+    return deleted, deleted_bytes
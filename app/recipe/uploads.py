@@ -0,0 +1,90 @@
+"""
+Recipe image uploads, checked from the images' headers before anything decodes them.
+
+DRF's `ImageField` has Pillow open and verify each upload, after Django has read it in memory
+when it's small enough. Here `ImageUploadHandler` streams the upload to a temporary file instead,
+and rejects it as soon as it's over `RECIPE_IMAGE_UPLOADS["MAX_BYTES"]`, before reading the rest
+of the body when its length tells already. `HeaderImageField` then reads the format and the
+dimensions from the image's header, and rejects the formats not in `FORMATS` and the images of
+more than `MAX_PIXELS` pixels: a PNG of a few kilobytes can claim dimensions that take gigabytes
+once decoded, which the generation of the variants would do (see recipe.images).
+"""
+
+from typing import IO, Any
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+# Allowance for the rest of a multipart body: the boundaries, the part headers and other fields
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class ImageTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Image too large."
+    default_code = "image_too_large"
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Writes the uploads to temporary files, and stops at the size limit of the images."""
+
+    def handle_raw_input(
+        self,
+        input_data: IO[bytes],
+        META: dict[str, str],
+        content_length: int,
+        boundary: str,
+        encoding: str | None = None,
+    ) -> tuple[QueryDict, MultiValueDict[str, UploadedFile[Any]]] | None:
+        if content_length > settings.RECIPE_IMAGE_UPLOADS["MAX_BYTES"] + MULTIPART_OVERHEAD:
+            raise ImageTooLarge()
+        return super().handle_raw_input(input_data, META, content_length, boundary, encoding)
+
+    def receive_data_chunk(self, raw_data: bytes, start: int) -> bytes | None:
+        # A body within the allowance can still hold a file over the limit
+        if start + len(raw_data) > settings.RECIPE_IMAGE_UPLOADS["MAX_BYTES"]:
+            # Deletes the temporary file
+            self.file.close()
+            raise ImageTooLarge()
+        return super().receive_data_chunk(raw_data, start)
+
+
+class HeaderImageField(serializers.ImageField):
+    """An `ImageField` checking the image's header against the limits, not its content."""
+
+    default_error_messages = {
+        "image_format": "Upload a {formats} image, not {format}.",
+        "max_bytes": "Ensure the image has at most {max_bytes} bytes (it has {size}).",
+        "max_pixels": "Ensure the image has at most {max_pixels} pixels.",
+    }
+
+    def to_internal_value(self, data: Any) -> Any:
+        # The checks of `FileField`, without those of `ImageField`
+        file = serializers.FileField.to_internal_value(self, data)
+        config = settings.RECIPE_IMAGE_UPLOADS
+        if file.size > config["MAX_BYTES"]:
+            self.fail("max_bytes", max_bytes=config["MAX_BYTES"], size=file.size)
+
+        try:
+            # Only reads the header, the pixels are decoded on `load()`
+            with Image.open(file) as image:
+                image_format, (width, height) = image.format, image.size
+        except Image.DecompressionBombError:
+            # More than twice Pillow's own limit, checked on open
+            self.fail("max_pixels", max_pixels=config["MAX_PIXELS"])
+        except UnidentifiedImageError:
+            self.fail("invalid_image")
+        finally:
+            file.seek(0)
+
+        if image_format not in config["FORMATS"]:
+            self.fail("image_format", formats=", ".join(config["FORMATS"]), format=image_format)
+        if width * height > config["MAX_PIXELS"]:
+            self.fail("max_pixels", max_pixels=config["MAX_PIXELS"])
+        return file
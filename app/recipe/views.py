@@ -1,27 +1,59 @@
 from abc import ABC, abstractmethod
-from typing import cast
+from functools import partial
+from typing import Any, cast
 
+from core.authentication import CachedTokenAuthentication
 from core.models import Ingredient, Recipe, Tag
 from core.models import User as CustomUser
-from django.db.models import Model, QuerySet
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, Model, OuterRef, Prefetch, QuerySet
+from django.http import FileResponse, Http404, HttpRequest, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 from rest_framework import mixins, status, viewsets
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.serializers import BaseSerializer, ModelSerializer
 
+from recipe.conditional import collection_validators, conditional_get, recipe_validators
+from recipe.export import CSVRenderer, ExportRenderer, NDJSONRenderer, export_rows
+from recipe.images import queue_variants
+from recipe.pagination import RecipeAttrCursorPagination, RecipeCursorPagination
 from recipe.serializers import (
     BoolParamsSerializer,
     IngredientSerializer,
+    RecipeBulkSerializer,
     RecipeDetailSerializer,
+    RecipeFilterParamsSerializer,
     RecipeImageSerializer,
     RecipeSerializer,
     TagSerializer,
 )
+from recipe.transforms import TransformNotFound, render_transform
+from recipe.uploads import ImageUploadHandler
+
+
+def linked_to(field: str, ids: list[int], match: str) -> list[Exists]:
+    """
+    Correlated `EXISTS` conditions on the `field` through table of `Recipe`. Unlike joining the
+    through table, they can't produce one row per matching link, so no `DISTINCT` over the
+    recipe rows is needed. Each one is an index probe on (recipe_id, <target>_id).
+
+    - `any`: a single `EXISTS` matching any of the ids.
+    - `all`: one `EXISTS` per id, all of which must hold.
+    """
+    descriptor = getattr(Recipe, field)
+    target = f"{descriptor.field.m2m_reverse_field_name()}_id"
+    links = descriptor.through.objects.filter(recipe_id=OuterRef("pk"))
+
+    if match == "all":
+        return [Exists(links.filter(**{target: id_})) for id_ in sorted(set(ids))]
+    return [Exists(links.filter(**{f"{target}__in": ids}))]
 
 
 @extend_schema_view(
@@ -37,30 +69,80 @@ from recipe.serializers import (
                 OpenApiTypes.STR,
                 description="Comma separated list of ingredients",
             ),
+            OpenApiParameter(
+                "match",
+                OpenApiTypes.STR,
+                enum=["any", "all"],
+                default="any",
+                description=(
+                    "Return recipes with any (default) or all of the given tags, "
+                    "and any or all of the given ingredients"
+                ),
+            ),
         ]
     )
 )
 class RecipeViewSet(viewsets.ModelViewSet[Recipe]):
     serializer_class = RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
 
-    def _params_to_ints(self, ids: str) -> list[int]:
-        return [int(str_id) for str_id in ids.split(",")]
+    # Recipe columns each read action serializes; actions not listed load every column.
+    # `description` is write-only and `image` is detail-only, so the list skips both.
+    recipe_columns: dict[str, list[str]] = {
+        "list": ["id", "title", "time_minutes", "price", "link"],
+    }
+    # Actions whose response renders the nested tags and ingredients. Without the
+    # prefetch, each recipe costs two extra queries.
+    prefetch_actions = {"list", "retrieve"}
 
     def get_queryset(self) -> QuerySet[Recipe]:
-        tags = self.request.query_params.get("tags")
-        ingredients = self.request.query_params.get("ingredients")
+        params = RecipeFilterParamsSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+
         qs = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            qs = qs.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            qs = qs.filter(ingredients__id__in=ingredient_ids)
+        match = params.validated_data["match"]
+        for field in ("tags", "ingredients"):
+            if ids := params.validated_data.get(field):
+                qs = qs.filter(*linked_to(field, ids, match))
 
-        return qs.filter(user=cast(CustomUser, self.request.user)).order_by("-id").distinct()
+        qs = qs.filter(user=cast(CustomUser, self.request.user)).order_by("-id")
+        return self._apply_prefetch_plan(qs)
+
+    def _apply_prefetch_plan(self, qs: QuerySet[Recipe]) -> QuerySet[Recipe]:
+        if self.action in self.recipe_columns:
+            qs = qs.only(*self.recipe_columns[self.action])
+        if self.action in self.prefetch_actions:
+            qs = qs.prefetch_related(
+                Prefetch("tags", queryset=Tag.objects.only(*TagSerializer.Meta.fields)),
+                Prefetch(
+                    "ingredients",
+                    queryset=Ingredient.objects.only(*IngredientSerializer.Meta.fields),
+                ),
+            )
+
+        return qs
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        return conditional_get(
+            request, collection_validators(request), partial(super().list, request, *args, **kwargs)
+        )
+
+    def retrieve(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        return conditional_get(
+            request,
+            recipe_validators(request, kwargs["pk"]),
+            partial(super().retrieve, request, *args, **kwargs),
+        )
+
+    def initialize_request(self, request: HttpRequest, *args: Any, **kwargs: Any) -> Request:
+        drf_request = super().initialize_request(request, *args, **kwargs)
+        if self.action == "upload_image":
+            # Before anything reads the body, e.g. the CSRF check of the session authentication
+            request.upload_handlers = [ImageUploadHandler(request)]
+        return drf_request
 
     def get_serializer_class(self) -> type[ModelSerializer[Recipe]]:
         if self.action == "retrieve":
@@ -77,6 +159,52 @@ class RecipeViewSet(viewsets.ModelViewSet[Recipe]):
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
 
+        if serializer.is_valid():
+            # Those of the previous image, deleted with its file
+            recipe = serializer.save(image_variants=[])
+            transaction.on_commit(partial(queue_variants, recipe.pk, cast(str, recipe.image.name)))
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "format",
+                OpenApiTypes.STR,
+                enum=[NDJSONRenderer.format, CSVRenderer.format],
+                default=NDJSONRenderer.format,
+                description="Export format, can also be selected with the Accept header",
+            ),
+        ],
+        responses={
+            (200, NDJSONRenderer.media_type): OpenApiTypes.STR,
+            (200, CSVRenderer.media_type): OpenApiTypes.STR,
+        },
+    )
+    @action(detail=False, methods=["get"], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request: Request) -> StreamingHttpResponse:
+        """
+        Stream all of the user's recipes, optionally filtered like the list, with the names
+        of their tags and ingredients.
+        """
+        renderer = cast(ExportRenderer, request.accepted_renderer)
+        response = StreamingHttpResponse(
+            renderer.render_rows(export_rows(self.get_queryset())),
+            content_type=(
+                f"{renderer.media_type}; charset={renderer.charset}"
+                if renderer.charset
+                else renderer.media_type
+            ),
+        )
+        response["Content-Disposition"] = f'attachment; filename="recipes.{renderer.format}"'
+        return response
+
+    @extend_schema(request=RecipeBulkSerializer, responses=RecipeBulkSerializer)
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request: Request) -> Response:
+        serializer = RecipeBulkSerializer(data=request.data, context=self.get_serializer_context())
+
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -104,8 +232,9 @@ class AbstractRecipeAttrViewSet[T: Model](
 ):
     """Abstract base class for Tag and Ingredient attribute viewsets."""
 
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeAttrCursorPagination
 
     # DRF defines .queryset as a class attribute that may be None.
     # Force subclasses to provide a queryset.
@@ -132,7 +261,20 @@ class AbstractRecipeAttrViewSet[T: Model](
             qs = qs.filter(recipe__isnull=False)
 
         user = cast(CustomUser, self.request.user)
-        return qs.filter(user=user).order_by("-name").distinct()
+        return qs.filter(user=user).order_by("-name", "id").distinct()
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        return conditional_get(
+            request, collection_validators(request), partial(super().list, request, *args, **kwargs)
+        )
+
+    def perform_update(self, serializer: BaseSerializer[T]) -> None:
+        # Names are unique per user; renaming onto an existing name violates the constraint.
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError as e:
+            raise ValidationError({"name": ["You already have an item with this name."]}) from e
 
 
 # Mixins must be declared before GenericViewSet
@@ -144,3 +286,16 @@ class TagViewSet(AbstractRecipeAttrViewSet[Tag]):
 class IngredientViewSet(AbstractRecipeAttrViewSet[Ingredient]):
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
+
+
+@require_GET
+def image_transform(request: HttpRequest, width: int, name: str) -> FileResponse:
+    """A recipe image resized, rendered on the first request, see `recipe.transforms`."""
+    try:
+        path = render_transform(width, name)
+    except TransformNotFound:
+        raise Http404 from None
+    response = FileResponse(path.open("rb"))
+    # As nginx serves the cached transformations
+    patch_cache_control(response, public=True, max_age=30 * 24 * 60 * 60, immutable=True)
+    return response
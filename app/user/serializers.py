@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import Any
 
 from core.models import User as CustomUser
+from core.timing import TimedModelSerializer
 from django.contrib.auth import authenticate, get_user_model
 from django.utils.translation import gettext_lazy as translate
 from rest_framework import serializers
@@ -10,7 +11,7 @@ from rest_framework import serializers
 User = get_user_model()
 
 
-class UserSerializer(serializers.ModelSerializer[CustomUser]):
+class UserSerializer(TimedModelSerializer[CustomUser]):
     class Meta:
         model = User
         fields = ["email", "password", "name"]
@@ -1,11 +1,11 @@
 from typing import cast
 
+from core.authentication import CachedTokenAuthentication
 from core.models import User as CustomUser
 from rest_framework import generics
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.views import APIView
 
 from user.serializers import AuthTokenSerializer, UserSerializer
 
@@ -16,13 +16,14 @@ class CreateUserView(generics.CreateAPIView[CustomUser]):
 
 class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
-    # Enable the browsable API.
-    renderer_classes = [JSONRenderer, BrowsableAPIRenderer]
+    # `ObtainAuthToken` only renders JSON, use the configured renderers, which include the
+    # browsable API.
+    renderer_classes = APIView.renderer_classes
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView[CustomUser]):
     serializer_class = UserSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_object(self) -> CustomUser:
@@ -12,6 +12,28 @@ python manage.py migrate --noinput
 printf "Collecting static files...\n"
 python manage.py collectstatic --noinput
 
+if [[ -n "${API_SCHEMA_FILE:-}" ]]; then
+    # Served by every worker process, see core.schema
+    printf "Generating the API schema...\n"
+    python manage.py spectacular --format openapi-json --file "${API_SCHEMA_FILE}"
+fi
+
+if [[ -n "${METRICS_MULTIPROCESS_DIR:-}" ]]; then
+    # Samples of the previous run's worker processes, see core.metrics
+    rm -rf "${METRICS_MULTIPROCESS_DIR}"
+    mkdir -p "${METRICS_MULTIPROCESS_DIR}"
+fi
+
+if [[ "${SERVER:-wsgi}" == "asgi" ]]; then
+    # Every request runs the sync views in a thread of its own, with no cap like gunicorn's threads
+    printf "Starting Uvicorn on port ${PORT}...\n"
+    exec uvicorn app.asgi:application \
+        --host 0.0.0.0 \
+        --port "${PORT}" \
+        --workers 2 \
+        --log-level info
+fi
+
 printf "Starting Gunicorn on port ${PORT}...\n"
 exec gunicorn app.wsgi:application \
     --bind 0.0.0.0:"${PORT}" \